@@ -0,0 +1,242 @@
+import argparse
+import ctypes
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIZES = [10, 50, 100, 250, 500, 1000, 2000]
+SEED = 1
+REPEAT = 3
+
+# cells changed before the patch redraw is timed
+DIRTY_CELLS = 256
+
+# the braided, weighted maze dijkstra is timed on
+BRAID_FRACTION = 0.5
+MAX_WEIGHT = 9
+WEIGHT_SCALE = 8
+
+# the window only needs to exist, nothing is shown
+VIEW_WIDTH, VIEW_HEIGHT = 1200, 800
+
+
+def summary(runs):
+    return {
+        "median_ms": statistics.median(runs),
+        "min_ms": min(runs),
+        "runs_ms": runs,
+    }
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def bench_library(size, seed, repeat):
+    from mazelib.bindings import generator_lib, solver_lib
+
+    timings = {"generate_maze": [], "free_maze": [], "solve_maze": []}
+    timings.update({"bfs_step": [], "bfs_step_n": []})
+    timings.update({"braid_maze": [], "dijkstra_weighted": []})
+
+    for _ in range(repeat):
+        maze, ms = timed(generator_lib.generate_maze_seeded, size, size, seed)
+        timings["generate_maze"].append(ms)
+        _, ms = timed(generator_lib.free_maze, maze)
+        timings["free_maze"].append(ms)
+
+    maze = generator_lib.generate_maze_seeded(size, size, seed)
+    end = size * size - 1
+    for _ in range(repeat):
+        _, ms = timed(solver_lib.solve_maze, maze)
+        timings["solve_maze"].append(ms)
+
+    # one ctypes call per expansion, as the animated view does
+    for _ in range(repeat):
+        bfs = solver_lib.create_bfs_info(maze, 0, end)
+        start = time.perf_counter()
+        while solver_lib.bfs_step(maze, bfs) != -1:
+            pass
+        timings["bfs_step"].append((time.perf_counter() - start) * 1000)
+        solver_lib.free_bfs_info(bfs)
+
+    # expansions in chunks, as the frame budget scheduler does
+    buffer = (ctypes.c_int * 4096)()
+    for _ in range(repeat):
+        bfs = solver_lib.create_bfs_info(maze, 0, end)
+        start = time.perf_counter()
+        while solver_lib.bfs_step_n(maze, bfs, len(buffer), buffer) == len(buffer):
+            pass
+        timings["bfs_step_n"].append((time.perf_counter() - start) * 1000)
+        solver_lib.free_bfs_info(bfs)
+    generator_lib.free_maze(maze)
+
+    for _ in range(repeat):
+        maze = generator_lib.generate_maze_seeded(size, size, seed)
+        _, ms = timed(generator_lib.braid_maze, maze, BRAID_FRACTION, seed)
+        timings["braid_maze"].append(ms)
+        generator_lib.free_maze(maze)
+
+    # the search the radix heap is for, with loops and costs to route around
+    maze = generator_lib.generate_maze_seeded(size, size, seed)
+    generator_lib.braid_maze(maze, BRAID_FRACTION, seed)
+    generator_lib.random_weights(maze, MAX_WEIGHT, WEIGHT_SCALE, seed)
+    for _ in range(repeat):
+        _, ms = timed(solver_lib.instant_dijkstra, maze, 0, end)
+        timings["dijkstra_weighted"].append(ms)
+
+    generator_lib.free_maze(maze)
+    return timings
+
+
+def bench_grid(size, seed, repeat):
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
+    import pygame
+    import main
+
+    pygame.init()
+    main.WINDOW = pygame.display.set_mode((VIEW_WIDTH, VIEW_HEIGHT))
+
+    timings = {"grid": [], "generate_cells": []}
+    timings.update({"draw_cold": [], "draw_warm": [], "draw_dirty": [], "draw_fit": []})
+
+    for _ in range(repeat):
+        grid, ms = timed(main.Grid, size, size, seed)
+        timings["grid"].append(ms)
+        grid.close()
+
+    grid = main.Grid(size, size, seed)
+    for _ in range(repeat):
+        _, ms = timed(grid.generate_cells)
+        timings["generate_cells"].append(ms)
+
+        # every visible tile rendered from scratch, then all from the cache
+        grid.tiles.clear()
+        grid.redraw()
+        _, ms = timed(grid.draw)
+        timings["draw_cold"].append(ms)
+        grid.redraw()
+        _, ms = timed(grid.draw)
+        timings["draw_warm"].append(ms)
+
+        # a frame of search progress, only the changed cells are patched
+        for vertex in range(0, min(DIRTY_CELLS, size * size)):
+            grid.set_state(vertex, main.STATE_SEARCH)
+        _, ms = timed(grid.draw)
+        timings["draw_dirty"].append(ms)
+
+    # zoomed out until the whole maze fits the view
+    while grid.get_width() > VIEW_WIDTH or grid.get_height() > VIEW_HEIGHT:
+        grid.zoom_increment -= 1
+    for _ in range(repeat):
+        grid.tiles.clear()
+        grid.redraw()
+        _, ms = timed(grid.draw)
+        timings["draw_fit"].append(ms)
+
+    grid.close()
+    pygame.quit()
+    return timings
+
+
+def run_size(size, seed, repeat):
+    sys.path.insert(0, ROOT_DIR)
+    timings = bench_library(size, seed, repeat)
+    timings.update(bench_grid(size, seed, repeat))
+    return {
+        "size": size,
+        "cells": size * size,
+        "peak_rss_mb": peak_rss_mb(),
+        "timings": {name: summary(runs) for name, runs in timings.items()},
+    }
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run_all(args):
+    results = []
+    for size in args.sizes:
+        print(f"{size}x{size}...", file=sys.stderr, flush=True)
+        # a fresh process per size so its peak rss is its own
+        command = [sys.executable, os.path.abspath(__file__), "--worker", str(size)]
+        command += ["--seed", str(args.seed), "--repeat", str(args.repeat)]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            sys.stderr.write(result.stderr)
+            sys.exit(f"benchmark failed at {size}x{size}")
+        results.append(json.loads(result.stdout.splitlines()[-1]))
+
+    return {
+        "meta": {
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time generation, solving and rendering across maze sizes."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--output", help="JSON file to write, stdout by default")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.worker:
+        print(json.dumps(run_size(args.worker, args.seed, args.repeat)))
+        return
+
+    report = json.dumps(run_all(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
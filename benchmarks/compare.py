@@ -0,0 +1,55 @@
+import argparse
+import json
+import sys
+
+# slower than this fraction of the baseline counts as a regression
+THRESHOLD = 0.10
+
+# timings this short are mostly noise
+MIN_MS = 1.0
+
+
+def load_results(path):
+    with open(path) as file:
+        report = json.load(file)
+    return {result["size"]: result for result in report["results"]}
+
+
+def compare(baseline, current, threshold):
+    regressions = []
+    for size in sorted(baseline.keys() & current.keys()):
+        before = baseline[size]["timings"]
+        after = current[size]["timings"]
+        for name in (name for name in before if name in after):
+            old = before[name]["median_ms"]
+            new = after[name]["median_ms"]
+            change = (new - old) / old if old else 0.0
+            marker = ""
+            if change > threshold and new >= MIN_MS:
+                marker = "  REGRESSION"
+                regressions.append((size, name))
+            print(
+                f"{size:>5} {name:<18} {old:>10.2f} -> {new:>10.2f} ms "
+                f"{change:+7.1%}{marker}"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare two benchmark runs and fail on regressions."
+    )
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args(argv)
+
+    regressions = compare(
+        load_results(args.baseline), load_results(args.current), args.threshold
+    )
+    if regressions:
+        sys.exit(f"{len(regressions)} timings regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONNECTIONS = 64
+SIZE = 500
+MAZES = 4
+SEED = 1
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class Client:
+    # one keep-alive connection, requests are sent one after another
+    def __init__(self, reader, writer, host):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+
+    @classmethod
+    async def connect(cls, address):
+        if address.startswith("unix:"):
+            reader, writer = await asyncio.open_unix_connection(address[5:])
+            return cls(reader, writer, "localhost")
+        host, _, port = address.rpartition(":")
+        reader, writer = await asyncio.open_connection(host, int(port))
+        return cls(reader, writer, address)
+
+    async def request(self, method, path, payload=None):
+        # (status, json response)
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.writer.write(
+            (
+                f"{method} {path} HTTP/1.1\r\n"
+                f"Host: {self.host}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "\r\n"
+            ).encode("latin-1")
+            + body
+        )
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        self.writer.close()
+
+
+def spawn_server(threads):
+    # a server on a free port, the address is the first line it prints
+    command = [sys.executable, "-m", "mazelib", "serve", "--port", "0"]
+    if threads:
+        command += ["--threads", str(threads)]
+    process = subprocess.Popen(
+        command, cwd=ROOT_DIR, stdout=subprocess.PIPE, text=True
+    )
+    line = process.stdout.readline()
+    if not line.startswith("Serving on "):
+        process.kill()
+        raise SystemExit("the server did not start")
+    return process, line.split()[-1].removeprefix("http://")
+
+
+async def worker(address, args, mazes, deadline, latencies, counts):
+    # counts holds the requests sent and the ones that failed
+    client = await Client.connect(address)
+    cells = args.size * args.size
+    try:
+        while counts[0] < args.requests and time.perf_counter() < deadline:
+            counts[0] += 1
+            payload = dict(random.choice(mazes))
+            if args.pairs > 1:
+                payload["pairs"] = [
+                    [random.randrange(cells), random.randrange(cells)]
+                    for _ in range(args.pairs)
+                ]
+            else:
+                payload["start"] = random.randrange(cells)
+                payload["end"] = random.randrange(cells)
+            payload["paths"] = args.paths
+
+            start = time.perf_counter()
+            status, _ = await client.request("POST", "/path", payload)
+            if status == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                counts[1] += 1
+    finally:
+        client.close()
+
+
+async def run(address, args):
+    client = await Client.connect(address)
+    mazes = []
+    for seed in range(args.seed, args.seed + args.mazes):
+        maze = {"rows": args.size, "cols": args.size, "seed": seed}
+        maze.update(braid=args.braid, weights=args.weights)
+        status, response = await client.request("POST", "/generate", maze)
+        if status != 200:
+            raise SystemExit(f"generating a maze failed: {response['error']}")
+        mazes.append(maze)
+    _, before = await client.request("GET", "/stats")
+
+    latencies = []
+    counts = [0, 0]
+    deadline = time.perf_counter() + args.duration if args.duration else float("inf")
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            worker(address, args, mazes, deadline, latencies, counts)
+            for _ in range(args.connections)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    _, after = await client.request("GET", "/stats")
+    client.close()
+
+    latencies.sort()
+    batches = after["batches"] - before["batches"]
+    batched = after["batched_queries"] - before["batched_queries"]
+    return {
+        "requests": len(latencies),
+        "errors": counts[1],
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "queries_per_second": len(latencies) * args.pairs / elapsed,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else 0.0,
+        },
+        "batches": batches,
+        "mean_batch": batched / batches if batches else 0,
+    }
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="load the maze service with path queries and report "
+        "throughput and latency"
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="host:port of a running server")
+    target.add_argument("--unix", help="unix socket of a running server")
+    target.add_argument(
+        "--spawn", action="store_true", help="start a server for the run"
+    )
+    parser.add_argument("--threads", type=int, help="server threads with --spawn")
+    parser.add_argument("--connections", type=int, default=CONNECTIONS)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    parser.add_argument("--mazes", type=int, default=MAZES)
+    parser.add_argument("--size", type=int, default=SIZE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--braid", type=float, default=0, help="dead ends to open")
+    parser.add_argument("--weights", type=int, default=0, help="largest cell weight")
+    parser.add_argument("--pairs", type=int, default=1, help="queries per request")
+    parser.add_argument("--paths", action="store_true", help="ask for the cells too")
+    parser.add_argument("--output", help="write the report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    process = None
+    if args.spawn:
+        process, address = spawn_server(args.threads)
+    elif args.unix:
+        address = f"unix:{args.unix}"
+    else:
+        address = args.url.removeprefix("http://")
+
+    try:
+        report = asyncio.run(run(address, args))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    report["connections"] = args.connections
+    report["size"] = args.size
+    report["pairs"] = args.pairs
+    report = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#include "maze.h"
+#include <stdio.h>
+#ifndef MAZE_FILE_H
+#define MAZE_FILE_H
+
+// on disk a maze is a 32 byte little endian header followed by 2 bits per
+// cell in vertex order, four cells to a byte starting from the low bits:
+//
+//   0  char[4]  magic "MAZE"
+//   4  uint32   version
+//   8  int32    rows
+//   12 int32    cols
+//   16 uint64   seed
+//   24 int32    algorithm
+//   28 uint32   flags, 0 in files written before weights
+//
+// each cell keeps its right wall in the low bit and its bottom wall in the
+// high bit, top and left walls are the neighbouring cells' bottom and right.
+// the outer top and left edges are closed apart from the entrance at cell 0.
+// with MAZE_FILE_WEIGHTS set the cells are followed by one weight byte per
+// cell in vertex order
+#define MAZE_FILE_MAGIC "MAZE"
+#define MAZE_FILE_VERSION 1
+#define MAZE_FILE_HEADER_SIZE 32
+#define MAZE_FILE_WEIGHTS 1
+
+size_t maze_file_size(int rows, int cols, uint32_t flags);
+bool save_maze(maze_t *maze, const char *path);
+maze_t *load_maze(const char *path);
+
+// shared with the recording format, which follows a maze in the same file
+bool write_maze(maze_t *maze, FILE *file);
+void write_u32(unsigned char *out, uint32_t value);
+void write_u64(unsigned char *out, uint64_t value);
+uint32_t read_u32(const unsigned char *in);
+uint64_t read_u64(const unsigned char *in);
+unsigned char *map_file(const char *path, size_t *size);
+void unmap_file(unsigned char *data, size_t size);
+
+#endif
@@ -0,0 +1,39 @@
+#include <stdbool.h>
+#include <stddef.h>
+#ifndef MAZE_HEAP_H
+#define MAZE_HEAP_H
+
+// priority queue for dijkstra over small integer costs. keys popped never go
+// down, so an entry is kept in the bucket for the highest bit in which its key
+// differs from the last key popped, bucket 0 holding keys equal to it. a pop
+// takes from bucket 0 and, once that is empty, spreads the lowest non-empty
+// bucket over the buckets below it. an entry only ever moves down, so with
+// costs under 2^k it is moved at most k + 1 times, and every bucket is read
+// and written front to back
+#define RADIX_BUCKETS 33
+
+typedef struct radix_entry {
+    unsigned int key;
+    int vertex;
+} radix_entry;
+
+typedef struct radix_bucket {
+    radix_entry *entries;
+    int size;
+    int capacity;
+} radix_bucket;
+
+typedef struct radix_heap {
+    unsigned int last;
+    int size;
+    radix_bucket buckets[RADIX_BUCKETS];
+} radix_heap;
+
+void radix_init(radix_heap *heap);
+void radix_clear(radix_heap *heap);
+void radix_free(radix_heap *heap);
+size_t radix_size(radix_heap *heap);
+bool radix_push(radix_heap *heap, unsigned int key, int vertex);
+radix_entry radix_pop(radix_heap *heap);
+
+#endif
@@ -0,0 +1,21 @@
+#include "maze.h"
+#ifndef MAZE_INDEX_H
+#define MAZE_INDEX_H
+
+// path queries over a perfect maze, which is a spanning tree so every pair
+// of cells has exactly one path between them. the tree is rooted at vertex 0
+// and up[level * num_nodes + v] is the 2^level-th ancestor of v
+typedef struct tree_index {
+    int num_nodes;
+    int levels;
+    int *depth;
+    int *up;
+} tree_index;
+
+tree_index *build_tree_index(maze_t *maze);
+void free_tree_index(tree_index *index);
+int tree_lca(tree_index *index, int a, int b);
+int path_length(tree_index *index, int a, int b);
+int tree_path(tree_index *index, int a, int b, int *out);
+
+#endif
@@ -0,0 +1,73 @@
+#include "maze.h"
+#include <stdio.h>
+#ifndef MAZE_RECORD_H
+#define MAZE_RECORD_H
+
+// a search recorded as it runs, one entry per expanded vertex in the order
+// it was expanded. each entry is two zigzag varints, the vertex less the one
+// before it and the vertex's parent less the vertex, 0 when it has none.
+// neighbouring cells are 1 or cols apart so most entries take 2 to 4 bytes
+//
+// every RECORD_INTERVAL steps a keyframe keeps the byte offset and the vertex
+// to decode from, so any step is reached by decoding at most that many
+#define RECORD_INTERVAL 4096
+
+// saved after the maze it was recorded on, in the same file:
+//
+//   0  char[4]  magic "MREC"
+//   4  uint32   version
+//   8  int32    start
+//   12 int32    end
+//   16 int32    algorithm
+//   20 uint32   1 once the search finished
+//   24 uint32   steps
+//   28 uint32   path length
+//   32 uint64   bytes of step entries
+//   40 uint64   bytes of path entries
+//
+// then the step entries and the path, cells from start to end as varint
+// deltas from the cell before
+#define RECORD_FILE_MAGIC "MREC"
+#define RECORD_FILE_VERSION 1
+#define RECORD_FILE_HEADER_SIZE 48
+
+typedef struct record_keyframe {
+    int step;
+    int vertex;
+    size_t offset;
+} record_keyframe;
+
+typedef struct recording_t {
+    int start;
+    int end;
+    int algorithm;
+    int steps;
+    bool finished;
+
+    // path found when the search finished, from start to end inclusive
+    int *path;
+    int path_length;
+
+    unsigned char *data;
+    size_t size;
+    size_t capacity;
+    int last;
+
+    record_keyframe *keyframes;
+    int num_keyframes;
+    int keyframe_capacity;
+} recording_t;
+
+recording_t *create_recording(int start, int end, int algorithm);
+void restart_recording(recording_t *rec, int start, int end, int algorithm);
+void free_recording(recording_t *rec);
+size_t recording_size(recording_t *rec);
+bool record_steps(recording_t *rec, maze_t *maze, const int *vertices,
+                  int count);
+bool finish_recording(recording_t *rec, maze_t *maze);
+int replay_steps(recording_t *rec, int from, int to, int *vertices,
+                 int *parents);
+bool save_recording(maze_t *maze, recording_t *rec, const char *path);
+recording_t *load_recording(const char *path);
+
+#endif
@@ -1,10 +1,45 @@
 #include <stdlib.h>
 #include <stdbool.h>
+#include <stdint.h>
 #ifndef MAZE_H
 #define MAZE_H
 
 typedef enum { TOP, RIGHT, BOTTOM, LEFT } Directions;
 
+typedef enum {
+    BACKTRACKING,
+    KRUSKAL,
+    PRIM,
+    WILSON,
+    BINARY_TREE,
+    SIDEWINDER
+} Generators;
+
+// packed wall bits, one byte per cell in maze_t.walls
+#define WALL_BIT(direction) (1 << (direction))
+#define ALL_WALLS (WALL_BIT(TOP) | WALL_BIT(RIGHT) | WALL_BIT(BOTTOM) | WALL_BIT(LEFT))
+
+// cell weights are the cost of moving into a cell, from 1 to MAX_WEIGHT
+#define MAX_WEIGHT 255
+
+// per-call random state so generation never touches the global rand()
+typedef struct rng_t {
+    uint64_t state;
+} rng_t;
+
+// bump allocator behind everything a maze owns, blocks are zeroed when
+// reserved and only given back all at once
+typedef struct arena_block_t {
+    struct arena_block_t *next;
+    size_t capacity;
+    size_t used;
+} arena_block_t;
+
+typedef struct arena_t {
+    arena_block_t *head;
+    size_t reserved;
+} arena_t;
+
 typedef struct node_t {
     int vertex;
     int row;
@@ -21,17 +56,73 @@ typedef struct maze_t {
     int rows;
     int cols;
     int num_nodes;
+    // linked list view from build_nodes, its nodes live in the arena and go
+    // with the maze
     node_t **nodes;
     size_t size;
+
+    // flat representation, indexed by vertex
+    unsigned char *walls;
+    int *adj_offsets;
+    int *adj;
+    int *parent;
+    bool *searched;
+    bool *path;
+
+    // cost of moving into each cell, only used while weighted is set and
+    // every move costs 1 otherwise. allocated the first time it is set
+    unsigned char *weights;
+    bool weighted;
+
+    // parent, searched and path only hold for a vertex stamped this epoch
+    unsigned int *stamp;
+    unsigned int epoch;
+
+    // queue for instant_bfs, allocated the first time it runs
+    int *queue;
+
+    uint64_t seed;
+    int algorithm;
+
+    // the maze itself and its arrays live in the arena, size is the bytes
+    // it has reserved
+    arena_t arena;
+    int adj_capacity;
 } maze_t;
 
-node_t *create_node(int vertex, int row, int col);
 maze_t *create_maze(int rows, int cols);
-void free_node(node_t *node);
 void free_maze(maze_t *maze);
 void add_edge(maze_t *maze, node_t *src, node_t *dest);
 void print_graph(maze_t *maze);
 node_t *check_cell(maze_t *maze, int row, int col);
 void reset_node(node_t *node);
 
+int neighbour_vertex(maze_t *maze, int vertex, Directions direction);
+void remove_wall(maze_t *maze, int src, int dest);
+bool build_adjacency(maze_t *maze);
+bool build_nodes(maze_t *maze);
+bool advance_epoch(unsigned int *epoch);
+
+bool arena_init(arena_t *arena, size_t capacity);
+void *arena_alloc(arena_t *arena, size_t size);
+void arena_free(arena_t *arena);
+void *maze_alloc(maze_t *maze, size_t size);
+void reset_search(maze_t *maze);
+void touch_vertex(maze_t *maze, int vertex);
+int search_parent(maze_t *maze, int vertex);
+bool search_marked(maze_t *maze, int vertex);
+bool path_marked(maze_t *maze, int vertex);
+unsigned char *maze_weights(maze_t *maze);
+int *maze_queue(maze_t *maze);
+bool set_weights(maze_t *maze, const unsigned char *weights);
+void clear_weights(maze_t *maze);
+
+uint64_t random_seed(void);
+void rng_seed(rng_t *rng, uint64_t seed);
+uint32_t rng_next(rng_t *rng);
+uint32_t rng_range(rng_t *rng, uint32_t bound);
+
+int uf_find(int *sets, int x);
+bool uf_union(int *sets, int a, int b);
+
 #endif
@@ -4,41 +4,115 @@ import sys
 import math
 import os
 import ctypes
-import platform
-from enum import IntEnum
+import time
+import collections
+import array
+
+from mazelib.bindings import (
+    Algorithms,
+    Generators,
+    MazeBuffers,
+    Recording,
+    SolverWorker,
+    distance_field,
+    generator_lib,
+    maze_diameter,
+    search_path,
+    solver_lib,
+)
+from mazelib.profiler import FrameProfiler
 
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
 
-if platform.system() == "Windows":
-    lib_ext = "dll"
-else:
-    lib_ext = "so"
+WIDTH, HEIGHT = 1500, 800
+# the window is only opened once main() runs
+WINDOW = None
+SIDEBAR_RECT = pygame.Rect(1200, 0, 300, 800)
+
+BG_COLOR = (255, 255, 255)
+LINE_COLOR = (0, 0, 0)
+HOVER_COLOR = (200, 200, 200)
+
+# palette index stored per cell, higher states win when cells share a pixel
+STATE_BG = 0
+STATE_SEARCH = 1
+STATE_PATH = 2
+STATE_START = 3
+STATE_END = 4
+
+# search and path colours go back to the background on reset
+RESET_STATES = bytes([STATE_BG, STATE_BG, STATE_BG, STATE_START, STATE_END]).ljust(
+    256, b"\0"
+)
+
+# default name offered by the save dialog
+MAZE_FILE_NAME = "maze.maze"
+
+STATE_COLORS = [
+    BG_COLOR,
+    (168, 218, 205),
+    (235, 104, 160),
+    (122, 77, 159),
+    (34, 35, 95),
+]
 
 
-def load_shared_library(filename, ext):
-    path = os.path.join(os.path.dirname(__file__), f"{filename}.{ext}")
-    return ctypes.CDLL(path)
+GENERATOR_OPTIONS = {
+    "Backtracking": Generators.BACKTRACKING,
+    "Kruskal": Generators.KRUSKAL,
+    "Prim": Generators.PRIM,
+    "Wilson": Generators.WILSON,
+    "Binary Tree": Generators.BINARY_TREE,
+    "Sidewinder": Generators.SIDEWINDER,
+}
 
 
-# Load the libraries
-generator_lib = load_shared_library("lib/libmaze-generator", lib_ext)
-solver_lib = load_shared_library("lib/libmaze-solver", lib_ext)
+# the solver gets this much of every frame unless running at max throughput
+SOLVER_BUDGET_MS = 8
+TARGET_FRAME_MS = 1000 / 60
 
+SCHEDULER_MODES = ["Animated", "Frame Budget", "Max Throughput", "Background Thread"]
 
-WIDTH, HEIGHT = 1500, 800
-WINDOW = pygame.display.set_mode((WIDTH, HEIGHT))
+# past this many changed cells a frame the tiles are rendered again instead
+DIRTY_CELL_LIMIT = 512
+
+# distance heatmap, drawn over the maze from near to far
+HEATMAP_STOPS = [(49, 54, 149), (254, 224, 144), (165, 0, 38)]
+HEATMAP_SIZE = 256
+HEATMAP_ALPHA = 170
+HEATMAP_KEY = (255, 0, 255)
+
+# B opens this fraction of the dead ends left, W toggles weights up to
+# WEIGHT_MAX which are drawn light to dark, cells costing 1 stay clear
+BRAID_FRACTION = 0.5
+WEIGHT_MAX = 9
+WEIGHT_SCALE = 8
+WEIGHT_STOPS = [(222, 203, 164), (102, 72, 44)]
+WEIGHT_ALPHA = 140
 
-DIRECTIONS = {"TOP": 0, "RIGHT": 1, "BOTTOM": 2, "LEFT": 3}
+# the maze is drawn from square tiles, only the most recently seen are kept
+TILE_SIZE = 256
+TILE_CACHE_SIZE = 96
 
+# below this many pixels per cell the walls are dropped
+DETAIL_CELL_SIZE = 4
 
-class Algorithms(IntEnum):
-    BFS = 0
-    DJIKSTRA = 1
-    ASTAR = 2
-    BELLMAN = 3
+# the profiler overlay refreshes its text this often
+PROFILE_REFRESH_MS = 250
+PROFILE_CALL_LINES = 4
+PROFILE_BG = (0, 0, 0, 190)
+PROFILE_TEXT = (255, 255, 255)
+TRACE_FILE_NAME = "trace.json"
 
+# a replay starts at a speed that plays the whole search in this long
+REPLAY_SECONDS = 10
+REPLAY_MIN_SPEED = 30
+REPLAY_BAR_RECT = pygame.Rect(20, HEIGHT - 44, 1160, 28)
+REPLAY_BAR_BG = (0, 0, 0, 170)
+REPLAY_BAR_FILL = (235, 104, 160)
 
-DRAW_RECT = pygame.USEREVENT + 9999
+# times the main loop phases, and every C call while it is enabled
+profiler = FrameProfiler({"generator": generator_lib, "solver": solver_lib})
 
 # Preload the necessary fonts
 fonts_to_preload = [
@@ -51,182 +125,63 @@ fonts_to_preload = [
 ]
 
 
-class Node(ctypes.Structure):
-    pass
-
-
-Node._fields_ = [
-    ("vertex", ctypes.c_int),
-    ("row", ctypes.c_int),
-    ("col", ctypes.c_int),
-    ("walls", ctypes.POINTER(ctypes.c_bool)),
-    ("visited", ctypes.c_bool),
-    ("searched", ctypes.c_bool),
-    ("path", ctypes.c_bool),
-    ("parent", ctypes.c_int),
-    ("next", ctypes.POINTER(Node)),
-]
-
-
-class Maze(ctypes.Structure):
-    _fields_ = [
-        ("rows", ctypes.c_int),
-        ("cols", ctypes.c_int),
-        ("num_nodes", ctypes.c_int),
-        ("nodes", ctypes.POINTER(ctypes.POINTER(Node))),
-        ("size", ctypes.c_size_t),
-    ]
+def pixel_address(buffer):
+    # address of a surface buffer, the surface stays locked while it is alive
+    return ctypes.addressof((ctypes.c_uint8 * buffer.length).from_buffer(buffer))
 
 
-class BfsInfo(ctypes.Structure):
-    _fields_ = [
-        ("max_size", ctypes.c_int),
-        ("start", ctypes.c_int),
-        ("end", ctypes.c_int),
-        ("rear", ctypes.c_int),
-        ("front", ctypes.c_int),
-        ("solved", ctypes.c_bool),
-        ("visited", ctypes.POINTER(ctypes.c_bool)),
-        ("queue", ctypes.POINTER(ctypes.c_int)),
-    ]
+class TileCache:
+    # least recently used tiles are evicted first
+    def __init__(self, size=TILE_CACHE_SIZE):
+        self.size = size
+        self.tiles = collections.OrderedDict()
 
+    def get(self, key):
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+        return tile
 
-class SearchInfo(ctypes.Structure):
-    _fields_ = [
-        ("start", ctypes.c_int),
-        ("end", ctypes.c_int),
-        ("bfs", ctypes.POINTER(BfsInfo)),
-    ]
+    def peek(self, key):
+        return self.tiles.get(key)
 
+    def put(self, key, tile):
+        self.tiles[key] = tile
+        self.tiles.move_to_end(key)
+        while len(self.tiles) > self.size:
+            self.tiles.popitem(last=False)
 
-# function prototypes
-generator_lib.generate_maze.argtypes = [ctypes.c_int, ctypes.c_int]
-generator_lib.generate_maze.restype = ctypes.POINTER(Maze)
-
-generator_lib.free_maze.argtypes = [ctypes.POINTER(Maze)]
-
-generator_lib.print_graph.argtypes = [ctypes.POINTER(Maze)]
-
-generator_lib.reset_node.argtypes = [ctypes.POINTER(Node)]
-
-
-solver_lib.solve_maze.argtypes = [ctypes.POINTER(Maze)]
-
-solver_lib.create_search_info.argtypes = [
-    ctypes.POINTER(Maze),
-    ctypes.c_int,
-    ctypes.c_int,
-]
-solver_lib.create_search_info.restype = ctypes.POINTER(SearchInfo)
-
-solver_lib.free_search_info.argtypes = [ctypes.POINTER(SearchInfo)]
-
-solver_lib.create_bfs_info.argtypes = [ctypes.POINTER(Maze), ctypes.c_int, ctypes.c_int]
-solver_lib.create_bfs_info.restype = ctypes.POINTER(BfsInfo)
-
-solver_lib.free_bfs_info.argtypes = [ctypes.POINTER(BfsInfo)]
-
-solver_lib.shortest_path.argtypes = [ctypes.POINTER(Maze), ctypes.POINTER(SearchInfo)]
-
-solver_lib.bfs_step.argtypes = [ctypes.POINTER(Maze), ctypes.POINTER(BfsInfo)]
-solver_lib.bfs_step.restype = ctypes.c_int
-
-
-class Cell:
-    def __init__(self, rect, vertex, grid, line_size):
-        self.rect = rect
-        self.vertex = vertex
-        self.grid = grid
-        self.line_size = line_size
-        self.bg_color = (255, 255, 255)
-        self.start_color = pygame.Color(122, 77, 159)
-        self.end_color = pygame.Color(34, 35, 95)
-        self.hover_color = (200, 200, 200)
-        self.line_color = (0, 0, 0)
-        self.search_color = pygame.Color(168, 218, 205)
-        self.path_color = pygame.Color(235, 104, 160)
-
-        self.state = "bg"
-
-    @property
-    def maze(self):
-        return self.grid.maze.contents
-
-    @property
-    def node(self):
-        return self.maze.nodes[self.vertex].contents
-
-    @property
-    def node_pointer(self):
-        return self.maze.nodes[self.vertex]
-
-    def draw_wall(self, surf):
-        # draw the walls around the cell
-        if self.node.walls[DIRECTIONS["TOP"]]:
-            pygame.draw.line(
-                surf,
-                self.line_color,
-                self.rect.topleft,
-                self.rect.topright,
-                self.line_size,
-            )
-        if self.node.walls[DIRECTIONS["RIGHT"]]:
-            pygame.draw.line(
-                surf,
-                self.line_color,
-                self.rect.topright,
-                self.rect.bottomright,
-                self.line_size,
-            )
-        if self.node.walls[DIRECTIONS["BOTTOM"]]:
-            pygame.draw.line(
-                surf,
-                self.line_color,
-                self.rect.bottomleft,
-                self.rect.bottomright,
-                self.line_size,
-            )
-        if self.node.walls[DIRECTIONS["LEFT"]]:
-            pygame.draw.line(
-                surf,
-                self.line_color,
-                self.rect.topleft,
-                self.rect.bottomleft,
-                self.line_size,
-            )
+    def retain(self, lod):
+        # tiles of other detail levels would go stale, so drop them
+        for key in [key for key in self.tiles if key[0] != lod]:
+            del self.tiles[key]
 
-    def set_state(self, state, surf):
-        self.state = state
-        self.draw(surf)
-
-    def draw(self, surf, hover=False):
-        if hover:
-            pygame.draw.rect(surf, self.hover_color, self.rect)
-        elif self.state == "start":
-            pygame.draw.rect(surf, self.start_color, self.rect)
-        elif self.state == "end":
-            pygame.draw.rect(surf, self.end_color, self.rect)
-        elif self.state == "path":
-            pygame.draw.rect(surf, self.path_color, self.rect)
-        elif self.state == "search":
-            pygame.draw.rect(surf, self.search_color, self.rect)
-        elif self.state == "bg":
-            pygame.draw.rect(surf, self.bg_color, self.rect)
-        self.draw_wall(surf)
+    def clear(self):
+        self.tiles.clear()
 
 
 class Grid:
-    def __init__(self, rows, cols):
+    def __init__(
+        self, rows, cols, seed=None, generator=Generators.BACKTRACKING, path=None
+    ):
         self.transform = pygame.math.Vector2()
         self.rows = rows
         self.cols = cols
+        self.seed = seed
+        self.generator = generator
+        self.path = path
         self.node_size = None
         self.calculate_node_size()
-        self.line_size = math.floor(self.node_size[0] * 0.1)
 
         # c maze info
         self.maze = None
+        self.buffers = None
         self.search_info = None
+        self.search_stale = False
+
+        # background solving
+        self.worker = None
+        self.results = collections.deque()
 
         # movement
         self.zoom_increment = 0
@@ -235,13 +190,20 @@ class Grid:
         self.isHolding = False
         self.bounding_rect = pygame.Rect(0, 0, 1200, 800)
 
-        # cells
-        self.surf = pygame.Surface(self.get_size())
-        self.cells = []
+        # cell state, one STATE_* byte per vertex
+        self.states = bytearray()
+        self.state_buffer = None
         self.isSolving = False
-        self.speed = 1
+        self.batch_size = 16
+        self.step_buffer = (ctypes.c_int * self.batch_size)()
         self.hovered_cells = []
-        self.changed_cells = []
+
+        # rendering cache
+        self.tiles = TileCache()
+        self.drawn_view = None
+        self.heatmap = None
+        self.terrain = None
+        self.dirty_cells = set()
         self.bounds = pygame.math.Vector2(1200, 800)
 
         # searching
@@ -249,25 +211,24 @@ class Grid:
         self.end = None
         self.current_algorithm = Algorithms.BFS
 
+        # every search is recorded, replay_step is None unless replaying it
+        self.recording = None
+        self.replay_step = None
+        self.replay_position = 0.0
+        self.replay_speed = REPLAY_MIN_SPEED
+        self.replay_playing = False
+        self.replay_path = None
+
+        # colours mapped once for the tile renderer
+        surface = pygame.Surface((1, 1), 0, 32)
+        self.palette = (ctypes.c_uint32 * len(STATE_COLORS))(
+            *[surface.map_rgb(color) for color in STATE_COLORS]
+        )
+        self.line_color = surface.map_rgb(LINE_COLOR)
+
         self.get_maze()
         self.initial_position()
 
-    @property
-    def bfs(self):
-        if self.search_info:
-            return self.search_info.contents.bfs.contents
-        return None
-
-    @property
-    def image(self):
-        return pygame.transform.smoothscale(
-            self.surf,
-            (
-                self.get_width(),
-                self.get_height(),
-            ),
-        )
-
     def calculate_node_size(self):
         if self.rows // 800 > 20:
             self.node_size = (self.rows // 800, self.rows // 800)
@@ -275,19 +236,30 @@ class Grid:
             self.node_size = (20, 20)
 
     def cell_width(self):
-        return self.node_size[0] + self.zoom_increment
+        # past one pixel per cell every step out halves the size
+        size = self.node_size[0] + self.zoom_increment
+        return size if size >= 1 else 0.5 ** (1 - size)
 
     def cell_height(self):
-        return self.node_size[1] + self.zoom_increment
+        size = self.node_size[1] + self.zoom_increment
+        return size if size >= 1 else 0.5 ** (1 - size)
+
+    def level_of_detail(self):
+        # (pixels per cell, wall width, cells per pixel) at the current zoom
+        size = self.cell_width()
+        if size < 1:
+            return 1, 0, round(1 / size)
+        if size < DETAIL_CELL_SIZE:
+            return size, 0, 1
+        return size, max(1, math.floor(size * 0.1)), 1
 
     def get_width(self):
-        return (self.cell_width() * self.cols) + self.line_size
+        size, line, block = self.level_of_detail()
+        return -(-self.cols // block) * size + line
 
     def get_height(self):
-        return (self.cell_height() * self.rows) + self.line_size
-
-    def get_size(self):
-        return self.get_width() + 10, self.get_height() + 10
+        size, line, block = self.level_of_detail()
+        return -(-self.rows // block) * size + line
 
     def get_center(self):
         center_x = self.transform.x - (self.get_width() // 2)
@@ -325,40 +297,36 @@ class Grid:
 
             if row >= self.rows:
                 return
-            if col >= self.rows:
+            if col >= self.cols:
                 return
             if col < 0:
                 return
             if row < 0:
                 return
 
-            index = (row * self.rows) + col
+            index = (row * self.cols) + col
             if index >= self.rows * self.cols or index < 0:
                 for count, cell in enumerate(self.hovered_cells):
-                    cell = self.cells[cell]
-                    cell.set_state(cell.state, self.surf)
+                    self.dirty_cells.add(cell)
                     self.hovered_cells.pop(count)
             if index not in self.hovered_cells:
                 self.hovered_cells.append(index)
             if len(self.hovered_cells) == 2:
-                cell = self.cells[self.hovered_cells[0]]
-                cell.set_state(cell.state, self.surf)
+                self.dirty_cells.add(self.hovered_cells[0])
                 self.hovered_cells.pop(0)
-            self.cells[index].draw(self.surf, hover=True)
+            self.dirty_cells.add(index)
         else:
             for count, cell in enumerate(self.hovered_cells):
-                cell = self.cells[cell]
-                cell.set_state(cell.state, self.surf)
+                self.dirty_cells.add(cell)
                 self.hovered_cells.pop(count)
 
     def start_solving(self):
+        self.stop_replay()
         if self.isSolving:
             self.isSolving = False
-            pygame.time.set_timer(pygame.event.Event(DRAW_RECT), 0)
         else:
             if self.check_places():
                 self.isSolving = True
-                pygame.time.set_timer(pygame.event.Event(DRAW_RECT), self.speed)
 
     def check_sidebar(self, mouse):
         if mouse.x >= 1200:
@@ -366,16 +334,37 @@ class Grid:
         return True
 
     def create_search_info(self):
-        if not self.search_info:
-            if self.check_places():
-                self.search_info = solver_lib.create_search_info(
-                    self.maze, self.start, self.end
+        if self.search_info and not self.search_stale:
+            return
+        if not self.check_places():
+            return
+
+        # a reset search keeps its buffers if the algorithm is unchanged
+        if self.search_info:
+            if self.search_info.contents.algorithm == self.current_algorithm:
+                solver_lib.restart_search_info(
+                    self.maze, self.search_info, self.start, self.end
                 )
+            else:
+                solver_lib.free_search_info(self.search_info)
+                self.search_info = None
+        if not self.search_info:
+            self.search_info = solver_lib.create_search_info(
+                self.maze, self.start, self.end, self.current_algorithm
+            )
+        algorithm = self.search_info.contents.algorithm
+        if self.recording:
+            self.recording.restart(self.start, self.end, algorithm)
+        else:
+            self.recording = Recording(self.start, self.end, algorithm)
+        self.search_stale = False
 
-    def handle_searching(self):
+    def handle_searching(self, n):
         self.create_search_info()
-        if self.current_algorithm == Algorithms.BFS:
-            self.bfs_step()
+        if not self.search_info:
+            self.isSolving = False
+            return 0
+        return self.search_steps(n)
 
     def drag_down(self, event):
         mouse = pygame.math.Vector2(pygame.mouse.get_pos())
@@ -411,22 +400,22 @@ class Grid:
         if event.button == 1 and self.rect().collidepoint(mouse):
             if self.start:
                 self.reset_cells()
-                self.cells[self.start].set_state("bg", self.surf)
+                self.set_state(self.start, STATE_BG)
+            self.hide_heatmap()
             self.start = self.hovered_cells[-1]
-            self.cells[self.start].set_state("start", self.surf)
+            self.set_state(self.start, STATE_START)
 
         # place end color
         if event.button == 3 and self.rect().collidepoint(mouse):
             if self.end:
-                self.cells[self.end].set_state("bg", self.surf)
+                self.set_state(self.end, STATE_BG)
 
             self.end = self.hovered_cells[-1]
-            self.cells[self.end].set_state("end", self.surf)
+            self.set_state(self.end, STATE_END)
 
     def event_handler(self, event):
-        if event.type == DRAW_RECT:
-            self.handle_searching()
         if event.type == pygame.KEYDOWN:
+            self.replay_key(event.key)
             if event.key == pygame.K_LSHIFT:
                 self.isHolding = True
         if event.type == pygame.KEYUP:
@@ -451,21 +440,59 @@ class Grid:
 
     def update(self):
         self.handle_dragging()
-        self.get_cell()
-
-        if not self.isSolving:
-            pygame.time.set_timer(pygame.event.Event(DRAW_RECT), 0)
+        with profiler.phase("get_cell"):
+            self.get_cell()
 
     def generate_maze(self):
+        self.stop_worker()
         if self.maze:
             generator_lib.free_maze(self.maze)
             self.maze = None
+            self.buffers = None
 
         if self.search_info:
             solver_lib.free_search_info(self.search_info)
             self.search_info = None
-
-        self.maze = generator_lib.generate_maze(self.cols, self.rows)
+        if self.recording:
+            self.recording.close()
+            self.recording = None
+        self.replay_step = None
+
+        if self.path:
+            # a saved maze brings its own size, seed and generator
+            self.maze = generator_lib.load_maze(os.fsencode(self.path))
+            if not self.maze:
+                raise OSError(f"could not load maze from {self.path}")
+            contents = self.maze.contents
+            self.rows, self.cols = contents.rows, contents.cols
+            self.seed, self.generator = contents.seed, contents.algorithm
+            self.calculate_node_size()
+        else:
+            if self.seed is None:
+                self.seed = generator_lib.random_seed()
+            self.maze = generator_lib.generate_maze_algo(
+                self.rows, self.cols, self.generator, self.seed
+            )
+        self.buffers = MazeBuffers(self.maze)
+
+    def save(self, path):
+        # the last search goes into the file too when there is one
+        if self.recording and self.recording.step_count():
+            self.stop_worker()
+            return solver_lib.save_recording(
+                self.maze, self.recording.recording, os.fsencode(path)
+            )
+        return generator_lib.save_maze(self.maze, os.fsencode(path))
+
+    def load_recording(self):
+        # a maze saved with a search replays it straight away
+        self.recording = Recording.load(self.path)
+        if self.recording:
+            contents = self.recording.recording.contents
+            self.start, self.end = contents.start, contents.end
+            self.set_state(self.start, STATE_START)
+            self.set_state(self.end, STATE_END)
+            self.start_replay()
 
     def get_maze(self, **kwargs):
         if kwargs.get("cols"):
@@ -474,84 +501,762 @@ class Grid:
             self.rows = kwargs.get("rows")
         self.generate_maze()
         self.generate_cells()
+        if self.path:
+            self.load_recording()
 
     def generate_cells(self):
-        self.cells.clear()
-
-        for i in range(self.maze.contents.num_nodes):
-            node = self.maze.contents.nodes[i]
-            cell_rect = pygame.Rect(
-                node.contents.col * self.node_size[0] + self.line_size,
-                node.contents.row * self.node_size[1] + self.line_size,
-                self.node_size[0],
-                self.node_size[1],
+        num_nodes = self.maze.contents.num_nodes
+        self.states = bytearray(num_nodes)
+        self.state_buffer = (ctypes.c_ubyte * num_nodes).from_buffer(self.states)
+        self.heatmap = None
+        self.render_terrain()
+        self.tiles.clear()
+        self.redraw()
+
+    def cell_rect(self, vertex, lod):
+        # rect of the cell on the maze image, without its walls
+        size, line, block = lod
+        row, col = divmod(vertex, self.cols)
+        if block > 1:
+            return pygame.Rect(col // block, row // block, 1, 1)
+        return pygame.Rect(col * size + line, row * size + line, size, size)
+
+    def tile_keys(self, lod, area):
+        if not area:
+            return []
+        return [
+            (lod, tx, ty)
+            for ty in range(area.top // TILE_SIZE, (area.bottom - 1) // TILE_SIZE + 1)
+            for tx in range(area.left // TILE_SIZE, (area.right - 1) // TILE_SIZE + 1)
+        ]
+
+    def render_tile(self, tile, key, area=None):
+        # rasterise the part of the tile under area, all of it by default
+        (size, line, block), tx, ty = key
+        bounds = pygame.Rect(tx * TILE_SIZE, ty * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        area = bounds if area is None else bounds.clip(area)
+        if not area:
+            return
+
+        pixels = tile.get_buffer()
+        pitch = tile.get_pitch()
+        address = (
+            pixel_address(pixels)
+            + (area.y - bounds.y) * pitch
+            + (area.x - bounds.x) * tile.get_bytesize()
+        )
+        generator_lib.render_tile(
+            self.maze,
+            address,
+            pitch,
+            area.width,
+            area.height,
+            area.x,
+            area.y,
+            size,
+            line,
+            block,
+            self.state_buffer,
+            self.palette,
+            self.line_color,
+        )
+        del pixels
+
+    def get_tile(self, key):
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = pygame.Surface((TILE_SIZE, TILE_SIZE), 0, 32)
+            self.render_tile(tile, key)
+            self.tiles.put(key, tile)
+        return tile
+
+    def visible_area(self, view):
+        # the part of the maze image on screen, in image coordinates
+        x, y, lod = view
+        image = pygame.Rect(0, 0, self.get_width(), self.get_height())
+        return self.bounding_rect.move(-x, -y).clip(image)
+
+    def blit_area(self, view, area):
+        x, y, lod = view
+        for key in self.tile_keys(lod, area):
+            tile = self.get_tile(key)
+            bounds = pygame.Rect(key[1] * TILE_SIZE, key[2] * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+            part = bounds.clip(area)
+            WINDOW.blit(tile, part.move(x, y), part.move(-bounds.x, -bounds.y))
+
+    def refresh_tiles(self, lod):
+        # redraw changed cells on the cached tiles, returns the changed areas
+        if not self.dirty_cells:
+            return []
+        self.tiles.retain(lod)
+        line = lod[1]
+        areas = []
+        for vertex in self.dirty_cells:
+            area = self.cell_rect(vertex, lod).inflate(line * 2, line * 2)
+            for key in self.tile_keys(lod, area):
+                tile = self.tiles.peek(key)
+                if tile is not None:
+                    self.render_tile(tile, key, area)
+            areas.append(area)
+        self.dirty_cells.clear()
+        return areas
+
+    def draw_hover(self, view):
+        x, y, lod = view
+        half = lod[1] // 2
+        for vertex in self.hovered_cells:
+            # keep clear of the walls around the cell
+            rect = self.cell_rect(vertex, lod)
+            inner = pygame.Rect(
+                rect.x + lod[1] - half,
+                rect.y + lod[1] - half,
+                max(1, rect.width - lod[1]),
+                max(1, rect.height - lod[1]),
             )
-            cell = Cell(cell_rect, node.contents.vertex, self, self.line_size)
-            self.cells.append(cell)
+            WINDOW.fill(HOVER_COLOR, inner.move(x, y).clip(self.bounding_rect))
 
-        self.surf.fill((255, 255, 255))
-        self.draw_rects()
+    def draw(self):
+        # returns the screen rects that changed since the last frame
+        lod = self.level_of_detail()
+        position = self.get_center()
+        view = (int(position.x), int(position.y), lod)
+
+        if len(self.dirty_cells) > DIRTY_CELL_LIMIT:
+            self.tiles.clear()
+            self.dirty_cells.clear()
+            self.drawn_view = None
+        areas = self.refresh_tiles(lod)
+        visible = self.visible_area(view)
+
+        if view != self.drawn_view:
+            self.drawn_view = view
+            WINDOW.fill(BG_COLOR)
+            self.blit_area(view, visible)
+            self.draw_overlays(view, visible)
+            self.draw_hover(view)
+            return [WINDOW.get_rect()]
+
+        rects = []
+        for area in areas:
+            area = area.clip(visible)
+            if area:
+                self.blit_area(view, area)
+                self.draw_overlays(view, area)
+                rects.append(area.move(view[0], view[1]))
+        self.draw_hover(view)
+        return rects
+
+    def redraw(self):
+        self.drawn_view = None
+
+    def restore(self, rect):
+        # repaints a screen rect from the cached tiles, for overlays on the maze
+        view = self.drawn_view
+        if view is None:
+            return
+        WINDOW.fill(BG_COLOR, rect)
+        area = rect.move(-view[0], -view[1]).clip(self.visible_area(view))
+        if area:
+            self.blit_area(view, area)
+            self.draw_overlays(view, area)
+
+    def show_heatmap(self):
+        # distances from the start, or from one end of the hardest pair
+        # which becomes the start and end when none is placed
+        if not self.start:
+            self.reset_cells()
+            start, end, length = maze_diameter(self.maze)
+            if self.end:
+                self.set_state(self.end, STATE_BG)
+            self.start, self.end = start, end
+            self.set_state(self.start, STATE_START)
+            self.set_state(self.end, STATE_END)
+        dist = distance_field(self.maze, [self.start])
+
+        self.heatmap = pygame.Surface((self.cols, self.rows), 0, 32)
+        stops = [pygame.Color(color) for color in HEATMAP_STOPS]
+        colors = []
+        for i in range(HEATMAP_SIZE):
+            t = i / (HEATMAP_SIZE - 1) * (len(stops) - 1)
+            stop = min(int(t), len(stops) - 2)
+            color = stops[stop].lerp(stops[stop + 1], t - stop)
+            colors.append(self.heatmap.map_rgb(color))
+        palette = (ctypes.c_uint32 * HEATMAP_SIZE)(*colors)
+
+        pixels = self.heatmap.get_buffer()
+        generator_lib.render_heatmap(
+            self.maze,
+            ctypes.cast(dist.buffer_info()[0], ctypes.POINTER(ctypes.c_int)),
+            pixel_address(pixels),
+            self.heatmap.get_pitch(),
+            palette,
+            HEATMAP_SIZE,
+            self.heatmap.map_rgb(HEATMAP_KEY),
+        )
+        del pixels
+        self.heatmap.set_colorkey(HEATMAP_KEY)
+        self.heatmap.set_alpha(HEATMAP_ALPHA)
+        self.redraw()
+
+    def hide_heatmap(self):
+        if self.heatmap:
+            self.heatmap = None
+            self.redraw()
+
+    def braid(self):
+        # opens some of the dead ends, the last search no longer fits the maze.
+        # the worker reads the adjacency, so it has to be gone before the
+        # walls change
+        if self.isSolving:
+            return
+        self.stop_worker()
+        if generator_lib.braid_maze(self.maze, BRAID_FRACTION, self.seed) < 0:
+            return
+        self.forget_search()
+        self.hide_heatmap()
+        self.buffers = MazeBuffers(self.maze)
+        self.tiles.clear()
+        self.redraw()
+
+    def toggle_weights(self):
+        # same as braid, the worker must not see the weights change
+        if self.isSolving:
+            return
+        self.stop_worker()
+        if self.maze.contents.weighted:
+            generator_lib.clear_weights(self.maze)
+        elif not generator_lib.random_weights(
+            self.maze, WEIGHT_MAX, WEIGHT_SCALE, self.seed
+        ):
+            return
+        self.forget_search()
+        self.buffers = MazeBuffers(self.maze)
+        self.render_terrain()
+        self.redraw()
+
+    def render_terrain(self):
+        # one pixel per cell coloured by weight, through the heatmap renderer
+        self.terrain = None
+        if not self.maze.contents.weighted:
+            return
+        # cells costing 1 land on the first colour, which is see-through
+        weights = array.array("i", [weight - 1 for weight in self.buffers.weights])
+        self.terrain = pygame.Surface((self.cols, self.rows), 0, 32)
+        stops = [pygame.Color(color) for color in WEIGHT_STOPS]
+        key = self.terrain.map_rgb(HEATMAP_KEY)
+        colors = [key] + [
+            self.terrain.map_rgb(stops[0].lerp(stops[1], i / (HEATMAP_SIZE - 2)))
+            for i in range(HEATMAP_SIZE - 1)
+        ]
+        palette = (ctypes.c_uint32 * HEATMAP_SIZE)(*colors)
+
+        pixels = self.terrain.get_buffer()
+        generator_lib.render_heatmap(
+            self.maze,
+            ctypes.cast(weights.buffer_info()[0], ctypes.POINTER(ctypes.c_int)),
+            pixel_address(pixels),
+            self.terrain.get_pitch(),
+            palette,
+            HEATMAP_SIZE,
+            key,
+        )
+        del pixels
+        self.terrain.set_colorkey(key)
+        self.terrain.set_alpha(WEIGHT_ALPHA)
 
-    def draw_rects(self):
-        for cell in self.cells:
-            cell.draw(self.surf)
+    def draw_overlays(self, view, area):
+        self.draw_overlay(self.terrain, view, area)
+        self.draw_overlay(self.heatmap, view, area)
 
-    def draw(self):
-        WINDOW.blit(self.image, self.get_center())
-
-    def show_solved(self, cell):
-        cell = cell
-        while cell.node.parent != -1:
-            if cell.state != "start" or cell.state != "end":
-                cell.set_state("path", self.surf)
-            cell = self.cells[cell.node.parent]
-        self.cells[self.start].set_state("start", self.surf)
-        self.cells[self.end].set_state("end", self.surf)
-
-    def bfs_step(self):
-        self.create_search_info()
+    def draw_overlay(self, overlay, view, area):
+        # scales only the cells under area, one pixel per cell in the overlay
+        if not overlay or not area:
+            return
+        x, y, (size, line, block) = view
+        scale = size / block
+        col0 = max(0, int((area.left - line) / scale))
+        row0 = max(0, int((area.top - line) / scale))
+        col1 = min(self.cols, math.ceil((area.right - line) / scale))
+        row1 = min(self.rows, math.ceil((area.bottom - line) / scale))
+        if col1 <= col0 or row1 <= row0:
+            return
 
-        if not self.check_places():
+        source = overlay.subsurface((col0, row0, col1 - col0, row1 - row0))
+        scaled = pygame.transform.scale(
+            source,
+            (
+                max(1, round((col1 - col0) * scale)),
+                max(1, round((row1 - row0) * scale)),
+            ),
+        )
+        WINDOW.set_clip(area.move(x, y))
+        position = (round(col0 * scale) + line + x, round(row0 * scale) + line + y)
+        WINDOW.blit(scaled, position)
+        WINDOW.set_clip(None)
+
+    def set_state(self, vertex, state):
+        self.states[vertex] = state
+        self.dirty_cells.add(vertex)
+
+    def show_solved(self, vertex):
+        self.show_path(search_path(self.maze, vertex))
+
+    def show_path(self, vertices):
+        for vertex in vertices:
+            self.set_state(vertex, STATE_PATH)
+        self.set_state(self.start, STATE_START)
+        self.set_state(self.end, STATE_END)
+
+    def mark_searched(self, vertices):
+        states = self.states
+        dirty = self.dirty_cells
+        for vertex in vertices:
+            if states[vertex] < STATE_START:
+                states[vertex] = STATE_SEARCH
+                dirty.add(vertex)
+
+    def unmark_searched(self, vertices):
+        states = self.states
+        dirty = self.dirty_cells
+        for vertex in vertices:
+            if states[vertex] == STATE_SEARCH:
+                states[vertex] = STATE_BG
+                dirty.add(vertex)
+
+    def start_replay(self):
+        # plays the recorded search from its first step, stopping the live one
+        if not self.recording or not self.recording.step_count():
             return
+        self.isSolving = False
+        self.stop_worker()
+        self.results.clear()
+        self.clear_states()
+        self.replay_step = 0
+        self.replay_position = 0.0
+        self.replay_path = None
+        self.replay_playing = True
+        self.replay_speed = max(
+            REPLAY_MIN_SPEED, self.recording.step_count() / REPLAY_SECONDS
+        )
 
-        step = solver_lib.bfs_step(self.maze, self.search_info.contents.bfs)
-        if self.bfs.solved:
-            solver_lib.shortest_path(self.maze, self.search_info)
+    def stop_replay(self):
+        # leaves the cells as they were at the last recorded step
+        if self.replay_step is None:
+            return
+        self.seek_replay(self.recording.step_count())
+        self.replay_step = None
+        self.replay_playing = False
+
+    def seek_replay(self, step):
+        # only the cells expanded between the old step and the new one change
+        count = self.recording.step_count()
+        step = max(0, min(int(step), count))
+        self.replay_position = step
+        if self.replay_path is not None and step != count:
+            for vertex, state in self.replay_path:
+                self.set_state(vertex, state)
+            self.replay_path = None
+
+        if step > self.replay_step:
+            self.mark_searched(self.recording.steps(self.replay_step, step))
+        elif step < self.replay_step:
+            self.unmark_searched(self.recording.steps(step, self.replay_step))
+        self.replay_step = step
+
+        if step == count and self.recording.finished() and self.replay_path is None:
+            path = self.recording.path()
+            self.replay_path = [(vertex, self.states[vertex]) for vertex in path]
+            self.show_path(path)
+
+    def advance_replay(self, dt):
+        if self.replay_step is None or not self.replay_playing:
+            return
+        position = self.replay_position + self.replay_speed * dt
+        self.seek_replay(position)
+        self.replay_position = position
+        if self.replay_step == self.recording.step_count():
+            self.replay_playing = False
+
+    def replay_key(self, key):
+        # returns whether the key drove the replay
+        if key == pygame.K_F5:
+            if self.replay_step is None:
+                self.start_replay()
+            else:
+                self.stop_replay()
+            return True
+        if self.replay_step is None:
+            return False
 
-        if step != -1:
-            cell = self.cells[step]
-            self.changed_cells.append(cell)
-            if cell.state != "start" or cell.state != "end":
-                self.cells[step].set_state("search", self.surf)
+        count = self.recording.step_count()
+        second = max(1, int(self.replay_speed))
+        if key == pygame.K_SPACE:
+            if self.replay_step == count:
+                self.seek_replay(0)
+            self.replay_playing = not self.replay_playing
+        elif key == pygame.K_LEFT:
+            self.seek_replay(self.replay_step - second)
+        elif key == pygame.K_RIGHT:
+            self.seek_replay(self.replay_step + second)
+        elif key == pygame.K_COMMA:
+            self.seek_replay(self.replay_step - 1)
+        elif key == pygame.K_PERIOD:
+            self.seek_replay(self.replay_step + 1)
+        elif key == pygame.K_HOME:
+            self.seek_replay(0)
+        elif key == pygame.K_END:
+            self.seek_replay(count)
+        elif key == pygame.K_UP:
+            self.replay_speed *= 2
+        elif key == pygame.K_DOWN:
+            self.replay_speed = max(1, self.replay_speed / 2)
+        elif key == pygame.K_ESCAPE:
+            self.stop_replay()
         else:
-            cell = self.cells[self.bfs.end]
-            self.show_solved(cell)
+            return False
+        return True
+
+    def start_worker(self):
+        if self.worker:
+            return
+        self.create_search_info()
+        if not self.search_info:
             self.isSolving = False
+            return
+        self.worker = SolverWorker(
+            self.maze, self.search_info, self.results, recording=self.recording.recording
+        )
+        self.worker.start()
+
+    def stop_worker(self):
+        # results already queued stay queued so a paused search can resume
+        if self.worker:
+            self.worker.cancel()
+            self.worker = None
+
+    def drain_results(self, deadline=None):
+        # apply worker results until the deadline, None drains everything
+        while self.results:
+            kind, vertices = self.results.popleft()
+            if kind == "search":
+                self.mark_searched(vertices)
+            else:
+                self.show_path(vertices)
+                self.isSolving = False
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+    def memory_usage(self):
+        # bytes held on the C side by the maze and its current search
+        size = self.maze.contents.size if self.maze else 0
+        if self.search_info:
+            size += solver_lib.search_info_size(self.search_info)
+        if self.recording:
+            size += self.recording.memory_usage()
+        return size
 
-    def reset_cells(self):
-        while len(self.changed_cells) > 0:
-            for count, cell in enumerate(self.changed_cells):
-                generator_lib.reset_node(cell.node_pointer)
-                cell.set_state("bg", self.surf)
-                self.changed_cells.pop(count)
+    def close(self):
+        self.stop_worker()
         if self.search_info:
             solver_lib.free_search_info(self.search_info)
-        self.search_info = None
+            self.search_info = None
+        if self.recording:
+            self.recording.close()
+            self.recording = None
+        if self.maze:
+            generator_lib.free_maze(self.maze)
+            self.maze = None
+            self.buffers = None
+
+    def search_steps(self, n):
+        # advance the search by up to n expansions in a single C call
+        if len(self.step_buffer) < n:
+            self.step_buffer = (ctypes.c_int * n)()
+        count = solver_lib.search_record_n(
+            self.maze, self.search_info, self.recording.recording, n, self.step_buffer
+        )
+
+        self.mark_searched(self.step_buffer[:count])
+
+        # the path was traced back when the recording was finished
+        if count < n:
+            self.show_solved(self.search_info.contents.end)
+            self.isSolving = False
+        return count
+
+    def clear_states(self):
+        # one pass over the store, start and end keep their colours
+        self.states[:] = self.states.translate(RESET_STATES)
+        self.dirty_cells.clear()
+        self.tiles.clear()
+        self.redraw()
+
+    def forget_search(self):
+        # for when the walls or weights change under the last search
+        self.reset_cells()
+        if self.search_info:
+            solver_lib.free_search_info(self.search_info)
+            self.search_info = None
+        if self.recording:
+            self.recording.close()
+            self.recording = None
+        self.isSolving = False
+
+    def reset_cells(self):
+        self.stop_worker()
+        self.results.clear()
+        self.replay_step = None
+        self.clear_states()
+        if self.maze:
+            generator_lib.reset_search(self.maze)
+        self.search_stale = True
+
+
+class SolverScheduler:
+    def __init__(self, budget_ms=SOLVER_BUDGET_MS):
+        self.budget_ms = budget_ms
+        self.mode = "Frame Budget"
+        self.chunk = 16
+        self.last_end = None
+        self.worker = None
+        self.worker_steps = 0
+        self.frame_steps = 0
+
+        # steps per second, measured over half second windows
+        self.steps_per_second = 0
+        self.window_steps = 0
+        self.window_start = time.perf_counter()
+
+    def frame_budget(self, other_ms):
+        # leave the rest of the frame to events and rendering
+        if self.mode == "Max Throughput":
+            return max(1.0, TARGET_FRAME_MS - other_ms)
+        return self.budget_ms
+
+    def run(self, grid):
+        start = time.perf_counter()
+        other_ms = (start - self.last_end) * 1000 if self.last_end else 0
+        window_steps = self.window_steps
+
+        if self.mode == "Background Thread":
+            self.run_background(grid, start + self.budget_ms / 1000)
+        elif grid.worker or grid.results:
+            # finish what the worker produced before stepping on this thread
+            grid.stop_worker()
+            grid.drain_results()
+        elif grid.isSolving:
+            if self.mode == "Animated":
+                self.window_steps += grid.handle_searching(grid.batch_size)
+            else:
+                deadline = start + self.frame_budget(other_ms) / 1000
+                while grid.isSolving:
+                    chunk_start = time.perf_counter()
+                    count = grid.handle_searching(self.chunk)
+                    now = time.perf_counter()
+                    self.window_steps += count
+
+                    # size the next chunk to take about a millisecond
+                    if count == self.chunk:
+                        rate = count / max(now - chunk_start, 1e-6)
+                        self.chunk = max(1, int(rate / 1000))
+                    if now >= deadline:
+                        break
+
+        self.frame_steps = self.window_steps - window_steps
+        now = time.perf_counter()
+        if now - self.window_start >= 0.5:
+            self.steps_per_second = self.window_steps / (now - self.window_start)
+            self.window_steps = 0
+            self.window_start = now
+        self.last_end = now
+
+    def run_background(self, grid, deadline):
+        if grid.isSolving:
+            grid.start_worker()
+        else:
+            grid.stop_worker()
+
+        # count the steps the worker made since the last frame
+        if grid.worker is not self.worker:
+            self.worker = grid.worker
+            self.worker_steps = 0
+        if self.worker:
+            steps = self.worker.steps
+            self.window_steps += steps - self.worker_steps
+            self.worker_steps = steps
+
+        grid.drain_results(deadline)
+
+
+class ProfilerOverlay:
+    # frame times, steps and the slowest phases and C calls over the maze
+    def __init__(self):
+        self.visible = False
+        self.font = None
+        self.surface = None
+        self.rect = pygame.Rect(10, 10, 0, 0)
+        self.last_refresh = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        if self.visible:
+            profiler.enable()
+            if not self.font:
+                self.font = pygame.font.SysFont(
+                    "dejavusansmono,couriernew,monospace", 14
+                )
+        elif not profiler.tracing:
+            profiler.disable()
+
+    def lines(self):
+        last, p50, p99 = profiler.stats()
+        lines = [f"frame {last:6.2f} ms  p50 {p50:6.2f}  p99 {p99:6.2f}"]
+        last, p50, p99 = profiler.stats("steps")
+        lines.append(f"steps/frame {last:,.0f}  p50 {p50:,.0f}  p99 {p99:,.0f}")
+        lines.append("")
+        for name in profiler.phase_names:
+            _, p50, p99 = profiler.stats(name)
+            lines.append(f"{name:<15} p50 {p50:6.2f}  p99 {p99:6.2f}")
+
+        # only the C calls that cost the most
+        calls = sorted(
+            profiler.call_names, key=lambda name: profiler.stats(name)[2], reverse=True
+        )
+        if calls:
+            lines.append("")
+        for name in calls[:PROFILE_CALL_LINES]:
+            _, p50, p99 = profiler.stats(name)
+            lines.append(f"{name[:15]:<15} p50 {p50:6.2f}  p99 {p99:6.2f}")
+        if profiler.tracing:
+            lines.append("")
+            lines.append(f"recording trace, {len(profiler.events):,} events")
+        return lines
+
+    def refresh(self):
+        images = [self.font.render(line, True, PROFILE_TEXT) for line in self.lines()]
+        height = self.font.get_linesize()
+        width = max(image.get_width() for image in images)
+        self.surface = pygame.Surface(
+            (width + 16, height * len(images) + 12), pygame.SRCALPHA
+        )
+        self.surface.fill(PROFILE_BG)
+        for count, image in enumerate(images):
+            self.surface.blit(image, (8, 6 + count * height))
+        self.rect.size = self.surface.get_size()
+
+    def draw(self, grid, rects):
+        # the maze under the last overlay is put back before drawing the next
+        now = pygame.time.get_ticks()
+        if now - self.last_refresh >= PROFILE_REFRESH_MS or not self.surface:
+            self.last_refresh = now
+            old = self.rect.copy()
+            self.refresh()
+            grid.restore(old)
+            rects.append(old)
+        WINDOW.blit(self.surface, self.rect)
+        rects.append(self.rect)
+
+
+class ReplayBar:
+    # progress along a replayed search, clicking or dragging on it seeks
+    def __init__(self):
+        self.rect = REPLAY_BAR_RECT.copy()
+        self.shown = False
+        self.seeking = False
+        self.font = None
+
+    def seek(self, grid, x):
+        fraction = (x - self.rect.x) / self.rect.width
+        grid.seek_replay(round(fraction * grid.recording.step_count()))
+
+    def event_handler(self, grid, event):
+        # returns whether the event was used, the grid should not see it then
+        if grid.replay_step is None:
+            self.seeking = False
+            return False
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            if self.rect.collidepoint(event.pos):
+                self.seeking = True
+                self.seek(grid, event.pos[0])
+                return True
+        if event.type == pygame.MOUSEMOTION and self.seeking:
+            self.seek(grid, event.pos[0])
+            return True
+        if event.type == pygame.MOUSEBUTTONUP and self.seeking:
+            self.seeking = False
+            return True
+        return False
+
+    def draw(self, grid, rects):
+        if grid.replay_step is None:
+            # the maze under it was put back before this frame was drawn
+            if self.shown:
+                rects.append(self.rect)
+                self.shown = False
+            return
+        self.shown = True
+        if not self.font:
+            self.font = pygame.font.SysFont(None, 20)
+
+        count = grid.recording.step_count()
+        surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        surface.fill(REPLAY_BAR_BG)
+        filled = self.rect.width * grid.replay_step // max(1, count)
+        surface.fill(REPLAY_BAR_FILL, (0, 0, filled, self.rect.height))
+        state = "Playing" if grid.replay_playing else "Paused"
+        text = self.font.render(
+            f"Replay {state}  {grid.replay_step:,} / {count:,} steps  "
+            f"{grid.replay_speed:,.0f} steps/s",
+            True,
+            PROFILE_TEXT,
+        )
+        surface.blit(text, (8, (self.rect.height - text.get_height()) // 2))
+        WINDOW.blit(surface, self.rect)
+        rects.append(self.rect)
 
 
 def draw(grid):
-    WINDOW.fill((255, 255, 255))
-    grid.draw()
-    manager.draw_ui(WINDOW)
-    pygame.display.update()
+    global open_windows
+    # anything over the maze other than the sidebar needs a full redraw
+    windows = len(manager.get_window_stack().get_full_stack())
+    if windows or windows != open_windows:
+        grid.redraw()
+    open_windows = windows
+
+    if overlay.visible:
+        grid.restore(overlay.rect)
+    if replay_bar.shown:
+        grid.restore(replay_bar.rect)
+    with profiler.phase("grid.draw"):
+        rects = grid.draw()
+    replay_bar.draw(grid, rects)
+    if overlay.visible:
+        overlay.draw(grid, rects)
+    with profiler.phase("draw_ui"):
+        manager.draw_ui(WINDOW)
+    rects.append(SIDEBAR_RECT)
+    with profiler.phase("display.update"):
+        pygame.display.update(rects)
 
 
 def update(grid):
     grid.update()
-    manager.update(dt)
+    with profiler.phase("manager.update"):
+        manager.update(dt)
     check_hover(grid)
 
 
+def toggle_trace():
+    if profiler.tracing:
+        count = profiler.stop_trace(TRACE_FILE_NAME)
+        print(f"Wrote {count:,} trace events to {TRACE_FILE_NAME}")
+        if not overlay.visible:
+            profiler.disable()
+    else:
+        profiler.start_trace()
+        print("Recording trace")
+
+
 def check_hover(grid):
     temp_cursor = False
     if grid.rect().collidepoint(pygame.mouse.get_pos()):
@@ -565,19 +1270,28 @@ def check_hover(grid):
 
 
 def main():
+    global WINDOW
     global cursor
     global manager
     global dt
+    global open_windows
+    global overlay
+    global replay_bar
     pygame.init()
     pygame.font.init()
+    WINDOW = pygame.display.set_mode((WIDTH, HEIGHT))
 
     run = True
     cursor = False
+    open_windows = 0
+    overlay = ProfilerOverlay()
+    replay_bar = ReplayBar()
 
     manager = pygame_gui.UIManager((WIDTH, HEIGHT))
     manager.preload_fonts(fonts_to_preload)
 
     grid = Grid(50, 50)
+    scheduler = SolverScheduler()
 
     sidebar = pygame_gui.elements.UIPanel(
         relative_rect=pygame.Rect(1200, 0, 300, 800),
@@ -586,7 +1300,7 @@ def main():
     )
 
     controls_btn = pygame_gui.elements.UIButton(
-        relative_rect=pygame.Rect(-1, 40, 200, 50),
+        relative_rect=pygame.Rect(-1, 20, 200, 50),
         text="Show Controls",
         manager=manager,
         container=sidebar,
@@ -594,7 +1308,7 @@ def main():
     )
 
     row_lbl = pygame_gui.elements.UILabel(
-        relative_rect=pygame.Rect(-1, 80, -1, -1),
+        relative_rect=pygame.Rect(-1, 20, -1, -1),
         text="Rows & Columns: 50",
         manager=manager,
         container=sidebar,
@@ -602,120 +1316,273 @@ def main():
     )
 
     row_slider = pygame_gui.elements.UIHorizontalSlider(
-        relative_rect=pygame.Rect(0, 20, 250, 30),
+        relative_rect=pygame.Rect(0, 10, 250, 30),
         start_value=50,
-        value_range=(5, 150),
+        value_range=(5, 1000),
         manager=manager,
         container=sidebar,
         anchors={"centerx": "centerx", "top_target": row_lbl},
     )
 
+    seed_entry = pygame_gui.elements.UITextEntryLine(
+        relative_rect=pygame.Rect(-1, 20, 250, 30),
+        placeholder_text="Seed (blank for random)",
+        manager=manager,
+        container=sidebar,
+        anchors={"centerx": "centerx", "top_target": row_slider},
+    )
+    seed_entry.set_allowed_characters("numbers")
+
+    generator_dropdown = pygame_gui.elements.UIDropDownMenu(
+        relative_rect=pygame.Rect(-1, 10, 200, 40),
+        options_list=list(GENERATOR_OPTIONS),
+        starting_option="Backtracking",
+        manager=manager,
+        container=sidebar,
+        anchors={"centerx": "centerx", "top_target": seed_entry},
+    )
+
     generate_btn = pygame_gui.elements.UIButton(
-        relative_rect=pygame.Rect(-1, 40, 200, 50),
+        relative_rect=pygame.Rect(-1, 10, 200, 50),
         text="Generate Maze",
         manager=manager,
         container=sidebar,
-        anchors={"centerx": "centerx", "top_target": row_slider},
+        anchors={"centerx": "centerx", "top_target": generator_dropdown},
+    )
+
+    open_btn = pygame_gui.elements.UIButton(
+        relative_rect=pygame.Rect(50, 10, 95, 40),
+        text="Open",
+        manager=manager,
+        container=sidebar,
+        anchors={"top_target": generate_btn},
+    )
+
+    save_btn = pygame_gui.elements.UIButton(
+        relative_rect=pygame.Rect(10, 10, 95, 40),
+        text="Save",
+        manager=manager,
+        container=sidebar,
+        anchors={"top_target": generate_btn, "left_target": open_btn},
+    )
+
+    seed_lbl = pygame_gui.elements.UILabel(
+        relative_rect=pygame.Rect(-1, 10, -1, -1),
+        text=f"Seed: {grid.seed}",
+        manager=manager,
+        container=sidebar,
+        anchors={"centerx": "centerx", "top_target": open_btn},
     )
 
     algorithm_dropdown = pygame_gui.elements.UIDropDownMenu(
-        relative_rect=pygame.Rect(-1, 80, 200, 40),
-        options_list=["Breadth-First"],
+        relative_rect=pygame.Rect(-1, 30, 200, 40),
+        options_list=["Breadth-First", "Djikstras", "A*", "Bidirectional"],
         starting_option="Breadth-First",
         manager=manager,
         container=sidebar,
-        anchors={"centerx": "centerx", "top_target": generate_btn},
+        anchors={"centerx": "centerx", "top_target": seed_lbl},
+    )
+
+    scheduler_dropdown = pygame_gui.elements.UIDropDownMenu(
+        relative_rect=pygame.Rect(-1, 10, 200, 40),
+        options_list=SCHEDULER_MODES,
+        starting_option=scheduler.mode,
+        manager=manager,
+        container=sidebar,
+        anchors={"centerx": "centerx", "top_target": algorithm_dropdown},
     )
 
     algorithm_btn = pygame_gui.elements.UIButton(
-        relative_rect=pygame.Rect(-1, 40, 200, 50),
+        relative_rect=pygame.Rect(-1, 20, 200, 50),
         text="Start Search",
         manager=manager,
         container=sidebar,
-        anchors={"centerx": "centerx", "top_target": algorithm_dropdown},
+        anchors={"centerx": "centerx", "top_target": scheduler_dropdown},
     )
 
     reset_btn = pygame_gui.elements.UIButton(
-        relative_rect=pygame.Rect(-1, 40, 200, 50),
+        relative_rect=pygame.Rect(25, 20, 120, 50),
         text="Reset Colours",
         manager=manager,
         container=sidebar,
-        anchors={"centerx": "centerx", "top_target": algorithm_btn},
+        anchors={"top_target": algorithm_btn},
+    )
+
+    heatmap_btn = pygame_gui.elements.UIButton(
+        relative_rect=pygame.Rect(10, 20, 120, 50),
+        text="Heatmap",
+        manager=manager,
+        container=sidebar,
+        anchors={"top_target": algorithm_btn, "left_target": reset_btn},
+    )
+
+    steps_lbl = pygame_gui.elements.UILabel(
+        relative_rect=pygame.Rect(-1, 10, -1, -1),
+        text="Steps/s: 0",
+        manager=manager,
+        container=sidebar,
+        anchors={"centerx": "centerx", "top_target": reset_btn},
+    )
+
+    memory_lbl = pygame_gui.elements.UILabel(
+        relative_rect=pygame.Rect(-1, 0, -1, -1),
+        text="Memory: 0.0 MB",
+        manager=manager,
+        container=sidebar,
+        anchors={"centerx": "centerx", "top_target": steps_lbl},
     )
 
     exit_btn = pygame_gui.elements.UIButton(
-        relative_rect=pygame.Rect(-1, 40, 200, 50),
+        relative_rect=pygame.Rect(-1, 10, 200, 50),
         text="Exit",
         manager=manager,
         container=sidebar,
-        anchors={"centerx": "centerx", "top_target": reset_btn},
+        anchors={"centerx": "centerx", "top_target": memory_lbl},
     )
 
+    # the open or save dialog currently shown, only one at a time
+    file_dialog = None
+    saving = False
+
     clock = pygame.time.Clock()
 
     while run:
         dt = clock.tick() / 1000.0
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                run = False
-            if event.type == pygame_gui.UI_HORIZONTAL_SLIDER_MOVED:
-                if event.ui_element == row_slider:
-                    slider_value = row_slider.get_current_value()
-                    row_lbl.set_text(f"Rows & Columns: {slider_value}")
-            if event.type == pygame_gui.UI_DROP_DOWN_MENU_CHANGED:
-                if event.ui_element == algorithm_dropdown:
-                    selected_option = algorithm_dropdown.selected_option[0]
-                    print(selected_option)
-                    match selected_option.lower():
-                        case "breadth-first":
-                            grid.current_algorithm = Algorithms.BFS
-                        case "djikstras":
-                            grid.current_algorithm = Algorithms.DJIKSTRA
-                        case "a*":
-                            grid.current_algorithm = Algorithms.ASTAR
-                        case "bellman-ford":
-                            grid.current_algorithm = Algorithms.BELLMAN
-
-            if event.type == pygame_gui.UI_BUTTON_PRESSED:
-                if event.ui_element == generate_btn:
-                    row_slider_value = row_slider.get_current_value()
-                    grid = Grid(row_slider_value, row_slider_value)
-                if event.ui_element == algorithm_btn:
-                    grid.start_solving()
-                if event.ui_element == reset_btn:
-                    grid.reset_cells()
-                if event.ui_element == controls_btn:
-                    controls_msg = pygame_gui.windows.UIMessageWindow(
-                        rect=pygame.Rect(-1, -1, 400, 300),
-                        html_message=(
-                            "<font size='+6'><p><u>Controls</u></p></font>"
-                            "<font size='+4'><p>Drag - Left Mouse Button + Left Shift</p></font>"
-                            "<font size='+4'><p>Place Starting Cell - Left Mouse Button</p></font>"
-                            "<font size='+4'><p>Place Ending Cell - Right Mouse Button</p></font>"
-                            "<font size='+4'><p>Scroll - Scroll Wheel</p></font>"
-                        ),
-                        manager=manager,
-                        window_title="Message",
-                    )
-                if event.ui_element == exit_btn:
-                    pygame.event.post(pygame.event.Event(pygame.QUIT))
-
-            manager.process_events(event)
-            grid.event_handler(event)
+        with profiler.phase("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    run = False
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_F3:
+                        overlay.toggle()
+                        grid.redraw()
+                    if event.key == pygame.K_F4:
+                        toggle_trace()
+                    if not seed_entry.is_focused:
+                        if event.key == pygame.K_b:
+                            grid.braid()
+                        if event.key == pygame.K_w:
+                            grid.toggle_weights()
+                if event.type == pygame_gui.UI_HORIZONTAL_SLIDER_MOVED:
+                    if event.ui_element == row_slider:
+                        slider_value = row_slider.get_current_value()
+                        row_lbl.set_text(f"Rows & Columns: {slider_value}")
+                if event.type == pygame_gui.UI_DROP_DOWN_MENU_CHANGED:
+                    if event.ui_element == algorithm_dropdown:
+                        selected_option = algorithm_dropdown.selected_option[0]
+                        print(selected_option)
+                        match selected_option.lower():
+                            case "breadth-first":
+                                grid.current_algorithm = Algorithms.BFS
+                            case "djikstras":
+                                grid.current_algorithm = Algorithms.DJIKSTRA
+                            case "a*":
+                                grid.current_algorithm = Algorithms.ASTAR
+                            case "bellman-ford":
+                                grid.current_algorithm = Algorithms.BELLMAN
+                            case "bidirectional":
+                                grid.current_algorithm = Algorithms.BIDIRECTIONAL
+                    if event.ui_element == scheduler_dropdown:
+                        scheduler.mode = scheduler_dropdown.selected_option[0]
+
+                if event.type == pygame_gui.UI_WINDOW_CLOSE:
+                    if event.ui_element == file_dialog:
+                        file_dialog = None
+                if event.type == pygame_gui.UI_FILE_DIALOG_PATH_PICKED:
+                    if event.ui_element == file_dialog:
+                        if saving:
+                            done = grid.save(event.text)
+                        else:
+                            try:
+                                loaded = Grid(0, 0, path=event.text)
+                            except OSError:
+                                loaded = None
+                            if loaded:
+                                grid.close()
+                                grid = loaded
+                                seed_lbl.set_text(f"Seed: {grid.seed}")
+                            done = loaded is not None
+                        if not done:
+                            pygame_gui.windows.UIMessageWindow(
+                                rect=pygame.Rect(-1, -1, 300, 160),
+                                html_message=f"Could not {'save' if saving else 'open'} {event.text}",
+                                manager=manager,
+                                window_title="Message",
+                            )
+                if event.type == pygame_gui.UI_BUTTON_PRESSED:
+                    if event.ui_element == generate_btn:
+                        row_slider_value = row_slider.get_current_value()
+                        seed_text = seed_entry.get_text()
+                        seed = int(seed_text) % 2**64 if seed_text else None
+                        generator = GENERATOR_OPTIONS[generator_dropdown.selected_option[0]]
+                        grid.close()
+                        grid = Grid(row_slider_value, row_slider_value, seed, generator)
+                        seed_lbl.set_text(f"Seed: {grid.seed}")
+                    if event.ui_element in (open_btn, save_btn) and not file_dialog:
+                        saving = event.ui_element == save_btn
+                        file_dialog = pygame_gui.windows.UIFileDialog(
+                            rect=pygame.Rect(-1, -1, 500, 400),
+                            manager=manager,
+                            window_title="Save Maze" if saving else "Open Maze",
+                            initial_file_path=MAZE_FILE_NAME if saving else None,
+                            allow_existing_files_only=not saving,
+                        )
+                    if event.ui_element == algorithm_btn:
+                        grid.start_solving()
+                    if event.ui_element == reset_btn:
+                        grid.reset_cells()
+                    if event.ui_element == heatmap_btn:
+                        if grid.heatmap:
+                            grid.hide_heatmap()
+                        else:
+                            grid.show_heatmap()
+                    if event.ui_element == controls_btn:
+                        controls_msg = pygame_gui.windows.UIMessageWindow(
+                            rect=pygame.Rect(-1, -1, 400, 560),
+                            html_message=(
+                                "<font size='+6'><p><u>Controls</u></p></font>"
+                                "<font size='+4'><p>Drag - Left Mouse Button + Left Shift</p></font>"
+                                "<font size='+4'><p>Place Starting Cell - Left Mouse Button</p></font>"
+                                "<font size='+4'><p>Place Ending Cell - Right Mouse Button</p></font>"
+                                "<font size='+4'><p>Scroll - Scroll Wheel</p></font>"
+                                "<font size='+4'><p>Profiler Overlay - F3</p></font>"
+                                "<font size='+4'><p>Record Trace - F4</p></font>"
+                                "<font size='+4'><p>Replay Last Search - F5</p></font>"
+                                "<font size='+4'><p>Replay Play/Pause - Space</p></font>"
+                                "<font size='+4'><p>Replay Seek - Arrows, Home, End</p></font>"
+                                "<font size='+4'><p>Replay Speed - Up/Down</p></font>"
+                                "<font size='+4'><p>Braid Dead Ends - B</p></font>"
+                                "<font size='+4'><p>Toggle Cell Weights - W</p></font>"
+                            ),
+                            manager=manager,
+                            window_title="Message",
+                        )
+                    if event.ui_element == exit_btn:
+                        pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+                manager.process_events(event)
+                if not replay_bar.event_handler(grid, event):
+                    grid.event_handler(event)
+
+        with profiler.phase("scheduler"):
+            scheduler.run(grid)
+            grid.advance_replay(dt)
+        with profiler.phase("labels"):
+            steps_lbl.set_text(f"Steps/s: {scheduler.steps_per_second:,.0f}")
+            memory_lbl.set_text(f"Memory: {grid.memory_usage() / 2**20:.1f} MB")
 
         draw(grid)
         update(grid)
+        profiler.end_frame(steps=scheduler.frame_steps)
 
-    if grid.maze:
-        generator_lib.free_maze(grid.maze)
-        grid.maze = None
-    if grid.search_info:
-        generator_lib.free(grid.search_info)
-        grid.search_info = None
+    if profiler.tracing:
+        toggle_trace()
+    grid.close()
 
     pygame.quit()
     sys.exit()
 
 
-main()
+if __name__ == "__main__":
+    main()
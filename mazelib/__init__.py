@@ -0,0 +1,5 @@
+# headless bindings for the maze libraries, nothing here imports pygame
+from .bindings import Algorithms, Generators, Recording
+from .maze import Maze
+
+__all__ = ["Algorithms", "Generators", "Maze", "Recording"]
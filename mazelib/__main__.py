@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from .maze import ALGORITHMS, GENERATORS, Maze
+
+
+def timed(function, *args, **kwargs):
+    # (result, milliseconds)
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def maze_size(value):
+    # argparse type for rows and columns
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def report_solve(maze, args):
+    # False when the start or end is not in the maze
+    end = maze.num_nodes - 1 if args.end is None else args.end
+    try:
+        path, ms = timed(maze.solve, args.start, end, ALGORITHMS[args.algorithm])
+    except ValueError as error:
+        print(f"  {error}", file=sys.stderr)
+        return False
+    moves = f"{len(path) - 1} moves" if path else "no path"
+    if path and maze.weights is not None:
+        moves += f", cost {maze.path_cost(path)}"
+    print(f"  {args.algorithm}: {moves} in {ms:.2f} ms")
+
+    if args.pairs:
+        # the same pairs every run for a given maze size
+        rng = random.Random(args.pairs)
+        starts = [rng.randrange(maze.num_nodes) for _ in range(args.pairs)]
+        ends = [rng.randrange(maze.num_nodes) for _ in range(args.pairs)]
+        _, ms = timed(maze.solve_batch, starts, ends, threads=args.threads)
+        rate = args.pairs / max(ms / 1000, 1e-9)
+        print(f"  batch: {args.pairs} pairs in {ms:.2f} ms ({rate:,.0f} pairs/s)")
+
+    if args.text:
+        print(maze.to_text(path))
+    return True
+
+
+def generate(args):
+    if args.out and args.count > 1 and "{" not in args.out:
+        sys.exit("--out needs a {seed} or {index} field when --count is above 1")
+
+    failed = False
+    start = time.perf_counter()
+    for index in range(args.count):
+        seed = None if args.seed is None else args.seed + index
+        maze, ms = timed(
+            Maze, args.rows, args.cols, seed, GENERATORS[args.generator]
+        )
+        size = maze.memory_usage() / 2**20
+        print(
+            f"{maze.rows}x{maze.cols} {args.generator} seed {maze.seed}: "
+            f"generated in {ms:.2f} ms, {size:.1f} MB"
+        )
+        with maze:
+            if args.braid:
+                opened, ms = timed(maze.braid, args.braid)
+                print(f"  braided {opened} dead ends in {ms:.2f} ms")
+            if args.weights:
+                _, ms = timed(maze.random_weights, args.weights)
+                print(f"  weighted 1 to {args.weights} in {ms:.2f} ms")
+            if args.out:
+                path = args.out.format(seed=maze.seed, index=index)
+                _, ms = timed(maze.save, path)
+                print(f"  saved {path} in {ms:.2f} ms")
+            if args.solve and not report_solve(maze, args):
+                failed = True
+
+    if args.count > 1:
+        seconds = time.perf_counter() - start
+        print(f"{args.count} mazes in {seconds:.2f} s ({args.count / seconds:,.1f}/s)")
+    if failed:
+        sys.exit(1)
+
+
+def solve(args):
+    failed = False
+    for path in args.files:
+        try:
+            maze, ms = timed(Maze, path=path)
+        except OSError as error:
+            print(error, file=sys.stderr)
+            failed = True
+            continue
+        with maze:
+            print(f"{path}: {maze.rows}x{maze.cols}, loaded in {ms:.2f} ms")
+            if not report_solve(maze, args):
+                failed = True
+    if failed:
+        sys.exit(1)
+
+
+def serve(args):
+    from .server import serve
+
+    try:
+        asyncio.run(
+            serve(
+                args.host,
+                args.port,
+                args.unix,
+                args.threads,
+                ready=lambda address: print(f"Serving on {address}", flush=True),
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+def add_solve_arguments(parser):
+    parser.add_argument("--algorithm", choices=ALGORITHMS, default="bfs")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, help="defaults to the last cell")
+    parser.add_argument(
+        "--pairs", type=int, default=0, help="also time a batch of random pairs"
+    )
+    parser.add_argument("--threads", type=int, help="threads for the batch")
+    parser.add_argument(
+        "--text", action="store_true", help="print the maze and its path"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m mazelib",
+        description="Generate and solve mazes without the GUI.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="generate mazes")
+    generate_parser.add_argument("rows", type=maze_size)
+    generate_parser.add_argument("cols", type=maze_size)
+    generate_parser.add_argument(
+        "--generator", choices=GENERATORS, default="backtracking"
+    )
+    generate_parser.add_argument("--seed", type=int, help="random when left out")
+    generate_parser.add_argument("--count", type=int, default=1)
+    generate_parser.add_argument(
+        "--braid", type=float, default=0, help="fraction of dead ends to open"
+    )
+    generate_parser.add_argument(
+        "--weights", type=int, default=0, help="random cell weights up to this"
+    )
+    generate_parser.add_argument(
+        "--out", help="file to save to, may use {seed} and {index}"
+    )
+    generate_parser.add_argument(
+        "--solve", action="store_true", help="solve each maze after generating it"
+    )
+    add_solve_arguments(generate_parser)
+    generate_parser.set_defaults(run=generate)
+
+    solve_parser = commands.add_parser("solve", help="solve saved mazes")
+    solve_parser.add_argument("files", nargs="+")
+    add_solve_arguments(solve_parser)
+    solve_parser.set_defaults(run=solve)
+
+    serve_parser = commands.add_parser(
+        "serve", help="answer generate, solve and path requests over HTTP"
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--unix", help="listen on a unix socket instead")
+    serve_parser.add_argument("--threads", type=int, help="threads for the C calls")
+    serve_parser.set_defaults(run=serve)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,658 @@
+import array
+import ctypes
+import os
+import platform
+import threading
+from enum import IntEnum
+
+if platform.system() == "Windows":
+    lib_ext = "dll"
+else:
+    lib_ext = "so"
+
+
+# the shared libraries are built into lib/ next to this package
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_shared_library(filename, ext):
+    path = os.path.join(ROOT_DIR, f"{filename}.{ext}")
+    return ctypes.CDLL(path)
+
+
+# Load the libraries
+generator_lib = load_shared_library("lib/libmaze-generator", lib_ext)
+solver_lib = load_shared_library("lib/libmaze-solver", lib_ext)
+
+
+DIRECTIONS = {"TOP": 0, "RIGHT": 1, "BOTTOM": 2, "LEFT": 3}
+
+# cell weights run from 1 to this
+MAX_WEIGHT = 255
+
+
+class Algorithms(IntEnum):
+    BFS = 0
+    DJIKSTRA = 1
+    ASTAR = 2
+    BELLMAN = 3
+    BIDIRECTIONAL = 4
+
+
+class Generators(IntEnum):
+    BACKTRACKING = 0
+    KRUSKAL = 1
+    PRIM = 2
+    WILSON = 3
+    BINARY_TREE = 4
+    SIDEWINDER = 5
+
+
+class Node(ctypes.Structure):
+    pass
+
+
+Node._fields_ = [
+    ("vertex", ctypes.c_int),
+    ("row", ctypes.c_int),
+    ("col", ctypes.c_int),
+    ("walls", ctypes.POINTER(ctypes.c_bool)),
+    ("visited", ctypes.c_bool),
+    ("searched", ctypes.c_bool),
+    ("path", ctypes.c_bool),
+    ("parent", ctypes.c_int),
+    ("next", ctypes.POINTER(Node)),
+]
+
+
+class Arena(ctypes.Structure):
+    _fields_ = [
+        ("head", ctypes.c_void_p),
+        ("reserved", ctypes.c_size_t),
+    ]
+
+
+class Maze(ctypes.Structure):
+    _fields_ = [
+        ("rows", ctypes.c_int),
+        ("cols", ctypes.c_int),
+        ("num_nodes", ctypes.c_int),
+        ("nodes", ctypes.POINTER(ctypes.POINTER(Node))),
+        ("size", ctypes.c_size_t),
+        ("walls", ctypes.POINTER(ctypes.c_ubyte)),
+        ("adj_offsets", ctypes.POINTER(ctypes.c_int)),
+        ("adj", ctypes.POINTER(ctypes.c_int)),
+        ("parent", ctypes.POINTER(ctypes.c_int)),
+        ("searched", ctypes.POINTER(ctypes.c_bool)),
+        ("path", ctypes.POINTER(ctypes.c_bool)),
+        ("weights", ctypes.POINTER(ctypes.c_ubyte)),
+        ("weighted", ctypes.c_bool),
+        ("stamp", ctypes.POINTER(ctypes.c_uint)),
+        ("epoch", ctypes.c_uint),
+        ("queue", ctypes.POINTER(ctypes.c_int)),
+        ("seed", ctypes.c_uint64),
+        ("algorithm", ctypes.c_int),
+        ("arena", Arena),
+        ("adj_capacity", ctypes.c_int),
+    ]
+
+
+def buffer_view(pointer, ctype, length):
+    # wraps a C array in a memoryview without copying it
+    array = (ctype * length).from_address(ctypes.addressof(pointer.contents))
+    return memoryview(array).cast("B").cast(ctype._type_)
+
+
+class MazeBuffers:
+    def __init__(self, maze):
+        contents = maze.contents
+        num_nodes = contents.num_nodes
+        self.walls = buffer_view(contents.walls, ctypes.c_ubyte, num_nodes)
+        self.adj_offsets = buffer_view(contents.adj_offsets, ctypes.c_int, num_nodes + 1)
+        self.adj = buffer_view(contents.adj, ctypes.c_int, self.adj_offsets[num_nodes])
+        # None while every move costs 1
+        self.weights = None
+        if contents.weighted:
+            self.weights = buffer_view(contents.weights, ctypes.c_ubyte, num_nodes)
+
+
+def stream_maze(rows, cols, on_row, seed=None):
+    # on_row receives (row, walls) where walls is only valid during the call
+    @ROW_CALLBACK
+    def callback(row, walls, length, user_data):
+        on_row(row, buffer_view(walls, ctypes.c_ubyte, length))
+
+    if seed is None:
+        seed = generator_lib.random_seed()
+    return generator_lib.generate_maze_stream(rows, cols, seed, callback, None)
+
+
+class BfsInfo(ctypes.Structure):
+    _fields_ = [
+        ("max_size", ctypes.c_int),
+        ("start", ctypes.c_int),
+        ("end", ctypes.c_int),
+        ("rear", ctypes.c_int),
+        ("front", ctypes.c_int),
+        ("solved", ctypes.c_bool),
+        ("visited", ctypes.POINTER(ctypes.c_uint)),
+        ("queue", ctypes.POINTER(ctypes.c_int)),
+        ("epoch", ctypes.c_uint),
+    ]
+
+
+class DijkstraInfo(ctypes.Structure):
+    pass
+
+
+class AstarInfo(ctypes.Structure):
+    pass
+
+
+class BibfsInfo(ctypes.Structure):
+    pass
+
+
+class TreeIndexInfo(ctypes.Structure):
+    pass
+
+
+class BatchResult(ctypes.Structure):
+    _fields_ = [
+        ("count", ctypes.c_int),
+        ("lengths", ctypes.POINTER(ctypes.c_int)),
+        ("offsets", ctypes.POINTER(ctypes.c_int)),
+        ("paths", ctypes.POINTER(ctypes.c_int)),
+    ]
+
+
+class RecordingInfo(ctypes.Structure):
+    _fields_ = [
+        ("start", ctypes.c_int),
+        ("end", ctypes.c_int),
+        ("algorithm", ctypes.c_int),
+        ("steps", ctypes.c_int),
+        ("finished", ctypes.c_bool),
+        ("path", ctypes.POINTER(ctypes.c_int)),
+        ("path_length", ctypes.c_int),
+        ("data", ctypes.POINTER(ctypes.c_ubyte)),
+        ("size", ctypes.c_size_t),
+        ("capacity", ctypes.c_size_t),
+        ("last", ctypes.c_int),
+        ("keyframes", ctypes.c_void_p),
+        ("num_keyframes", ctypes.c_int),
+        ("keyframe_capacity", ctypes.c_int),
+    ]
+
+
+class SearchInfo(ctypes.Structure):
+    _fields_ = [
+        ("start", ctypes.c_int),
+        ("end", ctypes.c_int),
+        ("bfs", ctypes.POINTER(BfsInfo)),
+        ("algorithm", ctypes.c_int),
+        ("dijkstra", ctypes.POINTER(DijkstraInfo)),
+        ("astar", ctypes.POINTER(AstarInfo)),
+        ("bidirectional", ctypes.POINTER(BibfsInfo)),
+    ]
+
+
+# function prototypes
+generator_lib.generate_maze.argtypes = [ctypes.c_int, ctypes.c_int]
+generator_lib.generate_maze.restype = ctypes.POINTER(Maze)
+
+generator_lib.generate_maze_seeded.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_uint64]
+generator_lib.generate_maze_seeded.restype = ctypes.POINTER(Maze)
+
+generator_lib.generate_maze_algo.argtypes = [
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_uint64,
+]
+generator_lib.generate_maze_algo.restype = ctypes.POINTER(Maze)
+
+generator_lib.generate_maze_parallel.argtypes = [
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_uint64,
+    ctypes.c_int,
+]
+generator_lib.generate_maze_parallel.restype = ctypes.POINTER(Maze)
+
+generator_lib.random_seed.restype = ctypes.c_uint64
+
+generator_lib.free_maze.argtypes = [ctypes.POINTER(Maze)]
+
+ROW_CALLBACK = ctypes.CFUNCTYPE(
+    None, ctypes.c_int, ctypes.POINTER(ctypes.c_ubyte), ctypes.c_int, ctypes.c_void_p
+)
+generator_lib.generate_maze_stream.argtypes = [
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_uint64,
+    ROW_CALLBACK,
+    ctypes.c_void_p,
+]
+generator_lib.generate_maze_stream.restype = ctypes.c_bool
+
+generator_lib.print_graph.argtypes = [ctypes.POINTER(Maze)]
+
+generator_lib.reset_node.argtypes = [ctypes.POINTER(Node)]
+
+generator_lib.reset_search.argtypes = [ctypes.POINTER(Maze)]
+
+generator_lib.build_nodes.argtypes = [ctypes.POINTER(Maze)]
+generator_lib.build_nodes.restype = ctypes.c_bool
+
+generator_lib.save_maze.argtypes = [ctypes.POINTER(Maze), ctypes.c_char_p]
+generator_lib.save_maze.restype = ctypes.c_bool
+
+generator_lib.load_maze.argtypes = [ctypes.c_char_p]
+generator_lib.load_maze.restype = ctypes.POINTER(Maze)
+
+generator_lib.braid_maze.argtypes = [ctypes.POINTER(Maze), ctypes.c_double, ctypes.c_uint64]
+generator_lib.braid_maze.restype = ctypes.c_int
+
+generator_lib.random_weights.argtypes = [
+    ctypes.POINTER(Maze),
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_uint64,
+]
+generator_lib.random_weights.restype = ctypes.c_bool
+
+generator_lib.set_weights.argtypes = [ctypes.POINTER(Maze), ctypes.POINTER(ctypes.c_ubyte)]
+generator_lib.set_weights.restype = ctypes.c_bool
+
+generator_lib.clear_weights.argtypes = [ctypes.POINTER(Maze)]
+
+generator_lib.render_heatmap.argtypes = [
+    ctypes.POINTER(Maze),
+    ctypes.POINTER(ctypes.c_int),
+    ctypes.c_void_p,
+    ctypes.c_int,
+    ctypes.POINTER(ctypes.c_uint32),
+    ctypes.c_int,
+    ctypes.c_uint32,
+]
+
+generator_lib.render_tile.argtypes = [
+    ctypes.POINTER(Maze),
+    ctypes.c_void_p,
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.POINTER(ctypes.c_ubyte),
+    ctypes.POINTER(ctypes.c_uint32),
+    ctypes.c_uint32,
+]
+
+
+solver_lib.solve_maze.argtypes = [ctypes.POINTER(Maze)]
+
+solver_lib.create_search_info.argtypes = [
+    ctypes.POINTER(Maze),
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_int,
+]
+solver_lib.create_search_info.restype = ctypes.POINTER(SearchInfo)
+
+solver_lib.restart_search_info.argtypes = [
+    ctypes.POINTER(Maze),
+    ctypes.POINTER(SearchInfo),
+    ctypes.c_int,
+    ctypes.c_int,
+]
+
+solver_lib.free_search_info.argtypes = [ctypes.POINTER(SearchInfo)]
+
+solver_lib.search_info_size.argtypes = [ctypes.POINTER(SearchInfo)]
+solver_lib.search_info_size.restype = ctypes.c_size_t
+
+solver_lib.create_bfs_info.argtypes = [ctypes.POINTER(Maze), ctypes.c_int, ctypes.c_int]
+solver_lib.create_bfs_info.restype = ctypes.POINTER(BfsInfo)
+
+solver_lib.free_bfs_info.argtypes = [ctypes.POINTER(BfsInfo)]
+
+solver_lib.shortest_path.argtypes = [ctypes.POINTER(Maze), ctypes.POINTER(SearchInfo)]
+
+solver_lib.search_path.argtypes = [
+    ctypes.POINTER(Maze),
+    ctypes.c_int,
+    ctypes.POINTER(ctypes.c_int),
+]
+solver_lib.search_path.restype = ctypes.c_int
+
+solver_lib.bfs_step.argtypes = [ctypes.POINTER(Maze), ctypes.POINTER(BfsInfo)]
+solver_lib.bfs_step.restype = ctypes.c_int
+
+for name, info in (
+    ("dijkstra", DijkstraInfo),
+    ("astar", AstarInfo),
+    ("bibfs", BibfsInfo),
+):
+    create = getattr(solver_lib, f"create_{name}_info")
+    create.argtypes = [ctypes.POINTER(Maze), ctypes.c_int, ctypes.c_int]
+    create.restype = ctypes.POINTER(info)
+
+    getattr(solver_lib, f"free_{name}_info").argtypes = [ctypes.POINTER(info)]
+
+    step = getattr(solver_lib, f"{name}_step")
+    step.argtypes = [ctypes.POINTER(Maze), ctypes.POINTER(info)]
+    step.restype = ctypes.c_int
+
+solver_lib.bfs_step_n.argtypes = [
+    ctypes.POINTER(Maze),
+    ctypes.POINTER(BfsInfo),
+    ctypes.c_int,
+    ctypes.POINTER(ctypes.c_int),
+]
+solver_lib.bfs_step_n.restype = ctypes.c_int
+
+solver_lib.search_step.argtypes = [ctypes.POINTER(Maze), ctypes.POINTER(SearchInfo)]
+solver_lib.search_step.restype = ctypes.c_int
+
+solver_lib.search_step_n.argtypes = [
+    ctypes.POINTER(Maze),
+    ctypes.POINTER(SearchInfo),
+    ctypes.c_int,
+    ctypes.POINTER(ctypes.c_int),
+]
+solver_lib.search_step_n.restype = ctypes.c_int
+
+solver_lib.search_record_n.argtypes = [
+    ctypes.POINTER(Maze),
+    ctypes.POINTER(SearchInfo),
+    ctypes.POINTER(RecordingInfo),
+    ctypes.c_int,
+    ctypes.POINTER(ctypes.c_int),
+]
+solver_lib.search_record_n.restype = ctypes.c_int
+
+solver_lib.create_recording.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int]
+solver_lib.create_recording.restype = ctypes.POINTER(RecordingInfo)
+
+solver_lib.restart_recording.argtypes = [
+    ctypes.POINTER(RecordingInfo),
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_int,
+]
+
+solver_lib.free_recording.argtypes = [ctypes.POINTER(RecordingInfo)]
+
+solver_lib.recording_size.argtypes = [ctypes.POINTER(RecordingInfo)]
+solver_lib.recording_size.restype = ctypes.c_size_t
+
+solver_lib.replay_steps.argtypes = [
+    ctypes.POINTER(RecordingInfo),
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.POINTER(ctypes.c_int),
+    ctypes.POINTER(ctypes.c_int),
+]
+solver_lib.replay_steps.restype = ctypes.c_int
+
+solver_lib.save_recording.argtypes = [
+    ctypes.POINTER(Maze),
+    ctypes.POINTER(RecordingInfo),
+    ctypes.c_char_p,
+]
+solver_lib.save_recording.restype = ctypes.c_bool
+
+solver_lib.load_recording.argtypes = [ctypes.c_char_p]
+solver_lib.load_recording.restype = ctypes.POINTER(RecordingInfo)
+
+for name in ("bfs", "dijkstra", "astar", "bibfs"):
+    instant = getattr(solver_lib, f"instant_{name}")
+    instant.argtypes = [ctypes.POINTER(Maze), ctypes.c_int, ctypes.c_int]
+    instant.restype = ctypes.c_int
+
+solver_lib.build_tree_index.argtypes = [ctypes.POINTER(Maze)]
+solver_lib.build_tree_index.restype = ctypes.POINTER(TreeIndexInfo)
+
+solver_lib.free_tree_index.argtypes = [ctypes.POINTER(TreeIndexInfo)]
+
+for name in ("tree_lca", "path_length"):
+    query = getattr(solver_lib, name)
+    query.argtypes = [ctypes.POINTER(TreeIndexInfo), ctypes.c_int, ctypes.c_int]
+    query.restype = ctypes.c_int
+
+solver_lib.tree_path.argtypes = [
+    ctypes.POINTER(TreeIndexInfo),
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.POINTER(ctypes.c_int),
+]
+solver_lib.tree_path.restype = ctypes.c_int
+
+solver_lib.solve_batch.argtypes = [
+    ctypes.POINTER(Maze),
+    ctypes.POINTER(TreeIndexInfo),
+    ctypes.POINTER(ctypes.c_int),
+    ctypes.POINTER(ctypes.c_int),
+    ctypes.c_int,
+    ctypes.c_bool,
+    ctypes.c_int,
+]
+solver_lib.solve_batch.restype = ctypes.POINTER(BatchResult)
+
+solver_lib.free_batch_result.argtypes = [ctypes.POINTER(BatchResult)]
+
+solver_lib.distance_field.argtypes = [
+    ctypes.POINTER(Maze),
+    ctypes.POINTER(ctypes.c_int),
+    ctypes.c_int,
+    ctypes.POINTER(ctypes.c_int),
+]
+solver_lib.distance_field.restype = ctypes.c_int
+
+solver_lib.maze_diameter.argtypes = [
+    ctypes.POINTER(Maze),
+    ctypes.POINTER(ctypes.c_int),
+    ctypes.POINTER(ctypes.c_int),
+]
+solver_lib.maze_diameter.restype = ctypes.c_int
+
+
+def search_path(maze, end):
+    # vertices from end back towards the start, as found by the last search
+    buffer = (ctypes.c_int * maze.contents.num_nodes)()
+    count = solver_lib.search_path(maze, end, buffer)
+    return buffer[:count]
+
+
+class TreeIndex:
+    # any-pair paths on a perfect maze without searching, built once per maze
+    def __init__(self, maze):
+        self.index = solver_lib.build_tree_index(maze)
+        if not self.index:
+            raise ValueError("maze is not a spanning tree")
+        self.buffer = (ctypes.c_int * 0)()
+
+    def path_length(self, a, b):
+        return solver_lib.path_length(self.index, a, b)
+
+    def path(self, a, b):
+        # cells from a to b inclusive
+        length = self.path_length(a, b) + 1
+        if len(self.buffer) < length:
+            self.buffer = (ctypes.c_int * length)()
+        count = solver_lib.tree_path(self.index, a, b, self.buffer)
+        return self.buffer[:count]
+
+    def close(self):
+        if self.index:
+            solver_lib.free_tree_index(self.index)
+            self.index = None
+
+
+class Recording:
+    # the order a search expanded its cells in, recorded as it runs and
+    # decoded again from any step
+    def __init__(self, start=0, end=0, algorithm=Algorithms.BFS, pointer=None):
+        self.recording = pointer or solver_lib.create_recording(start, end, algorithm)
+        if not self.recording:
+            raise MemoryError("recording failed")
+
+    @classmethod
+    def load(cls, path):
+        # None when the file holds a maze without a recording
+        pointer = solver_lib.load_recording(os.fsencode(path))
+        return cls(pointer=pointer) if pointer else None
+
+    def restart(self, start, end, algorithm):
+        solver_lib.restart_recording(self.recording, start, end, algorithm)
+
+    def step_count(self):
+        return self.recording.contents.steps
+
+    def finished(self):
+        return self.recording.contents.finished
+
+    def steps(self, first, last, parents=False):
+        # cells expanded from step first up to last, and with parents the
+        # cell each was reached from, -1 for the start
+        length = max(0, min(last, self.step_count()) - max(first, 0))
+        vertices = array.array("i", bytes(4 * length))
+        sources = array.array("i", bytes(4 * length)) if parents else None
+        pointer = ctypes.POINTER(ctypes.c_int)
+        count = solver_lib.replay_steps(
+            self.recording,
+            first,
+            last,
+            ctypes.cast(vertices.buffer_info()[0], pointer),
+            ctypes.cast(sources.buffer_info()[0], pointer) if parents else None,
+        )
+        del vertices[count:]
+        if not parents:
+            return vertices
+        del sources[count:]
+        return vertices, sources
+
+    def path(self):
+        # cells from start to end inclusive, empty until the search finished
+        # or when it found no path
+        contents = self.recording.contents
+        return copy_ints(contents.path, contents.path_length)
+
+    def memory_usage(self):
+        return solver_lib.recording_size(self.recording)
+
+    def save(self, maze, path):
+        # the maze is saved with it, load_maze reads the file as a plain maze
+        if not solver_lib.save_recording(maze, self.recording, os.fsencode(path)):
+            raise OSError(f"could not save recording to {path}")
+
+    def close(self):
+        if self.recording:
+            solver_lib.free_recording(self.recording)
+            self.recording = None
+
+
+def copy_ints(pointer, length):
+    # copies a C int array into a python owned array.array in one go
+    ints = array.array("i")
+    if length > 0:
+        ints.frombytes(buffer_view(pointer, ctypes.c_int, length).cast("B"))
+    return ints
+
+
+def solve_batch(maze, starts, ends, paths=False, threads=None, index=None):
+    # returns (lengths, offsets, cells) as int arrays, lengths[i] is -1 when
+    # the pair has no path. with paths the cells of pair i from start to end
+    # are cells[offsets[i]:offsets[i + 1]], otherwise offsets and cells are None
+    starts = array.array("i", starts)
+    ends = array.array("i", ends)
+    if len(starts) != len(ends):
+        raise ValueError("starts and ends must be the same length")
+    count = len(starts)
+    pointer = ctypes.POINTER(ctypes.c_int)
+
+    result = solver_lib.solve_batch(
+        maze,
+        index.index if index else None,
+        ctypes.cast(starts.buffer_info()[0], pointer),
+        ctypes.cast(ends.buffer_info()[0], pointer),
+        count,
+        paths,
+        threads or os.cpu_count() or 1,
+    )
+    if not result:
+        raise MemoryError("batch solve failed")
+
+    try:
+        contents = result.contents
+        lengths = copy_ints(contents.lengths, count)
+        if not paths:
+            return lengths, None, None
+        offsets = copy_ints(contents.offsets, count + 1)
+        return lengths, offsets, copy_ints(contents.paths, offsets[count])
+    finally:
+        solver_lib.free_batch_result(result)
+
+
+def distance_field(maze, sources):
+    # distance from the nearest source to every cell, -1 where unreachable
+    sources = array.array("i", sources)
+    dist = array.array("i", bytes(4 * maze.contents.num_nodes))
+    pointer = ctypes.POINTER(ctypes.c_int)
+    reached = solver_lib.distance_field(
+        maze,
+        ctypes.cast(sources.buffer_info()[0], pointer),
+        len(sources),
+        ctypes.cast(dist.buffer_info()[0], pointer),
+    )
+    if reached < 0:
+        raise MemoryError("distance field failed")
+    return dist
+
+
+def maze_diameter(maze):
+    # (a, b, length) for the two cells furthest apart
+    a = ctypes.c_int()
+    b = ctypes.c_int()
+    length = solver_lib.maze_diameter(maze, ctypes.byref(a), ctypes.byref(b))
+    if length < 0:
+        raise MemoryError("diameter failed")
+    return a.value, b.value, length
+
+
+class SolverWorker(threading.Thread):
+    # runs a search off the main thread, ctypes releases the GIL while in C
+    def __init__(self, maze, search_info, results, chunk=4096, recording=None):
+        super().__init__(daemon=True)
+        self.maze = maze
+        self.search_info = search_info
+        self.recording = recording
+        self.results = results
+        self.chunk = chunk
+        self.steps = 0
+        self.cancelled = threading.Event()
+
+    def run(self):
+        buffer = (ctypes.c_int * self.chunk)()
+        while not self.cancelled.is_set():
+            count = solver_lib.search_record_n(
+                self.maze, self.search_info, self.recording, self.chunk, buffer
+            )
+            self.steps += count
+            if count:
+                self.results.append(("search", buffer[:count]))
+
+            if count < self.chunk:
+                solver_lib.shortest_path(self.maze, self.search_info)
+                end = self.search_info.contents.end
+                self.results.append(("path", search_path(self.maze, end)))
+                return
+
+    def cancel(self):
+        self.cancelled.set()
+        self.join()
@@ -0,0 +1,263 @@
+import ctypes
+import os
+
+from .bindings import (
+    DIRECTIONS,
+    MAX_WEIGHT,
+    Algorithms,
+    Generators,
+    MazeBuffers,
+    Recording,
+    TreeIndex,
+    distance_field,
+    generator_lib,
+    maze_diameter,
+    search_path,
+    solve_batch,
+    solver_lib,
+)
+
+# names used on the command line and by the service
+GENERATORS = {generator.name.lower(): generator for generator in Generators}
+
+ALGORITHMS = {
+    "bfs": Algorithms.BFS,
+    "dijkstra": Algorithms.DJIKSTRA,
+    "astar": Algorithms.ASTAR,
+    "bidirectional": Algorithms.BIDIRECTIONAL,
+}
+
+# random weights change over areas about this many cells across
+WEIGHT_SCALE = 8
+
+# searches run to completion in one C call
+INSTANT_SOLVERS = {
+    Algorithms.BFS: solver_lib.instant_bfs,
+    Algorithms.DJIKSTRA: solver_lib.instant_dijkstra,
+    Algorithms.ASTAR: solver_lib.instant_astar,
+    Algorithms.BIDIRECTIONAL: solver_lib.instant_bibfs,
+}
+
+
+class Maze:
+    # a generated or loaded maze, vertices run row by row from the top left
+    def __init__(
+        self, rows=None, cols=None, seed=None, generator=Generators.BACKTRACKING, path=None
+    ):
+        self.index = None
+        self.index_built = False
+
+        if path:
+            self.maze = generator_lib.load_maze(os.fsencode(path))
+            if not self.maze:
+                raise OSError(f"could not load maze from {path}")
+        else:
+            if rows < 1 or cols < 1:
+                raise ValueError("a maze needs at least one row and one column")
+            if seed is None:
+                seed = generator_lib.random_seed()
+            self.maze = generator_lib.generate_maze_algo(rows, cols, generator, seed)
+            if not self.maze:
+                raise MemoryError("maze generation failed")
+
+        contents = self.maze.contents
+        self.rows, self.cols = contents.rows, contents.cols
+        self.num_nodes = contents.num_nodes
+        self.seed = contents.seed
+        self.generator = contents.algorithm
+        self.buffers = MazeBuffers(self.maze)
+
+    def vertex(self, row, col):
+        return row * self.cols + col
+
+    def check_vertex(self, vertex, name="vertex"):
+        # the C solvers index straight into the maze with these
+        if not 0 <= vertex < self.num_nodes:
+            raise ValueError(f"{name} must be a cell between 0 and {self.num_nodes - 1}")
+        return vertex
+
+    def memory_usage(self):
+        # bytes held by the maze on the C side
+        return self.maze.contents.size
+
+    def tree_index(self):
+        # built on first use, None when the maze has loops
+        if not self.index_built:
+            self.index_built = True
+            try:
+                self.index = TreeIndex(self.maze)
+            except ValueError:
+                self.index = None
+        return self.index
+
+    def braid(self, fraction=0.5, seed=None):
+        # opens a wall at that fraction of the dead ends, returns how many
+        # were opened. the maze has loops afterwards unless none were
+        opened = generator_lib.braid_maze(
+            self.maze, fraction, self.seed if seed is None else seed
+        )
+        if opened < 0:
+            raise MemoryError("braiding failed")
+        if self.index:
+            self.index.close()
+        self.index = None
+        self.index_built = False
+        self.buffers = MazeBuffers(self.maze)
+        return opened
+
+    @property
+    def weights(self):
+        # cost of moving into each cell, None when every move costs 1
+        return self.buffers.weights
+
+    def set_weights(self, weights):
+        # one weight from 1 to MAX_WEIGHT per cell, 0 is taken as 1
+        weights = bytes(weights)
+        if len(weights) != self.num_nodes:
+            raise ValueError(f"expected {self.num_nodes} weights, got {len(weights)}")
+        cells = (ctypes.c_ubyte * self.num_nodes).from_buffer_copy(weights)
+        if not generator_lib.set_weights(self.maze, cells):
+            raise MemoryError("setting weights failed")
+        self.buffers = MazeBuffers(self.maze)
+
+    def random_weights(self, max_weight=9, scale=WEIGHT_SCALE, seed=None):
+        # smooth random weights from 1 to max_weight
+        if not 1 <= max_weight <= MAX_WEIGHT:
+            raise ValueError(f"max_weight must be between 1 and {MAX_WEIGHT}")
+        seed = self.seed if seed is None else seed
+        if not generator_lib.random_weights(self.maze, max_weight, scale, seed):
+            raise MemoryError("generating weights failed")
+        self.buffers = MazeBuffers(self.maze)
+
+    def clear_weights(self):
+        generator_lib.clear_weights(self.maze)
+        self.buffers = MazeBuffers(self.maze)
+
+    def path_cost(self, path):
+        # cost of following path, every cell after the first costs its weight
+        weights = self.weights
+        if not path:
+            return -1
+        if weights is None:
+            return len(path) - 1
+        return sum(weights[vertex] for vertex in path[1:])
+
+    def solve(self, start=0, end=None, algorithm=Algorithms.BFS):
+        # cells from start to end inclusive, empty when there is no path
+        if end is None:
+            end = self.num_nodes - 1
+        self.check_vertex(start, "start")
+        self.check_vertex(end, "end")
+        instant = INSTANT_SOLVERS.get(algorithm, solver_lib.instant_bfs)
+        instant(self.maze, start, end)
+        if start == end:
+            return [start]
+        cells = search_path(self.maze, end)
+        if not cells:
+            return []
+        cells.append(start)
+        cells.reverse()
+        return cells
+
+    def path(self, start=0, end=None):
+        # like solve, but answered from the tree index on perfect mazes
+        if end is None:
+            end = self.num_nodes - 1
+        self.check_vertex(start, "start")
+        self.check_vertex(end, "end")
+        index = self.tree_index()
+        if index:
+            return index.path(start, end)
+        return self.solve(start, end)
+
+    def path_length(self, start=0, end=None):
+        # number of moves between two cells, -1 when there is no path
+        if end is None:
+            end = self.num_nodes - 1
+        self.check_vertex(start, "start")
+        self.check_vertex(end, "end")
+        index = self.tree_index()
+        if index:
+            return index.path_length(start, end)
+        return len(self.solve(start, end)) - 1
+
+    def solve_batch(self, starts, ends, paths=False, threads=None):
+        # lengths are path costs on a weighted maze, found with dijkstra
+        return solve_batch(
+            self.maze, starts, ends, paths, threads, index=self.tree_index()
+        )
+
+    def distance_field(self, sources):
+        return distance_field(self.maze, sources)
+
+    def diameter(self):
+        return maze_diameter(self.maze)
+
+    def record(self, start=0, end=None, algorithm=Algorithms.BFS, chunk=4096):
+        # runs a whole search and returns the Recording of it
+        if end is None:
+            end = self.num_nodes - 1
+        self.check_vertex(start, "start")
+        self.check_vertex(end, "end")
+        info = solver_lib.create_search_info(self.maze, start, end, algorithm)
+        recording = Recording(start, end, info.contents.algorithm)
+        buffer = (ctypes.c_int * chunk)()
+        try:
+            count = chunk
+            while count == chunk:
+                count = solver_lib.search_record_n(
+                    self.maze, info, recording.recording, chunk, buffer
+                )
+        finally:
+            solver_lib.free_search_info(info)
+        return recording
+
+    def save(self, path, recording=None):
+        # with a recording the file holds both, it still opens as a maze
+        if recording:
+            recording.save(self.maze, path)
+        elif not generator_lib.save_maze(self.maze, os.fsencode(path)):
+            raise OSError(f"could not save maze to {path}")
+
+    def to_text(self, path=()):
+        # draws the maze with +, - and |, cells on path are marked with ()
+        walls = self.buffers.walls
+        marked = set(path)
+        top = 1 << DIRECTIONS["TOP"]
+        right = 1 << DIRECTIONS["RIGHT"]
+        bottom = 1 << DIRECTIONS["BOTTOM"]
+        left = 1 << DIRECTIONS["LEFT"]
+
+        lines = []
+        for row in range(self.rows):
+            first = self.vertex(row, 0)
+            cells = range(first, first + self.cols)
+            lines.append(
+                "+" + "".join("--+" if walls[v] & top else "  +" for v in cells)
+            )
+            lines.append(
+                ("|" if walls[first] & left else " ")
+                + "".join(
+                    ("()" if v in marked else "  ") + ("|" if walls[v] & right else " ")
+                    for v in cells
+                )
+            )
+        last = self.vertex(self.rows - 1, 0)
+        cells = range(last, last + self.cols)
+        lines.append("+" + "".join("--+" if walls[v] & bottom else "  +" for v in cells))
+        return "\n".join(lines)
+
+    def close(self):
+        if self.index:
+            self.index.close()
+            self.index = None
+        if self.maze:
+            self.buffers = None
+            generator_lib.free_maze(self.maze)
+            self.maze = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
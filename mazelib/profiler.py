@@ -0,0 +1,210 @@
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+# frames kept for the percentiles
+FRAME_HISTORY = 300
+
+# oldest trace events are dropped past this, about 100 MB of json
+TRACE_EVENT_LIMIT = 500_000
+
+# stands in for a phase while profiling is off
+NULL_PHASE = contextlib.nullcontext()
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, "phase", self.start, time.perf_counter_ns())
+
+
+class FrameProfiler:
+    # times named phases of each frame and, while enabled, every call into the
+    # given ctypes libraries. disabled it costs one attribute check per phase
+    def __init__(self, libraries=None, history=FRAME_HISTORY):
+        self.libraries = libraries or {}
+        self.enabled = False
+        self.tracing = False
+        self.originals = []
+        self.main_thread = threading.get_ident()
+
+        # milliseconds per name for the frame in progress, then per frame
+        self.current = collections.defaultdict(float)
+        self.history = {}
+        self.history_length = history
+        self.frames = collections.deque(maxlen=history)
+        self.frame_start = None
+        self.phase_names = []
+        self.call_names = []
+
+        self.epoch = time.perf_counter_ns()
+        self.events = collections.deque(maxlen=TRACE_EVENT_LIMIT)
+        self.threads = {}
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.frame_start = None
+        for category, lib in self.libraries.items():
+            self.instrument(lib, category)
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.tracing = False
+        # put the plain ctypes functions back so nothing is left to pay for
+        for lib, name, function in self.originals:
+            setattr(lib, name, function)
+        self.originals.clear()
+
+    def instrument(self, lib, category):
+        # ctypes caches each function it has handed out on the library, those
+        # are the ones the bindings gave argtypes to
+        for name, function in list(vars(lib).items()):
+            if name.startswith("_") or not callable(function):
+                continue
+            self.originals.append((lib, name, function))
+            setattr(lib, name, self.timed_call(function, name, category))
+
+    def timed_call(self, function, name, category):
+        def call(*args):
+            start = time.perf_counter_ns()
+            try:
+                return function(*args)
+            finally:
+                self.record(name, category, start, time.perf_counter_ns())
+
+        return call
+
+    def phase(self, name):
+        if not self.enabled:
+            return NULL_PHASE
+        return Phase(self, name)
+
+    def record(self, name, category, start, end):
+        thread = threading.get_ident()
+        # other threads overlap the frame, they only show up in the trace
+        if thread == self.main_thread:
+            if name not in self.current:
+                names = self.phase_names if category == "phase" else self.call_names
+                if name not in names:
+                    names.append(name)
+            self.current[name] += (end - start) / 1e6
+        if self.tracing:
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (start - self.epoch) / 1000,
+                    "dur": (end - start) / 1000,
+                    "pid": os.getpid(),
+                    "tid": self.thread_id(thread),
+                }
+            )
+
+    def thread_id(self, thread):
+        if thread not in self.threads:
+            self.threads[thread] = threading.current_thread().name
+        return thread
+
+    def end_frame(self, **counters):
+        # closes the frame that began at the last call, counters such as the
+        # steps taken are kept alongside the phase times
+        now = time.perf_counter_ns()
+        if not self.enabled:
+            self.current.clear()
+            return
+        if self.frame_start is not None:
+            self.frames.append((now - self.frame_start) / 1e6)
+            for name in self.phase_names + self.call_names:
+                self.sample(name, self.current.get(name, 0.0))
+            for name, value in counters.items():
+                self.sample(name, value)
+
+            if self.tracing:
+                pid = os.getpid()
+                self.events.append(
+                    {
+                        "name": "frame",
+                        "cat": "frame",
+                        "ph": "X",
+                        "ts": (self.frame_start - self.epoch) / 1000,
+                        "dur": (now - self.frame_start) / 1000,
+                        "pid": pid,
+                        "tid": self.thread_id(self.main_thread),
+                    }
+                )
+                if counters:
+                    self.events.append(
+                        {
+                            "name": "counters",
+                            "ph": "C",
+                            "ts": (now - self.epoch) / 1000,
+                            "pid": pid,
+                            "args": counters,
+                        }
+                    )
+        self.current.clear()
+        self.frame_start = now
+
+    def sample(self, name, value):
+        if name not in self.history:
+            self.history[name] = collections.deque(maxlen=self.history_length)
+        self.history[name].append(value)
+
+    def stats(self, name=None):
+        # (last, p50, p99) of the frame times or of one phase, call or counter
+        values = self.frames if name is None else self.history.get(name, ())
+        if not values:
+            return 0.0, 0.0, 0.0
+        return values[-1], percentile(values, 50), percentile(values, 99)
+
+    def start_trace(self):
+        self.enable()
+        self.events.clear()
+        self.tracing = True
+
+    def stop_trace(self, path):
+        # writes the chrome trace event format, open it in chrome://tracing
+        # or ui.perfetto.dev
+        self.tracing = False
+        pid = os.getpid()
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": thread,
+                "args": {"name": name},
+            }
+            for thread, name in self.threads.items()
+        ]
+        with open(path, "w") as file:
+            json.dump(
+                {"traceEvents": metadata + list(self.events), "displayTimeUnit": "ms"},
+                file,
+            )
+        count = len(self.events)
+        self.events.clear()
+        return count
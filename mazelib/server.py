@@ -0,0 +1,437 @@
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import time
+
+from .bindings import MAX_WEIGHT, generator_lib
+from .maze import ALGORITHMS, GENERATORS, Maze
+
+# mazes kept in memory, whichever limit is reached first evicts the oldest
+CACHE_SIZE = 64
+CACHE_BYTES = 512 * 2**20
+
+# the largest maze a request may ask for
+MAX_CELLS = 4000 * 4000
+
+# path queries taken into one batch, the rest wait for the next
+BATCH_LIMIT = 8192
+
+MAX_BODY = 16 * 2**20
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class RequestError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def maze_key(body):
+    # (rows, cols, generator, seed, braid, weights) named by a request
+    try:
+        rows = int(body["rows"])
+        cols = int(body["cols"])
+        seed = body.get("seed")
+        seed = None if seed is None else int(seed) % 2**64
+        braid = float(body.get("braid", 0))
+        weights = int(body.get("weights", 0))
+    except (KeyError, TypeError, ValueError):
+        raise RequestError(
+            "rows, cols and weights must be integers, seed an integer if given "
+            "and braid a number"
+        )
+    generator = body.get("generator", "backtracking")
+    if generator not in GENERATORS:
+        raise RequestError(f"generator must be one of {', '.join(GENERATORS)}")
+    if rows < 1 or cols < 1 or rows * cols > MAX_CELLS:
+        raise RequestError(f"a maze must have between 1 and {MAX_CELLS} cells")
+    if not 0 <= braid <= 1:
+        raise RequestError("braid must be between 0 and 1")
+    if not 0 <= weights <= MAX_WEIGHT:
+        raise RequestError(f"weights must be between 0 and {MAX_WEIGHT}")
+    return rows, cols, generator, seed, braid, weights
+
+
+def build_maze(key):
+    # runs on the thread pool, the same key always gives the same maze
+    rows, cols, generator, seed, braid, weights = key
+    maze = Maze(rows, cols, seed, GENERATORS[generator])
+    try:
+        if braid:
+            maze.braid(braid)
+        if weights:
+            maze.random_weights(weights)
+    except Exception:
+        maze.close()
+        raise
+    return maze
+
+
+def check_vertex(maze, value, name):
+    if isinstance(value, bool) or not isinstance(value, int):
+        value = None
+    if value is None or not 0 <= value < maze.num_nodes:
+        raise RequestError(f"{name} must be a cell between 0 and {maze.num_nodes - 1}")
+    return value
+
+
+class CachedMaze:
+    # a maze shared by requests, searches write into it so C calls on it are
+    # taken one at a time, and path queries that arrive while one runs are
+    # answered together by the next
+    def __init__(self, service, key, maze):
+        self.service = service
+        self.key = key
+        self.maze = maze
+        self.size = maze.memory_usage()
+        self.lock = asyncio.Lock()
+        self.pending = []
+        self.flushing = None
+        self.users = 0
+        self.evicted = False
+
+    async def run(self, function, *args):
+        self.users += 1
+        try:
+            async with self.lock:
+                return await self.service.offload(function, *args)
+        finally:
+            self.users -= 1
+            self.release()
+
+    async def query(self, pairs, paths):
+        futures = []
+        for start, end in pairs:
+            future = asyncio.get_running_loop().create_future()
+            self.pending.append((start, end, paths, future))
+            futures.append(future)
+        if not self.flushing:
+            self.flushing = asyncio.create_task(self.flush())
+        self.users += 1
+        try:
+            return await asyncio.gather(*futures)
+        finally:
+            self.users -= 1
+            self.release()
+
+    async def flush(self):
+        try:
+            while self.pending:
+                batch = self.pending[:BATCH_LIMIT]
+                del self.pending[:BATCH_LIMIT]
+                try:
+                    results = await self.run(self.solve, batch)
+                except Exception as error:
+                    results = [error] * len(batch)
+                self.service.batches += 1
+                self.service.batched += len(batch)
+                for (_, _, _, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+        finally:
+            self.flushing = None
+
+    def solve(self, batch):
+        # runs on the thread pool, every pair in one solve_batch call
+        paths = any(wants_path for _, _, wants_path, _ in batch)
+        lengths, offsets, cells = self.maze.solve_batch(
+            [start for start, _, _, _ in batch],
+            [end for _, end, _, _ in batch],
+            paths=paths,
+        )
+
+        results = []
+        for i, (_, _, wants_path, _) in enumerate(batch):
+            if wants_path:
+                path = cells[offsets[i] : offsets[i + 1]].tolist()
+                results.append((lengths[i], path))
+            else:
+                results.append((lengths[i], None))
+        return results
+
+    def release(self):
+        # an evicted maze is freed once nothing is using it
+        if self.evicted and not self.users and not self.pending and self.maze:
+            self.maze.close()
+            self.maze = None
+
+
+class MazeService:
+    def __init__(self, threads=None, cache_size=CACHE_SIZE, cache_bytes=CACHE_BYTES):
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=threads or os.cpu_count() or 1
+        )
+        self.cache = collections.OrderedDict()
+        self.cache_size = cache_size
+        self.cache_bytes = cache_bytes
+        self.loading = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.batched = 0
+        self.requests = 0
+
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/stats"): self.stats,
+            ("POST", "/generate"): self.generate,
+            ("POST", "/solve"): self.solve,
+            ("POST", "/path"): self.path,
+        }
+
+    async def offload(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, function, *args
+        )
+
+    async def get_maze(self, key):
+        # (entry, cached), mazes asked for at once are only generated once
+        entry = self.cache.get(key)
+        if entry:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return entry, True
+
+        if key not in self.loading:
+            self.misses += 1
+            self.loading[key] = [asyncio.ensure_future(self.load(key)), 0]
+        loading = self.loading[key]
+        loading[1] += 1
+        entry = await asyncio.shield(loading[0])
+        # the caller takes its own hold before it next awaits, so the one the
+        # load kept for this waiter is let go on the next loop iteration
+        entry.users -= 1
+        asyncio.get_running_loop().call_soon(entry.release)
+        return entry, False
+
+    async def load(self, key):
+        # one entry per load, held once for every waiter so it cannot be
+        # evicted and freed before they have all resumed
+        try:
+            maze = await self.offload(build_maze, key)
+        finally:
+            _, waiters = self.loading.pop(key)
+        entry = CachedMaze(self, key, maze)
+        entry.users = waiters
+        self.cache[key] = entry
+        self.evict()
+        return entry
+
+    def evict(self):
+        used = sum(entry.size for entry in self.cache.values())
+        while len(self.cache) > 1 and (
+            len(self.cache) > self.cache_size or used > self.cache_bytes
+        ):
+            _, entry = self.cache.popitem(last=False)
+            used -= entry.size
+            entry.evicted = True
+            entry.release()
+
+    async def seeded_maze(self, body):
+        key = maze_key(body)
+        if key[3] is None:
+            raise RequestError("seed is required to find the maze")
+        entry, _ = await self.get_maze(key)
+        return entry
+
+    async def health(self, body):
+        return {"status": "ok"}
+
+    async def stats(self, body):
+        return {
+            "requests": self.requests,
+            "cached_mazes": len(self.cache),
+            "cache_bytes": sum(entry.size for entry in self.cache.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "batches": self.batches,
+            "batched_queries": self.batched,
+            "mean_batch": self.batched / self.batches if self.batches else 0,
+        }
+
+    async def generate(self, body):
+        rows, cols, generator, seed, braid, weights = maze_key(body)
+        if seed is None:
+            seed = generator_lib.random_seed()
+        start = time.perf_counter()
+        entry, cached = await self.get_maze(
+            (rows, cols, generator, seed, braid, weights)
+        )
+        return {
+            "rows": rows,
+            "cols": cols,
+            "generator": generator,
+            "seed": seed,
+            "braid": braid,
+            "weights": weights,
+            "cached": cached,
+            "bytes": entry.size,
+            "ms": (time.perf_counter() - start) * 1000,
+        }
+
+    async def solve(self, body):
+        # one search with the chosen algorithm, the path from start to end
+        entry = await self.seeded_maze(body)
+        maze = entry.maze
+        start = check_vertex(maze, body.get("start", 0), "start")
+        end = check_vertex(maze, body.get("end", maze.num_nodes - 1), "end")
+        algorithm = body.get("algorithm", "bfs")
+        if algorithm not in ALGORITHMS:
+            raise RequestError(f"algorithm must be one of {', '.join(ALGORITHMS)}")
+
+        def search():
+            # the cost is read while the entry is still held
+            path = maze.solve(start, end, ALGORITHMS[algorithm])
+            return path, maze.path_cost(path)
+
+        path, cost = await entry.run(search)
+        return {"length": len(path) - 1, "cost": cost, "path": path}
+
+    async def path(self, body):
+        # cheapest path costs, which are the number of moves on mazes without
+        # weights, and the paths when asked, for a start and end or for a list
+        # of pairs. queries on one maze are batched together
+        entry = await self.seeded_maze(body)
+        maze = entry.maze
+        paths = bool(body.get("paths", False))
+        if "pairs" in body:
+            pairs = body["pairs"]
+            if not isinstance(pairs, list):
+                raise RequestError("pairs must be a list of [start, end]")
+            checked = []
+            for pair in pairs:
+                if not isinstance(pair, list) or len(pair) != 2:
+                    raise RequestError("pairs must be a list of [start, end]")
+                start, end = pair
+                checked.append(
+                    (check_vertex(maze, start, "start"), check_vertex(maze, end, "end"))
+                )
+            results = await entry.query(checked, paths)
+            response = {"lengths": [length for length, _ in results]}
+            if paths:
+                response["paths"] = [path for _, path in results]
+            return response
+
+        start = check_vertex(maze, body.get("start", 0), "start")
+        end = check_vertex(maze, body.get("end", maze.num_nodes - 1), "end")
+        [(length, path)] = await entry.query([(start, end)], paths)
+        response = {"length": length}
+        if paths:
+            response["path"] = path
+        return response
+
+    async def dispatch(self, method, target, body):
+        # (status, json payload)
+        self.requests += 1
+        path = target.split("?", 1)[0]
+        handler = self.routes.get((method, path))
+        if not handler:
+            if any(route == path for _, route in self.routes):
+                return 405, {"error": f"{method} not allowed on {path}"}
+            return 404, {"error": f"no such endpoint {path}"}
+        try:
+            request = json.loads(body) if body else {}
+            if not isinstance(request, dict):
+                raise RequestError("body must be a JSON object")
+            return 200, await handler(request)
+        except json.JSONDecodeError as error:
+            return 400, {"error": f"invalid JSON: {error}"}
+        except RequestError as error:
+            return error.status, {"error": str(error)}
+        except Exception as error:
+            return 500, {"error": str(error) or type(error).__name__}
+
+    async def handle_connection(self, reader, writer):
+        # HTTP/1.1 with keep-alive, one request at a time per connection
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                if len(parts) != 3:
+                    status, payload = 400, {"error": "malformed request line"}
+                    keep_alive = False
+                else:
+                    method, target, version = parts
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection != "close" and (
+                        version == "HTTP/1.1" or connection == "keep-alive"
+                    )
+                    length = int(headers.get("content-length", 0) or 0)
+                    if length > MAX_BODY:
+                        status, payload = 413, {"error": "request body too large"}
+                        keep_alive = False
+                    else:
+                        body = await reader.readexactly(length) if length else b""
+                        status, payload = await self.dispatch(method, target, body)
+
+                data = json.dumps(payload).encode()
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                        "\r\n"
+                    ).encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        for entry in self.cache.values():
+            entry.evicted = True
+            entry.release()
+        self.cache.clear()
+        self.executor.shutdown()
+
+
+async def serve(host="127.0.0.1", port=8765, unix=None, threads=None, ready=None):
+    # runs until cancelled, ready is called with a description of the address
+    service = MazeService(threads)
+    if unix:
+        server = await asyncio.start_unix_server(service.handle_connection, path=unix)
+        address = f"unix:{unix}"
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        host, port = server.sockets[0].getsockname()[:2]
+        address = f"http://{host}:{port}"
+    if ready:
+        ready(address)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+        if unix and os.path.exists(unix):
+            os.remove(unix)
@@ -0,0 +1,342 @@
+#include "../include/maze-heap.h"
+#include "../include/maze-index.h"
+#include "../include/maze.h"
+#include <pthread.h>
+#include <stdbool.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+// lengths[i] is the cost of the cheapest path for pair i, the number of
+// moves unless the maze is weighted, and -1 when it has no path.
+// offsets and paths are only filled when paths were asked for, the cells
+// of pair i from start to end are paths[offsets[i]] .. paths[offsets[i + 1] - 1]
+typedef struct {
+    int count;
+    int *lengths;
+    int *offsets;
+    int *paths;
+} batch_result;
+
+// solves pairs [first, last), each worker has its own search buffers so
+// the only thing shared between threads is the read-only maze
+typedef struct {
+    maze_t *maze;
+    tree_index *index;
+    const int *starts;
+    const int *ends;
+    int *lengths;
+    int first;
+    int last;
+    bool want_paths;
+
+    // cells in the path of pair i are kept in counts[i + 1]
+    int *counts;
+
+    unsigned int *seen;
+    unsigned int epoch;
+    int *parent;
+    int *queue;
+
+    // weighted mazes are searched with dijkstra instead of breadth first
+    int *dist;
+    radix_heap heap;
+
+    // this worker's paths back to back, in pair order
+    int *cells;
+    size_t num_cells;
+    size_t capacity;
+    bool failed;
+} batch_worker_t;
+
+void free_batch_result(batch_result *result) {
+    if (result == NULL) {
+        return;
+    }
+    free(result->lengths);
+    free(result->offsets);
+    free(result->paths);
+    free(result);
+}
+
+// reserves room for another path of length cells
+int *reserve_cells(batch_worker_t *worker, size_t length) {
+    if (worker->num_cells + length > worker->capacity) {
+        size_t capacity = worker->capacity ? worker->capacity : 1024;
+        while (capacity < worker->num_cells + length) {
+            capacity *= 2;
+        }
+        int *cells = (int *)realloc(worker->cells, sizeof(int) * capacity);
+        if (cells == NULL) {
+            return NULL;
+        }
+        worker->cells = cells;
+        worker->capacity = capacity;
+    }
+    int *out = worker->cells + worker->num_cells;
+    worker->num_cells += length;
+    return out;
+}
+
+// plain breadth first search, stops as soon as the exit is reached
+int batch_bfs(batch_worker_t *worker, int start, int end) {
+    maze_t *maze = worker->maze;
+    if (advance_epoch(&worker->epoch)) {
+        memset(worker->seen, 0, sizeof(unsigned int) * maze->num_nodes);
+    }
+
+    int front = 0;
+    int rear = 0;
+    worker->queue[0] = start;
+    worker->seen[start] = worker->epoch;
+    worker->parent[start] = -1;
+
+    while (front <= rear) {
+        int vertex = worker->queue[front++];
+        if (vertex == end) {
+            int length = 0;
+            for (int curr = end; curr != start; curr = worker->parent[curr]) {
+                length++;
+            }
+            return length;
+        }
+        for (int i = maze->adj_offsets[vertex];
+             i < maze->adj_offsets[vertex + 1]; i++) {
+            int neighbour = maze->adj[i];
+            if (worker->seen[neighbour] != worker->epoch) {
+                worker->seen[neighbour] = worker->epoch;
+                worker->parent[neighbour] = vertex;
+                worker->queue[++rear] = neighbour;
+            }
+        }
+    }
+    return -1;
+}
+
+// dijkstra on the cell weights, stops as soon as the exit is popped
+int batch_dijkstra(batch_worker_t *worker, int start, int end) {
+    maze_t *maze = worker->maze;
+    if (advance_epoch(&worker->epoch)) {
+        memset(worker->seen, 0, sizeof(unsigned int) * maze->num_nodes);
+    }
+
+    radix_clear(&worker->heap);
+    worker->dist[start] = 0;
+    worker->seen[start] = worker->epoch;
+    worker->parent[start] = -1;
+    radix_push(&worker->heap, 0, start);
+
+    while (worker->heap.size > 0) {
+        radix_entry entry = radix_pop(&worker->heap);
+        int vertex = entry.vertex;
+        // stale entries were pushed before a cheaper path turned up
+        if (vertex == -1 || (int)entry.key > worker->dist[vertex]) {
+            continue;
+        }
+        if (vertex == end) {
+            return worker->dist[end];
+        }
+        for (int i = maze->adj_offsets[vertex];
+             i < maze->adj_offsets[vertex + 1]; i++) {
+            int neighbour = maze->adj[i];
+            int dist = worker->dist[vertex] + maze->weights[neighbour];
+            if (worker->seen[neighbour] != worker->epoch ||
+                dist < worker->dist[neighbour]) {
+                worker->seen[neighbour] = worker->epoch;
+                worker->dist[neighbour] = dist;
+                worker->parent[neighbour] = vertex;
+                radix_push(&worker->heap, dist, neighbour);
+            }
+        }
+    }
+    return -1;
+}
+
+bool solve_pair(batch_worker_t *worker, int i) {
+    int start = worker->starts[i];
+    int end = worker->ends[i];
+    int num_nodes = worker->maze->num_nodes;
+    if (start < 0 || start >= num_nodes || end < 0 || end >= num_nodes) {
+        worker->lengths[i] = -1;
+        return true;
+    }
+
+    if (worker->index != NULL) {
+        int length = path_length(worker->index, start, end);
+        worker->lengths[i] = length;
+        if (worker->want_paths) {
+            int *out = reserve_cells(worker, length + 1);
+            if (out == NULL) {
+                return false;
+            }
+            tree_path(worker->index, start, end, out);
+            worker->counts[i + 1] = length + 1;
+        }
+        return true;
+    }
+
+    int length = worker->dist != NULL ? batch_dijkstra(worker, start, end)
+                                      : batch_bfs(worker, start, end);
+    worker->lengths[i] = length;
+    if (worker->want_paths && length >= 0) {
+        int cells = 1;
+        for (int curr = end; curr != start; curr = worker->parent[curr]) {
+            cells++;
+        }
+        int *out = reserve_cells(worker, cells);
+        if (out == NULL) {
+            return false;
+        }
+        // walk the parents back from the exit, filling the path from the end
+        int curr = end;
+        for (int j = cells - 1; j >= 0; j--) {
+            out[j] = curr;
+            curr = worker->parent[curr];
+        }
+        worker->counts[i + 1] = cells;
+    }
+    return true;
+}
+
+void *solve_pairs(void *arg) {
+    batch_worker_t *worker = (batch_worker_t *)arg;
+    int num_nodes = worker->maze->num_nodes;
+
+    if (worker->index == NULL) {
+        bool weighted = worker->maze->weighted;
+        worker->seen = (unsigned int *)calloc(num_nodes, sizeof(unsigned int));
+        worker->parent = (int *)malloc(sizeof(int) * num_nodes);
+        if (weighted) {
+            worker->dist = (int *)malloc(sizeof(int) * num_nodes);
+            radix_init(&worker->heap);
+        } else {
+            worker->queue = (int *)malloc(sizeof(int) * num_nodes);
+        }
+        if (worker->seen == NULL || worker->parent == NULL ||
+            (weighted ? worker->dist == NULL : worker->queue == NULL)) {
+            worker->failed = true;
+        }
+    }
+
+    for (int i = worker->first; i < worker->last && !worker->failed; i++) {
+        worker->failed = !solve_pair(worker, i);
+    }
+
+    free(worker->seen);
+    free(worker->parent);
+    free(worker->queue);
+    free(worker->dist);
+    radix_free(&worker->heap);
+    worker->seen = NULL;
+    worker->parent = NULL;
+    worker->queue = NULL;
+    worker->dist = NULL;
+    return NULL;
+}
+
+// solves count (starts[i], ends[i]) pairs in one call, split across up to
+// threads workers. index is optional and replaces the searches with tree
+// queries when the maze is perfect and has no weights
+batch_result *solve_batch(maze_t *maze, tree_index *index, const int *starts,
+                          const int *ends, int count, bool want_paths,
+                          int threads) {
+    int num_workers = threads < count ? threads : count;
+    num_workers = num_workers > 0 ? num_workers : 1;
+
+    // the index only knows the number of moves
+    if (maze->weighted) {
+        index = NULL;
+    }
+
+    batch_result *result = (batch_result *)calloc(1, sizeof(batch_result));
+    batch_worker_t *workers =
+        (batch_worker_t *)calloc(num_workers, sizeof(batch_worker_t));
+    pthread_t *handles = (pthread_t *)malloc(sizeof(pthread_t) * num_workers);
+    bool *started = (bool *)calloc(num_workers, sizeof(bool));
+    if (result != NULL) {
+        result->count = count;
+        result->lengths = (int *)malloc(sizeof(int) * (count > 0 ? count : 1));
+        if (want_paths) {
+            result->offsets = (int *)calloc(count + 1, sizeof(int));
+        }
+    }
+
+    if (result == NULL || result->lengths == NULL || workers == NULL ||
+        handles == NULL || started == NULL ||
+        (want_paths && result->offsets == NULL)) {
+        fprintf(stderr, "Memory allocation failed for batch\n");
+        free_batch_result(result);
+        free(workers);
+        free(handles);
+        free(started);
+        return NULL;
+    }
+
+    for (int w = 0; w < num_workers; w++) {
+        workers[w].maze = maze;
+        workers[w].index = index;
+        workers[w].starts = starts;
+        workers[w].ends = ends;
+        workers[w].lengths = result->lengths;
+        workers[w].first = (int)((long long)count * w / num_workers);
+        workers[w].last = (int)((long long)count * (w + 1) / num_workers);
+        workers[w].want_paths = want_paths;
+        workers[w].counts = result->offsets;
+
+        // the first worker always runs on the calling thread
+        if (w > 0) {
+            started[w] = pthread_create(&handles[w], NULL, solve_pairs,
+                                        &workers[w]) == 0;
+        }
+    }
+    solve_pairs(&workers[0]);
+    bool failed = workers[0].failed;
+    for (int w = 1; w < num_workers; w++) {
+        if (started[w]) {
+            pthread_join(handles[w], NULL);
+        } else {
+            solve_pairs(&workers[w]);
+        }
+        failed = failed || workers[w].failed;
+    }
+
+    // each worker's paths are already in pair order, so they are copied
+    // into place one block per worker
+    if (!failed && want_paths) {
+        size_t total = 0;
+        for (int w = 0; w < num_workers; w++) {
+            total += workers[w].num_cells;
+        }
+        result->paths = (int *)malloc(sizeof(int) * (total > 0 ? total : 1));
+
+        if (result->paths == NULL) {
+            failed = true;
+        } else {
+            // the counts the workers left become offsets
+            for (int i = 0; i < count; i++) {
+                result->offsets[i + 1] += result->offsets[i];
+            }
+            for (int w = 0; w < num_workers; w++) {
+                if (workers[w].num_cells > 0) {
+                    memcpy(result->paths + result->offsets[workers[w].first],
+                           workers[w].cells,
+                           sizeof(int) * workers[w].num_cells);
+                }
+            }
+        }
+    }
+
+    for (int w = 0; w < num_workers; w++) {
+        free(workers[w].cells);
+    }
+    free(workers);
+    free(handles);
+    free(started);
+
+    if (failed) {
+        fprintf(stderr, "Memory allocation failed for batch\n");
+        free_batch_result(result);
+        return NULL;
+    }
+    return result;
+}
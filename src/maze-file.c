@@ -0,0 +1,220 @@
+#include "../include/maze-file.h"
+#include <limits.h>
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#ifndef _WIN32
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+
+// bytes needed to store a rows x cols maze, header included
+size_t maze_file_size(int rows, int cols, uint32_t flags) {
+    size_t size = MAZE_FILE_HEADER_SIZE + ((size_t)rows * cols * 2 + 7) / 8;
+    if (flags & MAZE_FILE_WEIGHTS) {
+        size += (size_t)rows * cols;
+    }
+    return size;
+}
+
+void write_u32(unsigned char *out, uint32_t value) {
+    for (int i = 0; i < 4; i++) {
+        out[i] = (unsigned char)(value >> (8 * i));
+    }
+}
+
+void write_u64(unsigned char *out, uint64_t value) {
+    for (int i = 0; i < 8; i++) {
+        out[i] = (unsigned char)(value >> (8 * i));
+    }
+}
+
+uint32_t read_u32(const unsigned char *in) {
+    uint32_t value = 0;
+    for (int i = 0; i < 4; i++) {
+        value |= (uint32_t)in[i] << (8 * i);
+    }
+    return value;
+}
+
+uint64_t read_u64(const unsigned char *in) {
+    uint64_t value = 0;
+    for (int i = 0; i < 8; i++) {
+        value |= (uint64_t)in[i] << (8 * i);
+    }
+    return value;
+}
+
+// writes the header and packed cells at the file's current position
+bool write_maze(maze_t *maze, FILE *file) {
+    uint32_t flags = maze->weighted ? MAZE_FILE_WEIGHTS : 0;
+    size_t size = maze_file_size(maze->rows, maze->cols, flags);
+    unsigned char *data = (unsigned char *)calloc(size, 1);
+    if (data == NULL) {
+        fprintf(stderr, "Memory allocation failed for maze file\n");
+        return false;
+    }
+
+    memcpy(data, MAZE_FILE_MAGIC, 4);
+    write_u32(data + 4, MAZE_FILE_VERSION);
+    write_u32(data + 8, (uint32_t)maze->rows);
+    write_u32(data + 12, (uint32_t)maze->cols);
+    write_u64(data + 16, maze->seed);
+    write_u32(data + 24, (uint32_t)maze->algorithm);
+    write_u32(data + 28, flags);
+
+    unsigned char *cells = data + MAZE_FILE_HEADER_SIZE;
+    for (int i = 0; i < maze->num_nodes; i++) {
+        unsigned char bits = 0;
+        if (maze->walls[i] & WALL_BIT(RIGHT)) {
+            bits |= 1;
+        }
+        if (maze->walls[i] & WALL_BIT(BOTTOM)) {
+            bits |= 2;
+        }
+        cells[i >> 2] |= bits << ((i & 3) * 2);
+    }
+    if (flags & MAZE_FILE_WEIGHTS) {
+        memcpy(data + maze_file_size(maze->rows, maze->cols, 0), maze->weights,
+               maze->num_nodes);
+    }
+
+    bool written = fwrite(data, 1, size, file) == size;
+    free(data);
+    return written;
+}
+
+bool save_maze(maze_t *maze, const char *path) {
+    FILE *file = fopen(path, "wb");
+    if (file == NULL) {
+        fprintf(stderr, "Could not open %s for writing\n", path);
+        return false;
+    }
+    bool written = write_maze(maze, file);
+    written = fclose(file) == 0 && written;
+    if (!written) {
+        fprintf(stderr, "Could not write %s\n", path);
+    }
+    return written;
+}
+
+#ifdef _WIN32
+// no mmap here, the file is read into memory in one go instead
+unsigned char *map_file(const char *path, size_t *size) {
+    FILE *file = fopen(path, "rb");
+    if (file == NULL) {
+        return NULL;
+    }
+    unsigned char *data = NULL;
+    if (fseek(file, 0, SEEK_END) == 0) {
+        long length = ftell(file);
+        if (length > 0 && fseek(file, 0, SEEK_SET) == 0) {
+            data = (unsigned char *)malloc(length);
+            if (data != NULL && fread(data, 1, length, file) != (size_t)length) {
+                free(data);
+                data = NULL;
+            }
+            *size = (size_t)length;
+        }
+    }
+    fclose(file);
+    return data;
+}
+
+void unmap_file(unsigned char *data, size_t size) {
+    (void)size;
+    free(data);
+}
+#else
+unsigned char *map_file(const char *path, size_t *size) {
+    int fd = open(path, O_RDONLY);
+    if (fd == -1) {
+        return NULL;
+    }
+    struct stat info;
+    void *data = MAP_FAILED;
+    if (fstat(fd, &info) == 0 && info.st_size > 0) {
+        *size = (size_t)info.st_size;
+        data = mmap(NULL, *size, PROT_READ, MAP_PRIVATE, fd, 0);
+    }
+    // the mapping stays valid once the descriptor is closed
+    close(fd);
+    if (data == MAP_FAILED) {
+        return NULL;
+    }
+    madvise(data, *size, MADV_SEQUENTIAL);
+    return (unsigned char *)data;
+}
+
+void unmap_file(unsigned char *data, size_t size) {
+    munmap(data, size);
+}
+#endif
+
+// rebuilds the wall bytes straight from the mapped cells, every cell's top
+// and left walls come from cells already decoded above and to the left
+void unpack_walls(maze_t *maze, const unsigned char *cells) {
+    int cols = maze->cols;
+    for (int r = 0, i = 0; r < maze->rows; r++) {
+        for (int c = 0; c < cols; c++, i++) {
+            unsigned char bits = (cells[i >> 2] >> ((i & 3) * 2)) & 3;
+            unsigned char walls = 0;
+            walls |= bits & 1 ? WALL_BIT(RIGHT) : 0;
+            walls |= bits & 2 ? WALL_BIT(BOTTOM) : 0;
+
+            bool top = r == 0 ? i != 0
+                              : maze->walls[i - cols] & WALL_BIT(BOTTOM);
+            bool left = c == 0 || maze->walls[i - 1] & WALL_BIT(RIGHT);
+            walls |= top ? WALL_BIT(TOP) : 0;
+            walls |= left ? WALL_BIT(LEFT) : 0;
+            maze->walls[i] = walls;
+        }
+    }
+}
+
+maze_t *load_maze(const char *path) {
+    size_t size = 0;
+    unsigned char *data = map_file(path, &size);
+    if (data == NULL) {
+        fprintf(stderr, "Could not open %s\n", path);
+        return NULL;
+    }
+
+    bool valid = size >= MAZE_FILE_HEADER_SIZE &&
+                 memcmp(data, MAZE_FILE_MAGIC, 4) == 0 &&
+                 read_u32(data + 4) == MAZE_FILE_VERSION;
+    int rows = valid ? (int)read_u32(data + 8) : 0;
+    int cols = valid ? (int)read_u32(data + 12) : 0;
+    uint32_t flags = valid ? read_u32(data + 28) : 0;
+    valid = valid && rows > 0 && cols > 0 &&
+            (long long)rows * cols <= INT_MAX &&
+            size >= maze_file_size(rows, cols, flags);
+    if (!valid) {
+        fprintf(stderr, "%s is not a maze file\n", path);
+        unmap_file(data, size);
+        return NULL;
+    }
+
+    maze_t *maze = create_maze(rows, cols);
+    if (maze == NULL) {
+        unmap_file(data, size);
+        return NULL;
+    }
+    maze->seed = read_u64(data + 16);
+    maze->algorithm = (int)read_u32(data + 24);
+    unpack_walls(maze, data + MAZE_FILE_HEADER_SIZE);
+    bool loaded = !(flags & MAZE_FILE_WEIGHTS) ||
+                  set_weights(maze, data + maze_file_size(rows, cols, 0));
+    unmap_file(data, size);
+
+    if (!loaded || !build_adjacency(maze)) {
+        free_maze(maze);
+        return NULL;
+    }
+    return maze;
+}
@@ -1,83 +1,77 @@
 #include "../include/maze.h"
+#include <pthread.h>
 #include <stdbool.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
 #include <time.h>
 
+// rectangle of cells covering rows [row0, row1) and columns [col0, col1)
+typedef struct {
+    int row0;
+    int col0;
+    int row1;
+    int col1;
+} region_t;
+
+bool in_region(maze_t *maze, region_t *region, int vertex) {
+    int row = vertex / maze->cols;
+    int col = vertex % maze->cols;
+    return row >= region->row0 && row < region->row1 && col >= region->col0 &&
+           col < region->col1;
+}
+
 // randomises the 4 directions
-void randomise_directions(Directions directions[]) {
+void randomise_directions(rng_t *rng, Directions directions[]) {
     for (int i = 0; i < 4; i++) {
-        int j = rand() % 4;
+        int j = rng_range(rng, 4);
         Directions temp = directions[i];
         directions[i] = directions[j];
         directions[j] = temp;
     }
 }
 
-int random_start(maze_t *maze) {
-    int random_index;
-    node_t *tmp;
-    while (true) {
-        random_index = rand() % maze->num_nodes;
-        tmp = maze->nodes[random_index];
-        if (tmp->row < 1 || tmp->row > maze->rows - 1 || tmp->col < 1 ||
-            tmp->col > maze->cols - 1) {
-            continue;
-        }
-        return random_index;
-    }
-}
-
-void check_neighbours(maze_t *maze, node_t *node, node_t *neighbours[4]) {
+void check_neighbours(maze_t *maze, rng_t *rng, region_t *region, int vertex,
+                      bool *visited, int neighbours[4]) {
     Directions directions[4] = {TOP, RIGHT, BOTTOM, LEFT};
-    randomise_directions(directions);
+    randomise_directions(rng, directions);
 
     for (int i = 0; i < 4; i++) {
-        int new_row = node->row;
-        int new_col = node->col;
-        switch (directions[i]) {
-        case TOP:
-            new_row--;
-            break;
-        case RIGHT:
-            new_col++;
-            break;
-        case BOTTOM:
-            new_row++;
-            break;
-        case LEFT:
-            new_col--;
-            break;
-        }
-        node_t *tmp = check_cell(maze, new_row, new_col);
-        if (tmp == NULL) {
+        int tmp = neighbour_vertex(maze, vertex, directions[i]);
+        if (tmp == -1 || !in_region(maze, region, tmp)) {
             continue;
         }
 
-        if (!tmp->visited && tmp != NULL) {
+        if (!visited[tmp]) {
             neighbours[i] = tmp;
         }
     }
 }
 
 void create_entrances(maze_t *maze) {
-    node_t *entrance = maze->nodes[0];
-    node_t *exit = maze->nodes[maze->num_nodes-1];
-
-    entrance->walls[TOP] = false;
-    exit->walls[BOTTOM] = false;
+    maze->walls[0] &= ~WALL_BIT(TOP);
+    maze->walls[maze->num_nodes - 1] &= ~WALL_BIT(BOTTOM);
 }
 
-// creates the maze via backtracking
-void backtracking(maze_t *maze) {
-    // initialise stack
-    node_t *stack[maze->num_nodes];
+// carves a perfect maze inside the region via backtracking
+void backtracking_region(maze_t *maze, rng_t *rng, region_t *region,
+                         bool *visited) {
+    int region_rows = region->row1 - region->row0;
+    int region_cols = region->col1 - region->col0;
+
+    // initialise stack, each cell is pushed at most twice
+    int *stack = (int *)malloc(sizeof(int) * region_rows * region_cols * 2);
     int stack_count = 0;
 
+    if (stack == NULL) {
+        fprintf(stderr, "Memory allocation failed for backtracking\n");
+        return;
+    }
+
     // initialise node and add to stack
-    node_t *curr = maze->nodes[rand() % maze->num_nodes-1];
-    curr->visited = true;
+    int curr = (region->row0 + rng_range(rng, region_rows)) * maze->cols +
+               region->col0 + rng_range(rng, region_cols);
+    visited[curr] = true;
     stack[stack_count++] = curr;
 
     while (stack_count > 0) {
@@ -85,76 +79,772 @@ void backtracking(maze_t *maze) {
         curr = stack[--stack_count];
 
         // check the neighbours for the node
-        node_t *neighbours[4] = {NULL, NULL, NULL, NULL};
-        check_neighbours(maze, curr, neighbours);
-        
-        bool unvisited_neighbour = false;
+        int neighbours[4] = {-1, -1, -1, -1};
+        check_neighbours(maze, rng, region, curr, visited, neighbours);
+
         for (int i = 0; i < 4; i++) {
-            if (neighbours[i] && !neighbours[i]->visited) {
-                unvisited_neighbour = true;
-                neighbours[i]->visited = true;
+            if (neighbours[i] != -1 && !visited[neighbours[i]]) {
+                visited[neighbours[i]] = true;
                 stack[stack_count++] = curr;
                 stack[stack_count++] = neighbours[i];
+                remove_wall(maze, curr, neighbours[i]);
+                break;
+            }
+        }
+    }
 
-                // neighbour is below current
-                if (neighbours[i]->row > curr->row) {
-                    neighbours[i]->walls[TOP] = false;
-                    curr->walls[BOTTOM] = false; 
-                }
+    free(stack);
+}
 
-                // neighbour is above current
-                if (neighbours[i]->row < curr->row) {
-                    neighbours[i]->walls[BOTTOM] = false;
-                    curr->walls[TOP] = false;
-                }
+// creates the maze via backtracking
+void backtracking(maze_t *maze, rng_t *rng) {
+    region_t region = {0, 0, maze->rows, maze->cols};
+    bool *visited = (bool *)calloc(maze->num_nodes, sizeof(bool));
 
-                // neighbour is on the right of current
-                if (neighbours[i]->col > curr->col) {
-                    neighbours[i]->walls[LEFT] = false;
-                    curr->walls[RIGHT] = false;
-                }
+    if (visited == NULL) {
+        fprintf(stderr, "Memory allocation failed for backtracking\n");
+        return;
+    }
 
-                // neighbour is on the left of current
-                if (neighbours[i]->col < curr->col) {
-                    neighbours[i]->walls[RIGHT] = false;
-                    curr->walls[LEFT] = false;
-                }
-                add_edge(maze, curr, neighbours[i]);
-                add_edge(maze, neighbours[i], curr);
-                break;
+    backtracking_region(maze, rng, &region, visited);
+    free(visited);
+}
+
+// joins cells across randomly ordered walls that separate different sets
+void kruskal(maze_t *maze, rng_t *rng) {
+    int num_edges = maze->rows * (maze->cols - 1) + (maze->rows - 1) * maze->cols;
+    int *sets = (int *)malloc(sizeof(int) * maze->num_nodes);
+    int *edges = (int *)malloc(sizeof(int) * (num_edges > 0 ? num_edges : 1));
+
+    if (sets == NULL || edges == NULL) {
+        fprintf(stderr, "Memory allocation failed for kruskal\n");
+        free(sets);
+        free(edges);
+        return;
+    }
+
+    // even edges are right walls, odd edges are bottom walls
+    int count = 0;
+    for (int i = 0; i < maze->num_nodes; i++) {
+        sets[i] = i;
+        if (neighbour_vertex(maze, i, RIGHT) != -1) {
+            edges[count++] = i * 2;
+        }
+        if (neighbour_vertex(maze, i, BOTTOM) != -1) {
+            edges[count++] = i * 2 + 1;
+        }
+    }
+
+    for (int i = num_edges - 1; i > 0; i--) {
+        int j = rng_range(rng, i + 1);
+        int temp = edges[i];
+        edges[i] = edges[j];
+        edges[j] = temp;
+    }
+
+    for (int i = 0; i < num_edges; i++) {
+        int vertex = edges[i] / 2;
+        int other = edges[i] % 2 == 0 ? vertex + 1 : vertex + maze->cols;
+        if (uf_union(sets, vertex, other)) {
+            remove_wall(maze, vertex, other);
+        }
+    }
+
+    free(sets);
+    free(edges);
+}
+
+// grows the maze from a random cell by joining random frontier cells
+void prim(maze_t *maze, rng_t *rng) {
+    // 0 = outside, 1 = frontier, 2 = in the maze
+    unsigned char *state = (unsigned char *)calloc(maze->num_nodes, 1);
+    int *frontier = (int *)malloc(sizeof(int) * maze->num_nodes);
+    int frontier_count = 0;
+
+    if (state == NULL || frontier == NULL) {
+        fprintf(stderr, "Memory allocation failed for prim\n");
+        free(state);
+        free(frontier);
+        return;
+    }
+
+    int curr = rng_range(rng, maze->num_nodes);
+    while (true) {
+        state[curr] = 2;
+        for (int d = TOP; d <= LEFT; d++) {
+            int neighbour = neighbour_vertex(maze, curr, d);
+            if (neighbour != -1 && state[neighbour] == 0) {
+                state[neighbour] = 1;
+                frontier[frontier_count++] = neighbour;
             }
         }
-        if (!unvisited_neighbour) {
-            stack_count--;
+
+        if (frontier_count == 0) {
+            break;
         }
 
+        // take a random frontier cell and join it to a random maze neighbour
+        int index = rng_range(rng, frontier_count);
+        curr = frontier[index];
+        frontier[index] = frontier[--frontier_count];
+
+        int inside[4];
+        int inside_count = 0;
+        for (int d = TOP; d <= LEFT; d++) {
+            int neighbour = neighbour_vertex(maze, curr, d);
+            if (neighbour != -1 && state[neighbour] == 2) {
+                inside[inside_count++] = neighbour;
+            }
+        }
+        remove_wall(maze, curr, inside[rng_range(rng, inside_count)]);
     }
+
+    free(state);
+    free(frontier);
 }
 
-maze_t *generate_maze(int rows, int cols) {
-    srand(time(NULL));
+// picks a uniformly random neighbour that is on the grid
+int random_neighbour(maze_t *maze, rng_t *rng, int vertex) {
+    int neighbours[4];
+    int count = 0;
+    for (int d = TOP; d <= LEFT; d++) {
+        int neighbour = neighbour_vertex(maze, vertex, d);
+        if (neighbour != -1) {
+            neighbours[count++] = neighbour;
+        }
+    }
+    return neighbours[rng_range(rng, count)];
+}
+
+// loop-erased random walks, giving a uniformly random spanning tree
+void wilson(maze_t *maze, rng_t *rng) {
+    bool *in_tree = (bool *)calloc(maze->num_nodes, sizeof(bool));
+    int *next = (int *)malloc(sizeof(int) * maze->num_nodes);
+
+    if (in_tree == NULL || next == NULL) {
+        fprintf(stderr, "Memory allocation failed for wilson\n");
+        free(in_tree);
+        free(next);
+        return;
+    }
+
+    in_tree[rng_range(rng, maze->num_nodes)] = true;
+    if (maze->num_nodes == 1) {
+        free(in_tree);
+        free(next);
+        return;
+    }
+
+    for (int i = 0; i < maze->num_nodes; i++) {
+        // walk until the tree is hit, later visits overwrite earlier loops
+        int curr = i;
+        while (!in_tree[curr]) {
+            next[curr] = random_neighbour(maze, rng, curr);
+            curr = next[curr];
+        }
+
+        // add the loop-erased path to the tree
+        curr = i;
+        while (!in_tree[curr]) {
+            in_tree[curr] = true;
+            remove_wall(maze, curr, next[curr]);
+            curr = next[curr];
+        }
+    }
+
+    free(in_tree);
+    free(next);
+}
+
+// every cell opens either its top or left wall
+void binary_tree(maze_t *maze, rng_t *rng) {
+    for (int i = 0; i < maze->num_nodes; i++) {
+        int top = neighbour_vertex(maze, i, TOP);
+        int left = neighbour_vertex(maze, i, LEFT);
+        if (top != -1 && left != -1) {
+            remove_wall(maze, i, rng_range(rng, 2) == 0 ? top : left);
+        } else if (top != -1) {
+            remove_wall(maze, i, top);
+        } else if (left != -1) {
+            remove_wall(maze, i, left);
+        }
+    }
+}
+
+// carves runs along each row, each run opening upwards from one random cell
+void sidewinder(maze_t *maze, rng_t *rng) {
+    for (int r = 0; r < maze->rows; r++) {
+        int run_start = r * maze->cols;
+        for (int c = 0; c < maze->cols; c++) {
+            int vertex = r * maze->cols + c;
+            bool at_edge = c == maze->cols - 1;
+
+            if (r == 0) {
+                if (!at_edge) {
+                    remove_wall(maze, vertex, vertex + 1);
+                }
+                continue;
+            }
+
+            if (at_edge || rng_range(rng, 2) == 0) {
+                int chosen = run_start + rng_range(rng, vertex - run_start + 1);
+                remove_wall(maze, chosen, chosen - maze->cols);
+                run_start = vertex + 1;
+            } else {
+                remove_wall(maze, vertex, vertex + 1);
+            }
+        }
+    }
+}
+
+maze_t *generate_maze_algo(int rows, int cols, int algorithm, uint64_t seed) {
+    rng_t rng;
+    rng_seed(&rng, seed);
 
     // generate the maze
     maze_t *maze = create_maze(rows, cols);
+    if (maze == NULL) {
+        return NULL;
+    }
+    maze->seed = seed;
+    maze->algorithm = algorithm;
+
+    switch (algorithm) {
+    case KRUSKAL:
+        kruskal(maze, &rng);
+        break;
+    case PRIM:
+        prim(maze, &rng);
+        break;
+    case WILSON:
+        wilson(maze, &rng);
+        break;
+    case BINARY_TREE:
+        binary_tree(maze, &rng);
+        break;
+    case SIDEWINDER:
+        sidewinder(maze, &rng);
+        break;
+    default:
+        maze->algorithm = BACKTRACKING;
+        backtracking(maze, &rng);
+        break;
+    }
+    create_entrances(maze);
+
+    if (!build_adjacency(maze)) {
+        free_maze(maze);
+        return NULL;
+    }
 
+    return maze;
+}
+
+maze_t *generate_maze_seeded(int rows, int cols, uint64_t seed) {
+    return generate_maze_algo(rows, cols, BACKTRACKING, seed);
+}
+
+maze_t *generate_maze(int rows, int cols) {
+    return generate_maze_seeded(rows, cols, random_seed());
+}
+
+// true if the open walls form a spanning tree over every cell
+bool check_connectivity(maze_t *maze) {
+    int *sets = (int *)malloc(sizeof(int) * maze->num_nodes);
+    int edges = 0;
+
+    if (sets == NULL) {
+        fprintf(stderr, "Memory allocation failed for connectivity check\n");
+        return false;
+    }
+    for (int i = 0; i < maze->num_nodes; i++) {
+        sets[i] = i;
+    }
+
+    bool perfect = true;
+    for (int i = 0; i < maze->num_nodes && perfect; i++) {
+        int right = neighbour_vertex(maze, i, RIGHT);
+        int bottom = neighbour_vertex(maze, i, BOTTOM);
+        if (right != -1 && !(maze->walls[i] & WALL_BIT(RIGHT))) {
+            perfect = uf_union(sets, i, right);
+            edges++;
+        }
+        if (perfect && bottom != -1 && !(maze->walls[i] & WALL_BIT(BOTTOM))) {
+            perfect = uf_union(sets, i, bottom);
+            edges++;
+        }
+    }
+
+    free(sets);
+    return perfect && edges == maze->num_nodes - 1;
+}
+
+// neighbours a cell has an open wall to
+int open_neighbours(maze_t *maze, int vertex) {
     int count = 0;
-    node_t *curr = NULL;
-    for (int i = 0; i < maze->rows; i++) {
-        for (int j = 0; j < maze->cols; j++) {
-            curr = create_node(count, i, j);
-            maze->nodes[count] = curr;
+    for (int d = TOP; d <= LEFT; d++) {
+        if (neighbour_vertex(maze, vertex, d) != -1 &&
+            !(maze->walls[vertex] & WALL_BIT(d))) {
             count++;
         }
     }
+    return count;
+}
+
+// opens a wall at fraction of the dead ends, taken in a random order, which
+// adds loops so there is more than one way between most cells. a dead end
+// opens onto another dead end next to it when there is one, removing both.
+// returns how many walls were opened, or -1 when memory ran out
+int braid_maze(maze_t *maze, double fraction, uint64_t seed) {
+    rng_t rng;
+    rng_seed(&rng, seed);
+
+    int *dead_ends = (int *)malloc(sizeof(int) * maze->num_nodes);
+    if (dead_ends == NULL) {
+        fprintf(stderr, "Memory allocation failed for braiding\n");
+        return -1;
+    }
+    int count = 0;
+    for (int i = 0; i < maze->num_nodes; i++) {
+        if (open_neighbours(maze, i) == 1) {
+            dead_ends[count++] = i;
+        }
+    }
+    for (int i = count - 1; i > 0; i--) {
+        int j = rng_range(&rng, i + 1);
+        int temp = dead_ends[i];
+        dead_ends[i] = dead_ends[j];
+        dead_ends[j] = temp;
+    }
+
+    fraction = fraction < 0 ? 0 : fraction > 1 ? 1 : fraction;
+    int target = (int)(count * fraction + 0.5);
+    int removed = 0;
+    int opened = 0;
+    for (int i = 0; i < count && removed < target; i++) {
+        int vertex = dead_ends[i];
+        // an earlier opening may already have joined it up
+        if (open_neighbours(maze, vertex) != 1) {
+            continue;
+        }
+
+        Directions directions[4] = {TOP, RIGHT, BOTTOM, LEFT};
+        randomise_directions(&rng, directions);
+        int chosen = -1;
+        for (int j = 0; j < 4; j++) {
+            int neighbour = neighbour_vertex(maze, vertex, directions[j]);
+            if (neighbour == -1 ||
+                !(maze->walls[vertex] & WALL_BIT(directions[j]))) {
+                continue;
+            }
+            if (chosen == -1) {
+                chosen = neighbour;
+            }
+            if (open_neighbours(maze, neighbour) == 1) {
+                chosen = neighbour;
+                break;
+            }
+        }
+        if (chosen == -1) {
+            continue;
+        }
+
+        removed += open_neighbours(maze, chosen) == 1 ? 2 : 1;
+        remove_wall(maze, vertex, chosen);
+        opened++;
+    }
+    free(dead_ends);
+
+    if (!build_adjacency(maze) ||
+        (maze->nodes != NULL && !build_nodes(maze))) {
+        return -1;
+    }
+    return opened;
+}
+
+// smooth random costs from 1 to max_weight, so there are cheap and dear
+// areas of roughly scale cells across rather than noise from cell to cell.
+// values on a coarse lattice are blended between the four around each cell
+bool random_weights(maze_t *maze, int max_weight, int scale, uint64_t seed) {
+    rng_t rng;
+    rng_seed(&rng, seed);
+    if (max_weight > MAX_WEIGHT) {
+        max_weight = MAX_WEIGHT;
+    }
+    max_weight = max_weight < 1 ? 1 : max_weight;
+    scale = scale < 1 ? 1 : scale;
+
+    int lattice_cols = maze->cols / scale + 2;
+    int lattice_rows = maze->rows / scale + 2;
+    float *lattice =
+        (float *)malloc(sizeof(float) * lattice_rows * lattice_cols);
+    unsigned char *weights = maze_weights(maze);
+    if (lattice == NULL || weights == NULL) {
+        fprintf(stderr, "Memory allocation failed for weights\n");
+        free(lattice);
+        return false;
+    }
+    for (int i = 0; i < lattice_rows * lattice_cols; i++) {
+        lattice[i] = rng_next(&rng) / 4294967296.0f;
+    }
+
+    for (int r = 0, i = 0; r < maze->rows; r++) {
+        int lr = r / scale;
+        float fr = (float)(r % scale) / scale;
+        const float *above = lattice + lr * lattice_cols;
+        const float *below = above + lattice_cols;
+        for (int c = 0; c < maze->cols; c++, i++) {
+            int lc = c / scale;
+            float fc = (float)(c % scale) / scale;
+            float top = above[lc] + (above[lc + 1] - above[lc]) * fc;
+            float bottom = below[lc] + (below[lc + 1] - below[lc]) * fc;
+            int weight = 1 + (int)((top + (bottom - top) * fr) * max_weight);
+            weights[i] = weight > max_weight ? max_weight : weight;
+        }
+    }
+    free(lattice);
+    return true;
+}
+
+typedef struct {
+    maze_t *maze;
+    bool *visited;
+    region_t *tiles;
+    int num_tiles;
+    int first_tile;
+    int stride;
+    uint64_t seed;
+} tile_worker_t;
+
+void *generate_tiles(void *arg) {
+    tile_worker_t *worker = (tile_worker_t *)arg;
+
+    // each tile has its own rng so the result does not depend on scheduling
+    for (int t = worker->first_tile; t < worker->num_tiles;
+         t += worker->stride) {
+        rng_t rng;
+        rng_seed(&rng, worker->seed + (uint64_t)t * 0x9E3779B97F4A7C15ULL);
+        backtracking_region(worker->maze, &rng, &worker->tiles[t],
+                            worker->visited);
+    }
+    return NULL;
+}
+
+// opens one boundary wall per tile pair, picking the pairs with kruskal so
+// the tiles themselves form a spanning tree
+bool stitch_tiles(maze_t *maze, rng_t *rng, region_t *tiles, int tile_rows,
+                  int tile_cols) {
+    int num_tiles = tile_rows * tile_cols;
+    int *sets = (int *)malloc(sizeof(int) * num_tiles);
+    int *edges = (int *)malloc(sizeof(int) * num_tiles * 2);
+    int num_edges = 0;
+
+    if (sets == NULL || edges == NULL) {
+        fprintf(stderr, "Memory allocation failed for tile stitching\n");
+        free(sets);
+        free(edges);
+        return false;
+    }
+
+    // even edges join a tile to its right, odd edges to the tile below
+    for (int t = 0; t < num_tiles; t++) {
+        sets[t] = t;
+        if (t % tile_cols < tile_cols - 1) {
+            edges[num_edges++] = t * 2;
+        }
+        if (t / tile_cols < tile_rows - 1) {
+            edges[num_edges++] = t * 2 + 1;
+        }
+    }
+
+    for (int i = num_edges - 1; i > 0; i--) {
+        int j = rng_range(rng, i + 1);
+        int temp = edges[i];
+        edges[i] = edges[j];
+        edges[j] = temp;
+    }
+
+    for (int i = 0; i < num_edges; i++) {
+        int t = edges[i] / 2;
+        bool right = edges[i] % 2 == 0;
+        int other = right ? t + 1 : t + tile_cols;
+        if (!uf_union(sets, t, other)) {
+            continue;
+        }
+
+        region_t *tile = &tiles[t];
+        int vertex;
+        if (right) {
+            int row = tile->row0 + rng_range(rng, tile->row1 - tile->row0);
+            vertex = row * maze->cols + tile->col1 - 1;
+            remove_wall(maze, vertex, vertex + 1);
+        } else {
+            int col = tile->col0 + rng_range(rng, tile->col1 - tile->col0);
+            vertex = (tile->row1 - 1) * maze->cols + col;
+            remove_wall(maze, vertex, vertex + maze->cols);
+        }
+    }
+
+    free(sets);
+    free(edges);
+    return true;
+}
+
+// generates tiles of the maze on separate threads then stitches them together
+maze_t *generate_maze_parallel(int rows, int cols, uint64_t seed,
+                               int threads) {
+    if (threads < 1) {
+        threads = 1;
+    }
+
+    // split into a roughly square grid of at least one tile per thread
+    int tile_rows = 1;
+    while ((tile_rows + 1) * (tile_rows + 1) <= threads) {
+        tile_rows++;
+    }
+    int tile_cols = (threads + tile_rows - 1) / tile_rows;
+    tile_rows = tile_rows < rows ? tile_rows : rows;
+    tile_cols = tile_cols < cols ? tile_cols : cols;
+    int num_tiles = tile_rows * tile_cols;
+    int num_workers = threads < num_tiles ? threads : num_tiles;
+
+    maze_t *maze = create_maze(rows, cols);
+    if (maze == NULL) {
+        return NULL;
+    }
+    maze->seed = seed;
+
+    bool *visited = (bool *)calloc(maze->num_nodes, sizeof(bool));
+    region_t *tiles = (region_t *)malloc(sizeof(region_t) * num_tiles);
+    tile_worker_t *workers =
+        (tile_worker_t *)malloc(sizeof(tile_worker_t) * num_workers);
+    pthread_t *handles = (pthread_t *)malloc(sizeof(pthread_t) * num_workers);
+    bool *started = (bool *)calloc(num_workers, sizeof(bool));
+
+    if (visited == NULL || tiles == NULL || workers == NULL ||
+        handles == NULL || started == NULL) {
+        fprintf(stderr, "Memory allocation failed for parallel generation\n");
+        free(visited);
+        free(tiles);
+        free(workers);
+        free(handles);
+        free(started);
+        free_maze(maze);
+        return NULL;
+    }
+
+    for (int t = 0; t < num_tiles; t++) {
+        int tr = t / tile_cols;
+        int tc = t % tile_cols;
+        tiles[t].row0 = (int)((long long)rows * tr / tile_rows);
+        tiles[t].row1 = (int)((long long)rows * (tr + 1) / tile_rows);
+        tiles[t].col0 = (int)((long long)cols * tc / tile_cols);
+        tiles[t].col1 = (int)((long long)cols * (tc + 1) / tile_cols);
+    }
+
+    for (int w = 0; w < num_workers; w++) {
+        workers[w].maze = maze;
+        workers[w].visited = visited;
+        workers[w].tiles = tiles;
+        workers[w].num_tiles = num_tiles;
+        workers[w].first_tile = w;
+        workers[w].stride = num_workers;
+        workers[w].seed = seed;
+
+        // the first worker always runs on the calling thread
+        if (w > 0) {
+            started[w] = pthread_create(&handles[w], NULL, generate_tiles,
+                                        &workers[w]) == 0;
+        }
+    }
+    generate_tiles(&workers[0]);
+    for (int w = 1; w < num_workers; w++) {
+        if (started[w]) {
+            pthread_join(handles[w], NULL);
+        } else {
+            generate_tiles(&workers[w]);
+        }
+    }
+
+    rng_t rng;
+    rng_seed(&rng, seed);
+    bool stitched = stitch_tiles(maze, &rng, tiles, tile_rows, tile_cols);
+
+    free(visited);
+    free(tiles);
+    free(workers);
+    free(handles);
+    free(started);
+
+    if (!stitched || !check_connectivity(maze)) {
+        fprintf(stderr, "Parallel generation did not produce a perfect maze\n");
+        free_maze(maze);
+        return NULL;
+    }
 
-    backtracking(maze);
     create_entrances(maze);
 
+    if (!build_adjacency(maze)) {
+        free_maze(maze);
+        return NULL;
+    }
+
     return maze;
 }
 
-int main() {
-    maze_t *maze = generate_maze(20, 20);
+// called once per generated row with the packed wall bits of each cell
+typedef void (*row_callback)(int row, const unsigned char *walls, int cols,
+                             void *user_data);
+
+// streams a maze row by row via eller's algorithm, keeping O(cols) state
+bool generate_maze_stream(int rows, int cols, uint64_t seed,
+                          row_callback callback, void *user_data) {
+    rng_t rng;
+    rng_seed(&rng, seed);
+
+    int *labels = (int *)malloc(sizeof(int) * cols);
+    int *sets = (int *)malloc(sizeof(int) * cols);
+    int *remaining = (int *)malloc(sizeof(int) * cols);
+    bool *has_down = (bool *)malloc(sizeof(bool) * cols);
+    bool *used = (bool *)malloc(sizeof(bool) * cols);
+    bool *open_above = (bool *)malloc(sizeof(bool) * cols);
+    unsigned char *walls = (unsigned char *)malloc(sizeof(unsigned char) * cols);
+
+    if (labels == NULL || sets == NULL || remaining == NULL ||
+        has_down == NULL || used == NULL || open_above == NULL ||
+        walls == NULL) {
+        fprintf(stderr, "Memory allocation failed for maze stream\n");
+        free(labels);
+        free(sets);
+        free(remaining);
+        free(has_down);
+        free(used);
+        free(open_above);
+        free(walls);
+        return false;
+    }
+
+    // every cell of the first row starts in its own set
+    for (int c = 0; c < cols; c++) {
+        labels[c] = c;
+        open_above[c] = false;
+    }
+
+    for (int r = 0; r < rows; r++) {
+        bool last_row = r == rows - 1;
+
+        for (int c = 0; c < cols; c++) {
+            sets[c] = c;
+            remaining[c] = 0;
+            has_down[c] = false;
+            walls[c] = ALL_WALLS;
+            if (open_above[c]) {
+                walls[c] &= ~WALL_BIT(TOP);
+            }
+        }
+
+        // join adjacent cells that belong to different sets
+        for (int c = 0; c < cols - 1; c++) {
+            int a = uf_find(sets, labels[c]);
+            int b = uf_find(sets, labels[c + 1]);
+            if (a != b && (last_row || rng_range(&rng, 2) == 0)) {
+                sets[b] = a;
+                walls[c] &= ~WALL_BIT(RIGHT);
+                walls[c + 1] &= ~WALL_BIT(LEFT);
+            }
+        }
+
+        for (int c = 0; c < cols; c++) {
+            labels[c] = uf_find(sets, labels[c]);
+            remaining[labels[c]]++;
+        }
+
+        // every set carries at least one cell down to the next row
+        for (int c = 0; c < cols; c++) {
+            int label = labels[c];
+            remaining[label]--;
+            open_above[c] = false;
+            if (last_row) {
+                continue;
+            }
+            if (rng_range(&rng, 2) == 0 ||
+                (remaining[label] == 0 && !has_down[label])) {
+                has_down[label] = true;
+                open_above[c] = true;
+                walls[c] &= ~WALL_BIT(BOTTOM);
+            }
+        }
+
+        if (r == 0) {
+            walls[0] &= ~WALL_BIT(TOP);
+        }
+        if (last_row) {
+            walls[cols - 1] &= ~WALL_BIT(BOTTOM);
+        }
+        callback(r, walls, cols, user_data);
+
+        // cells not joined from above get a label no other set is using
+        for (int c = 0; c < cols; c++) {
+            used[c] = false;
+        }
+        for (int c = 0; c < cols; c++) {
+            if (open_above[c]) {
+                used[labels[c]] = true;
+            }
+        }
+        int fresh = 0;
+        for (int c = 0; c < cols; c++) {
+            if (open_above[c]) {
+                continue;
+            }
+            while (used[fresh]) {
+                fresh++;
+            }
+            labels[c] = fresh;
+            used[fresh] = true;
+        }
+    }
+
+    free(labels);
+    free(sets);
+    free(remaining);
+    free(has_down);
+    free(used);
+    free(open_above);
+    free(walls);
+    return true;
+}
+
+double elapsed_seconds(struct timespec *start) {
+    struct timespec end;
+    timespec_get(&end, TIME_UTC);
+    return (double)(end.tv_sec - start->tv_sec) +
+           (double)(end.tv_nsec - start->tv_nsec) / 1e9;
+}
+
+// times the parallel generator against plain backtracking
+int main(int argc, char **argv) {
+    int size = argc > 1 ? atoi(argv[1]) : 2000;
+    int threads = argc > 2 ? atoi(argv[2]) : 4;
+    uint64_t seed = 1;
+    struct timespec start;
+
+    timespec_get(&start, TIME_UTC);
+    maze_t *maze = generate_maze_seeded(size, size, seed);
+    double serial = elapsed_seconds(&start);
     free_maze(maze);
+
+    timespec_get(&start, TIME_UTC);
+    maze = generate_maze_parallel(size, size, seed, threads);
+    double parallel = elapsed_seconds(&start);
+    if (maze == NULL) {
+        return 1;
+    }
+    free_maze(maze);
+
+    printf("%dx%d backtracking: %.3fs\n", size, size, serial);
+    printf("%dx%d parallel (%d threads): %.3fs\n", size, size, threads,
+           parallel);
+    printf("speedup: %.2fx\n", serial / parallel);
     return 0;
 }
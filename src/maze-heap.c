@@ -0,0 +1,98 @@
+#include "../include/maze-heap.h"
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+void radix_init(radix_heap *heap) { memset(heap, 0, sizeof(radix_heap)); }
+
+// empties the heap but keeps the buckets' memory for the next search
+void radix_clear(radix_heap *heap) {
+    heap->last = 0;
+    heap->size = 0;
+    for (int i = 0; i < RADIX_BUCKETS; i++) {
+        heap->buckets[i].size = 0;
+    }
+}
+
+void radix_free(radix_heap *heap) {
+    for (int i = 0; i < RADIX_BUCKETS; i++) {
+        free(heap->buckets[i].entries);
+    }
+    radix_init(heap);
+}
+
+// bytes held by the buckets
+size_t radix_size(radix_heap *heap) {
+    size_t size = 0;
+    for (int i = 0; i < RADIX_BUCKETS; i++) {
+        size += sizeof(radix_entry) * heap->buckets[i].capacity;
+    }
+    return size;
+}
+
+int radix_bucket_of(unsigned int key, unsigned int last) {
+    return key == last ? 0 : 32 - __builtin_clz(key ^ last);
+}
+
+bool bucket_append(radix_bucket *bucket, unsigned int key, int vertex) {
+    if (bucket->size == bucket->capacity) {
+        int capacity = bucket->capacity ? bucket->capacity * 2 : 64;
+        radix_entry *entries = (radix_entry *)realloc(
+            bucket->entries, sizeof(radix_entry) * capacity);
+        if (entries == NULL) {
+            fprintf(stderr, "Memory allocation failed for radix heap\n");
+            return false;
+        }
+        bucket->entries = entries;
+        bucket->capacity = capacity;
+    }
+    bucket->entries[bucket->size++] = (radix_entry){key, vertex};
+    return true;
+}
+
+// key must not be below the last key popped
+bool radix_push(radix_heap *heap, unsigned int key, int vertex) {
+    if (!bucket_append(&heap->buckets[radix_bucket_of(key, heap->last)], key,
+                       vertex)) {
+        return false;
+    }
+    heap->size++;
+    return true;
+}
+
+// smallest key first, entries with equal keys come out newest first. the
+// vertex is -1 once the heap is empty
+radix_entry radix_pop(radix_heap *heap) {
+    radix_bucket *first = &heap->buckets[0];
+    while (first->size == 0) {
+        if (heap->size == 0) {
+            return (radix_entry){heap->last, -1};
+        }
+        int i = 1;
+        while (heap->buckets[i].size == 0) {
+            i++;
+        }
+
+        // the smallest key becomes the last popped and every entry in the
+        // bucket lands in a lower one, the smallest ones in bucket 0
+        radix_bucket *bucket = &heap->buckets[i];
+        unsigned int min = bucket->entries[0].key;
+        for (int j = 1; j < bucket->size; j++) {
+            if (bucket->entries[j].key < min) {
+                min = bucket->entries[j].key;
+            }
+        }
+        heap->last = min;
+        for (int j = 0; j < bucket->size; j++) {
+            radix_entry entry = bucket->entries[j];
+            // an entry that cannot be moved is dropped, like a failed push
+            if (!bucket_append(&heap->buckets[radix_bucket_of(entry.key, min)],
+                               entry.key, entry.vertex)) {
+                heap->size--;
+            }
+        }
+        bucket->size = 0;
+    }
+    heap->size--;
+    return first->entries[--first->size];
+}
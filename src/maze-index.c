@@ -0,0 +1,154 @@
+#include "../include/maze-index.h"
+#include <stdbool.h>
+#include <stdio.h>
+#include <stdlib.h>
+
+void free_tree_index(tree_index *index) {
+    if (index == NULL) {
+        return;
+    }
+    free(index->depth);
+    free(index->up);
+    free(index);
+}
+
+// returns NULL when the maze has loops or is not connected
+tree_index *build_tree_index(maze_t *maze) {
+    int n = maze->num_nodes;
+    if (n <= 0 || maze->adj_offsets[n] != 2 * (n - 1)) {
+        return NULL;
+    }
+
+    tree_index *index = (tree_index *)calloc(1, sizeof(tree_index));
+    int *queue = (int *)malloc(sizeof(int) * n);
+    if (index == NULL || queue == NULL) {
+        fprintf(stderr, "Memory allocation failed for tree index\n");
+        free(index);
+        free(queue);
+        return NULL;
+    }
+    index->num_nodes = n;
+    index->depth = (int *)malloc(sizeof(int) * n);
+    int *parent = (int *)malloc(sizeof(int) * n);
+    if (index->depth == NULL || parent == NULL) {
+        fprintf(stderr, "Memory allocation failed for tree index\n");
+        free(parent);
+        free(queue);
+        free_tree_index(index);
+        return NULL;
+    }
+    for (int i = 0; i < n; i++) {
+        index->depth[i] = -1;
+    }
+
+    // breadth first from the root gives every vertex its parent and depth
+    int front = 0;
+    int rear = 0;
+    int max_depth = 0;
+    queue[0] = 0;
+    index->depth[0] = 0;
+    parent[0] = 0;
+    while (front <= rear) {
+        int vertex = queue[front++];
+        for (int i = maze->adj_offsets[vertex];
+             i < maze->adj_offsets[vertex + 1]; i++) {
+            int neighbour = maze->adj[i];
+            if (index->depth[neighbour] == -1) {
+                index->depth[neighbour] = index->depth[vertex] + 1;
+                parent[neighbour] = vertex;
+                queue[++rear] = neighbour;
+                if (index->depth[neighbour] > max_depth) {
+                    max_depth = index->depth[neighbour];
+                }
+            }
+        }
+    }
+    free(queue);
+    if (rear + 1 != n) {
+        free(parent);
+        free_tree_index(index);
+        return NULL;
+    }
+
+    // enough levels to jump the deepest vertex straight to the root
+    index->levels = 1;
+    while ((1 << index->levels) <= max_depth) {
+        index->levels++;
+    }
+    index->up = (int *)malloc(sizeof(int) * (size_t)n * index->levels);
+    if (index->up == NULL) {
+        fprintf(stderr, "Memory allocation failed for tree index\n");
+        free(parent);
+        free_tree_index(index);
+        return NULL;
+    }
+    for (int i = 0; i < n; i++) {
+        index->up[i] = parent[i];
+    }
+    free(parent);
+
+    for (int level = 1; level < index->levels; level++) {
+        int *prev = index->up + (size_t)(level - 1) * n;
+        int *curr = index->up + (size_t)level * n;
+        for (int i = 0; i < n; i++) {
+            curr[i] = prev[prev[i]];
+        }
+    }
+    return index;
+}
+
+int ancestor(tree_index *index, int vertex, int steps) {
+    for (int level = 0; steps > 0; level++, steps >>= 1) {
+        if (steps & 1) {
+            vertex = index->up[(size_t)level * index->num_nodes + vertex];
+        }
+    }
+    return vertex;
+}
+
+// lowest common ancestor of a and b, O(log n)
+int tree_lca(tree_index *index, int a, int b) {
+    if (index->depth[a] < index->depth[b]) {
+        int temp = a;
+        a = b;
+        b = temp;
+    }
+    a = ancestor(index, a, index->depth[a] - index->depth[b]);
+    if (a == b) {
+        return a;
+    }
+
+    for (int level = index->levels - 1; level >= 0; level--) {
+        int *up = index->up + (size_t)level * index->num_nodes;
+        if (up[a] != up[b]) {
+            a = up[a];
+            b = up[b];
+        }
+    }
+    return index->up[a];
+}
+
+// number of moves between two cells
+int path_length(tree_index *index, int a, int b) {
+    int lca = tree_lca(index, a, b);
+    return index->depth[a] + index->depth[b] - 2 * index->depth[lca];
+}
+
+// writes the cells from a to b inclusive, out needs path_length + 1 slots,
+// returns how many cells were written
+int tree_path(tree_index *index, int a, int b, int *out) {
+    int lca = tree_lca(index, a, b);
+    int up_steps = index->depth[a] - index->depth[lca];
+    int count = up_steps + index->depth[b] - index->depth[lca] + 1;
+
+    // a climbs to the lca from the front, b climbs to it from the back
+    for (int i = 0; i <= up_steps; i++) {
+        out[i] = a;
+        a = index->up[a];
+    }
+    for (int i = count - 1; i > up_steps; i--) {
+        out[i] = b;
+        b = index->up[b];
+    }
+    return count;
+}
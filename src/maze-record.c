@@ -0,0 +1,384 @@
+#include "../include/maze-record.h"
+#include "../include/maze-file.h"
+#include <limits.h>
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+// the most bytes a varint of 32 bits can take
+#define VARINT_MAX 5
+
+// small magnitudes of either sign become small unsigned values
+uint32_t zigzag(int value) {
+    return ((uint32_t)value << 1) ^ (uint32_t)(value >> 31);
+}
+
+int unzigzag(uint32_t value) { return (int)(value >> 1) ^ -(int)(value & 1); }
+
+size_t put_varint(unsigned char *out, uint32_t value) {
+    size_t count = 0;
+    while (value >= 0x80) {
+        out[count++] = (unsigned char)(value | 0x80);
+        value >>= 7;
+    }
+    out[count++] = (unsigned char)value;
+    return count;
+}
+
+// returns the bytes read, 0 when the varint runs past end
+size_t get_varint(const unsigned char *in, const unsigned char *end,
+                  uint32_t *value) {
+    uint32_t result = 0;
+    for (size_t i = 0; i < VARINT_MAX && in + i < end; i++) {
+        result |= (uint32_t)(in[i] & 0x7f) << (7 * i);
+        if (!(in[i] & 0x80)) {
+            *value = result;
+            return i + 1;
+        }
+    }
+    return 0;
+}
+
+// reads one step entry, returns the bytes read or 0 when it is cut short
+size_t get_step(const unsigned char *in, const unsigned char *end,
+                uint32_t *delta, uint32_t *parent) {
+    size_t used = get_varint(in, end, delta);
+    size_t more = used ? get_varint(in + used, end, parent) : 0;
+    return more ? used + more : 0;
+}
+
+void restart_recording(recording_t *rec, int start, int end, int algorithm) {
+    rec->start = start;
+    rec->end = end;
+    rec->algorithm = algorithm;
+    rec->steps = 0;
+    rec->finished = false;
+    rec->path_length = 0;
+    rec->size = 0;
+    rec->last = 0;
+    rec->num_keyframes = 0;
+}
+
+recording_t *create_recording(int start, int end, int algorithm) {
+    recording_t *rec = (recording_t *)calloc(1, sizeof(recording_t));
+    if (rec == NULL) {
+        fprintf(stderr, "Memory allocation failed for recording\n");
+        return NULL;
+    }
+    restart_recording(rec, start, end, algorithm);
+    return rec;
+}
+
+void free_recording(recording_t *rec) {
+    free(rec->data);
+    free(rec->keyframes);
+    free(rec->path);
+    free(rec);
+}
+
+size_t recording_size(recording_t *rec) {
+    return sizeof(recording_t) + rec->capacity +
+           sizeof(record_keyframe) * rec->keyframe_capacity +
+           sizeof(int) * rec->path_length;
+}
+
+bool reserve_bytes(recording_t *rec, size_t extra) {
+    if (rec->size + extra <= rec->capacity) {
+        return true;
+    }
+    size_t capacity = rec->capacity ? rec->capacity : 4096;
+    while (capacity < rec->size + extra) {
+        capacity *= 2;
+    }
+    unsigned char *data = (unsigned char *)realloc(rec->data, capacity);
+    if (data == NULL) {
+        fprintf(stderr, "Memory allocation failed for recording\n");
+        return false;
+    }
+    rec->data = data;
+    rec->capacity = capacity;
+    return true;
+}
+
+bool add_keyframe(recording_t *rec, int step, int vertex, size_t offset) {
+    if (rec->num_keyframes == rec->keyframe_capacity) {
+        int capacity = rec->keyframe_capacity ? rec->keyframe_capacity * 2 : 64;
+        record_keyframe *keyframes = (record_keyframe *)realloc(
+            rec->keyframes, sizeof(record_keyframe) * capacity);
+        if (keyframes == NULL) {
+            fprintf(stderr, "Memory allocation failed for recording\n");
+            return false;
+        }
+        rec->keyframes = keyframes;
+        rec->keyframe_capacity = capacity;
+    }
+    record_keyframe *key = &rec->keyframes[rec->num_keyframes++];
+    key->step = step;
+    key->vertex = vertex;
+    key->offset = offset;
+    return true;
+}
+
+// appends the vertices just expanded along with their parents in the maze
+bool record_steps(recording_t *rec, maze_t *maze, const int *vertices,
+                  int count) {
+    if (!reserve_bytes(rec, (size_t)count * VARINT_MAX * 2)) {
+        return false;
+    }
+    for (int i = 0; i < count; i++) {
+        if (rec->steps % RECORD_INTERVAL == 0 &&
+            !add_keyframe(rec, rec->steps, rec->last, rec->size)) {
+            return false;
+        }
+        int vertex = vertices[i];
+        int parent = search_parent(maze, vertex);
+        unsigned char *out = rec->data + rec->size;
+        size_t used = put_varint(out, zigzag(vertex - rec->last));
+        used += put_varint(out + used, zigzag(parent == -1 ? 0 : parent - vertex));
+        rec->size += used;
+        rec->last = vertex;
+        rec->steps++;
+    }
+    return true;
+}
+
+// keeps the path the search found, shortest_path must have run already
+bool finish_recording(recording_t *rec, maze_t *maze) {
+    int length = 1;
+    for (int curr = rec->end; curr != rec->start;
+         curr = search_parent(maze, curr)) {
+        if (search_parent(maze, curr) == -1 || length > maze->num_nodes) {
+            length = 0;
+            break;
+        }
+        length++;
+    }
+
+    if (length > 0) {
+        int *path = (int *)realloc(rec->path, sizeof(int) * length);
+        if (path == NULL) {
+            fprintf(stderr, "Memory allocation failed for recording\n");
+            return false;
+        }
+        rec->path = path;
+        int curr = rec->end;
+        for (int i = length - 1; i >= 0; i--) {
+            path[i] = curr;
+            curr = search_parent(maze, curr);
+        }
+    }
+    rec->path_length = length;
+    rec->finished = true;
+    return true;
+}
+
+// decodes steps from up to to into vertices, and their parents when not
+// NULL, starting from the nearest keyframe. returns the steps written
+int replay_steps(recording_t *rec, int from, int to, int *vertices,
+                 int *parents) {
+    if (from < 0) {
+        from = 0;
+    }
+    if (to > rec->steps) {
+        to = rec->steps;
+    }
+    if (from >= to) {
+        return 0;
+    }
+
+    record_keyframe *key = &rec->keyframes[from / RECORD_INTERVAL];
+    const unsigned char *in = rec->data + key->offset;
+    const unsigned char *end = rec->data + rec->size;
+    int vertex = key->vertex;
+    int count = 0;
+    for (int step = key->step; step < to; step++) {
+        uint32_t delta, parent;
+        size_t used = get_step(in, end, &delta, &parent);
+        if (used == 0) {
+            break;
+        }
+        in += used;
+        vertex += unzigzag(delta);
+        if (step < from) {
+            continue;
+        }
+        vertices[count] = vertex;
+        if (parents != NULL) {
+            int offset = unzigzag(parent);
+            parents[count] = offset == 0 ? -1 : vertex + offset;
+        }
+        count++;
+    }
+    return count;
+}
+
+// writes the maze followed by the recording, load_maze reads such a file
+// as a plain maze
+bool save_recording(maze_t *maze, recording_t *rec, const char *path) {
+    unsigned char *cells = NULL;
+    if (rec->path_length > 0) {
+        cells = (unsigned char *)malloc((size_t)rec->path_length * VARINT_MAX);
+        if (cells == NULL) {
+            fprintf(stderr, "Memory allocation failed for recording\n");
+            return false;
+        }
+    }
+    size_t path_size = 0;
+    for (int i = 0, last = 0; i < rec->path_length; i++) {
+        path_size += put_varint(cells + path_size, zigzag(rec->path[i] - last));
+        last = rec->path[i];
+    }
+
+    unsigned char header[RECORD_FILE_HEADER_SIZE] = {0};
+    memcpy(header, RECORD_FILE_MAGIC, 4);
+    write_u32(header + 4, RECORD_FILE_VERSION);
+    write_u32(header + 8, (uint32_t)rec->start);
+    write_u32(header + 12, (uint32_t)rec->end);
+    write_u32(header + 16, (uint32_t)rec->algorithm);
+    write_u32(header + 20, rec->finished ? 1 : 0);
+    write_u32(header + 24, (uint32_t)rec->steps);
+    write_u32(header + 28, (uint32_t)rec->path_length);
+    write_u64(header + 32, rec->size);
+    write_u64(header + 40, path_size);
+
+    FILE *file = fopen(path, "wb");
+    if (file == NULL) {
+        fprintf(stderr, "Could not open %s for writing\n", path);
+        free(cells);
+        return false;
+    }
+    bool written = write_maze(maze, file) &&
+                   fwrite(header, 1, sizeof(header), file) == sizeof(header) &&
+                   fwrite(rec->data, 1, rec->size, file) == rec->size &&
+                   fwrite(cells, 1, path_size, file) == path_size;
+    written = fclose(file) == 0 && written;
+    free(cells);
+    if (!written) {
+        fprintf(stderr, "Could not write %s\n", path);
+    }
+    return written;
+}
+
+// rebuilds the keyframes while checking every entry, false if any is bad
+bool index_recording(recording_t *rec, int num_nodes) {
+    const unsigned char *in = rec->data;
+    const unsigned char *end = rec->data + rec->size;
+    int vertex = 0;
+    for (int step = 0; step < rec->steps; step++) {
+        if (step % RECORD_INTERVAL == 0 &&
+            !add_keyframe(rec, step, vertex, in - rec->data)) {
+            return false;
+        }
+        uint32_t delta, parent;
+        size_t used = get_step(in, end, &delta, &parent);
+        if (used == 0) {
+            return false;
+        }
+        in += used;
+        long long next = (long long)vertex + unzigzag(delta);
+        long long from = next + unzigzag(parent);
+        if (next < 0 || next >= num_nodes || from < 0 || from >= num_nodes) {
+            return false;
+        }
+        vertex = (int)next;
+    }
+    rec->last = vertex;
+    return in == end;
+}
+
+bool read_path(recording_t *rec, const unsigned char *in, size_t size,
+               int num_nodes) {
+    if (rec->path_length == 0) {
+        return size == 0;
+    }
+    rec->path = (int *)malloc(sizeof(int) * rec->path_length);
+    if (rec->path == NULL) {
+        return false;
+    }
+    const unsigned char *end = in + size;
+    int cell = 0;
+    for (int i = 0; i < rec->path_length; i++) {
+        uint32_t delta;
+        size_t used = get_varint(in, end, &delta);
+        long long next = (long long)cell + unzigzag(delta);
+        if (used == 0 || next < 0 || next >= num_nodes) {
+            return false;
+        }
+        in += used;
+        cell = (int)next;
+        rec->path[i] = cell;
+    }
+    return in == end;
+}
+
+// the recording saved after the maze in path, NULL without a message when
+// the file holds only a maze
+recording_t *load_recording(const char *path) {
+    size_t size = 0;
+    unsigned char *data = map_file(path, &size);
+    if (data == NULL) {
+        fprintf(stderr, "Could not open %s\n", path);
+        return NULL;
+    }
+
+    // the maze itself is checked by load_maze, only its size matters here
+    bool valid = size >= MAZE_FILE_HEADER_SIZE &&
+                 memcmp(data, MAZE_FILE_MAGIC, 4) == 0;
+    int rows = valid ? (int)read_u32(data + 8) : 0;
+    int cols = valid ? (int)read_u32(data + 12) : 0;
+    valid = valid && rows > 0 && cols > 0 &&
+            (long long)rows * cols <= INT_MAX;
+    size_t offset = valid ? maze_file_size(rows, cols, read_u32(data + 28)) : 0;
+    if (valid && size <= offset) {
+        unmap_file(data, size);
+        return NULL;
+    }
+
+    const unsigned char *header = data + offset;
+    int num_nodes = rows * cols;
+    valid = valid && size - offset >= RECORD_FILE_HEADER_SIZE &&
+            memcmp(header, RECORD_FILE_MAGIC, 4) == 0 &&
+            read_u32(header + 4) == RECORD_FILE_VERSION;
+    int start = valid ? (int)read_u32(header + 8) : 0;
+    int end = valid ? (int)read_u32(header + 12) : 0;
+    uint64_t steps = valid ? read_u32(header + 24) : 0;
+    uint64_t path_length = valid ? read_u32(header + 28) : 0;
+    uint64_t data_size = valid ? read_u64(header + 32) : 0;
+    uint64_t path_size = valid ? read_u64(header + 40) : 0;
+    size_t body = size - offset - RECORD_FILE_HEADER_SIZE;
+    valid = valid && start >= 0 && start < num_nodes && end >= 0 &&
+            end < num_nodes && steps <= INT_MAX &&
+            path_length <= (uint64_t)num_nodes && data_size <= body &&
+            path_size <= body - data_size;
+
+    recording_t *rec = NULL;
+    if (valid) {
+        rec = create_recording(start, end, (int)read_u32(header + 16));
+    }
+    if (rec != NULL) {
+        rec->finished = read_u32(header + 20) != 0;
+        rec->steps = (int)steps;
+        rec->path_length = (int)path_length;
+        valid = reserve_bytes(rec, data_size);
+        if (valid && data_size > 0) {
+            memcpy(rec->data, header + RECORD_FILE_HEADER_SIZE, data_size);
+            rec->size = data_size;
+        }
+        valid = valid && index_recording(rec, num_nodes) &&
+                read_path(rec,
+                          header + RECORD_FILE_HEADER_SIZE + data_size,
+                          path_size, num_nodes);
+    }
+    unmap_file(data, size);
+
+    if (!valid) {
+        fprintf(stderr, "%s has no valid recording\n", path);
+        if (rec != NULL) {
+            free_recording(rec);
+        }
+        return NULL;
+    }
+    return rec;
+}
@@ -0,0 +1,155 @@
+#include "../include/maze.h"
+#include <stdint.h>
+
+// fills a rectangle of a 32-bit pixel buffer, clipped to the buffer
+void fill_rect(uint32_t *pixels, int pitch, int width, int height, int x,
+               int y, int w, int h, uint32_t colour) {
+    int x0 = x < 0 ? 0 : x;
+    int y0 = y < 0 ? 0 : y;
+    int x1 = x + w > width ? width : x + w;
+    int y1 = y + h > height ? height : y + h;
+
+    for (int row = y0; row < y1; row++) {
+        uint32_t *line = (uint32_t *)((uint8_t *)pixels + (size_t)row * pitch);
+        for (int col = x0; col < x1; col++) {
+            line[col] = colour;
+        }
+    }
+}
+
+// draws the walls of one cell, matching the rects used by Cell.draw_wall,
+// x0 and y0 are the maze pixel coordinates of the buffer's top left
+void render_walls(maze_t *maze, uint32_t *pixels, int pitch, int width,
+                  int height, int x0, int y0, int node_size, int line_size,
+                  int vertex, unsigned char walls, uint32_t line) {
+    int x = (vertex % maze->cols) * node_size + line_size - x0;
+    int y = (vertex / maze->cols) * node_size + line_size - y0;
+    int half = line_size / 2;
+    int length = node_size + line_size;
+
+    if (walls & WALL_BIT(TOP)) {
+        fill_rect(pixels, pitch, width, height, x - half, y - half, length,
+                  line_size, line);
+    }
+    if (walls & WALL_BIT(RIGHT)) {
+        fill_rect(pixels, pitch, width, height, x + node_size - half, y - half,
+                  line_size, length, line);
+    }
+    if (walls & WALL_BIT(BOTTOM)) {
+        fill_rect(pixels, pitch, width, height, x - half, y + node_size - half,
+                  length, line_size, line);
+    }
+    if (walls & WALL_BIT(LEFT)) {
+        fill_rect(pixels, pitch, width, height, x - half, y - half, line_size,
+                  length, line);
+    }
+}
+
+// walls drawn for a cell so that every shared wall is only drawn once
+unsigned char owned_walls(maze_t *maze, int vertex) {
+    unsigned char walls = maze->walls[vertex] & (WALL_BIT(TOP) | WALL_BIT(LEFT));
+    if (vertex % maze->cols == maze->cols - 1) {
+        walls |= maze->walls[vertex] & WALL_BIT(RIGHT);
+    }
+    if (vertex / maze->cols == maze->rows - 1) {
+        walls |= maze->walls[vertex] & WALL_BIT(BOTTOM);
+    }
+    return walls;
+}
+
+// rasterises the whole maze in one pass, pitch is in bytes
+void render_maze(maze_t *maze, uint32_t *pixels, int pitch, int width,
+                 int height, int node_size, int line_size,
+                 uint32_t background, uint32_t line) {
+    fill_rect(pixels, pitch, width, height, 0, 0, width, height, background);
+
+    for (int i = 0; i < maze->num_nodes; i++) {
+        render_walls(maze, pixels, pitch, width, height, 0, 0, node_size,
+                     line_size, i, owned_walls(maze, i), line);
+    }
+}
+
+// renders the part of the maze image starting at maze pixel (x0, y0).
+// cells are node_size pixels wide, or when block is above 1 each pixel
+// covers block x block cells coloured by the highest state among them.
+// states holds one palette index per vertex, walls need a line_size above 0
+void render_tile(maze_t *maze, uint32_t *pixels, int pitch, int width,
+                 int height, int x0, int y0, int node_size, int line_size,
+                 int block, const unsigned char *states,
+                 const uint32_t *palette, uint32_t line) {
+    if (block > 1) {
+        for (int y = 0; y < height; y++) {
+            uint32_t *out = (uint32_t *)((uint8_t *)pixels + (size_t)y * pitch);
+            int row0 = (y0 + y) * block;
+            for (int x = 0; x < width; x++) {
+                int col0 = (x0 + x) * block;
+                unsigned char state = 0;
+                for (int r = row0; r < row0 + block && r < maze->rows; r++) {
+                    for (int c = col0; c < col0 + block && c < maze->cols; c++) {
+                        unsigned char cell = states[r * maze->cols + c];
+                        state = cell > state ? cell : state;
+                    }
+                }
+                out[x] = palette[state];
+            }
+        }
+        return;
+    }
+
+    fill_rect(pixels, pitch, width, height, 0, 0, width, height, palette[0]);
+
+    // cells overlapping the region, plus one either side for their walls
+    int col0 = (x0 - line_size) / node_size - 1;
+    int row0 = (y0 - line_size) / node_size - 1;
+    int col1 = (x0 + width) / node_size + 1;
+    int row1 = (y0 + height) / node_size + 1;
+    col0 = col0 < 0 ? 0 : col0;
+    row0 = row0 < 0 ? 0 : row0;
+    col1 = col1 >= maze->cols ? maze->cols - 1 : col1;
+    row1 = row1 >= maze->rows ? maze->rows - 1 : row1;
+
+    for (int r = row0; r <= row1; r++) {
+        for (int c = col0; c <= col1; c++) {
+            unsigned char state = states[r * maze->cols + c];
+            if (state != 0) {
+                fill_rect(pixels, pitch, width, height,
+                          c * node_size + line_size - x0,
+                          r * node_size + line_size - y0, node_size, node_size,
+                          palette[state]);
+            }
+        }
+    }
+
+    if (line_size <= 0) {
+        return;
+    }
+    for (int r = row0; r <= row1; r++) {
+        for (int c = col0; c <= col1; c++) {
+            int vertex = r * maze->cols + c;
+            render_walls(maze, pixels, pitch, width, height, x0, y0, node_size,
+                         line_size, vertex, owned_walls(maze, vertex), line);
+        }
+    }
+}
+
+// colours one pixel per cell by distance, the palette runs from near to far
+// with palette_size entries. cells with no distance get the unreachable colour
+void render_heatmap(maze_t *maze, const int *dist, uint32_t *pixels,
+                    int pitch, const uint32_t *palette, int palette_size,
+                    uint32_t unreachable) {
+    int max_dist = 1;
+    for (int i = 0; i < maze->num_nodes; i++) {
+        max_dist = dist[i] > max_dist ? dist[i] : max_dist;
+    }
+
+    for (int row = 0; row < maze->rows; row++) {
+        uint32_t *out = (uint32_t *)((uint8_t *)pixels + (size_t)row * pitch);
+        const int *cells = dist + (size_t)row * maze->cols;
+        for (int col = 0; col < maze->cols; col++) {
+            int d = cells[col];
+            out[col] = d < 0 ? unreachable
+                             : palette[(long long)d * (palette_size - 1) /
+                                       max_dist];
+        }
+    }
+}
@@ -1,4 +1,7 @@
 #include "../include/maze.h"
+#include "../include/maze-heap.h"
+#include "../include/maze-record.h"
+#include <limits.h>
 #include <stdbool.h>
 #include <stdio.h>
 #include <stdlib.h>
@@ -12,8 +15,9 @@ typedef struct {
     int rear;
     int front;
     bool solved;
-    bool *visited;
+    unsigned int *visited;
     int *queue;
+    unsigned int epoch;
 } bfs_info;
 
 typedef struct {
@@ -26,38 +30,106 @@ typedef struct {
     int *stack;
 } dfs_info;
 
+typedef enum { BFS, DIJKSTRA, ASTAR, BELLMAN, BIDIRECTIONAL } Algorithms;
+
+// min heap ordered by priority then tie, duplicates are skipped when popped
+typedef struct {
+    int priority;
+    int tie;
+    int vertex;
+} heap_entry;
+
+typedef struct {
+    int size;
+    int capacity;
+    heap_entry *entries;
+} min_heap;
+
+// dist is the cost of the cheapest path found so far, which on a maze
+// without weights is the number of moves
+typedef struct {
+    int max_size;
+    int start;
+    int end;
+    bool solved;
+    unsigned int *closed;
+    unsigned int *seen;
+    int *dist;
+    radix_heap heap;
+    unsigned int epoch;
+} dijkstra_info;
+
+typedef struct {
+    int max_size;
+    int start;
+    int end;
+    int cols;
+    bool solved;
+    unsigned int *closed;
+    unsigned int *seen;
+    int *dist;
+    min_heap heap;
+    unsigned int epoch;
+} astar_info;
+
+typedef struct {
+    int max_size;
+    int start;
+    int end;
+    bool solved;
+    bool forward;
+    int front[2];
+    int rear[2];
+    int *queue[2];
+    int *dist[2];
+    unsigned int *seen[2];
+    int *back_parent;
+    int best;
+    int meet;
+    unsigned int epoch;
+} bibfs_info;
+
 typedef struct {
     int start;
     int end;
     bfs_info *bfs;
+    int algorithm;
+    dijkstra_info *dijkstra;
+    astar_info *astar;
+    bibfs_info *bidirectional;
 } search_info;
 
-bfs_info *create_bfs_info(maze_t *maze, int start, int end) {
-    bfs_info *bfs = (bfs_info *)malloc(sizeof(bfs_info));
-
-    bfs->max_size = maze->num_nodes;
+// marks are stamped with the search epoch, so a restart never clears them,
+// the maze's marks from any earlier search are forgotten the same way
+void restart_bfs_info(maze_t *maze, bfs_info *bfs, int start, int end) {
+    reset_search(maze);
+    if (advance_epoch(&bfs->epoch)) {
+        memset(bfs->visited, 0, sizeof(unsigned int) * bfs->max_size);
+    }
     bfs->start = start;
     bfs->end = end;
     bfs->rear = -1;
     bfs->front = 0;
     bfs->solved = false;
 
-    bfs->visited = (bool *)malloc(sizeof(bool) * bfs->max_size);
-    for (int i = 0; i < bfs->max_size; i++) {
-        bfs->visited[i] = false;
-    }
-
-    bfs->queue = (int *)malloc(sizeof(int) * bfs->max_size);
-    for (int i = 0; i < bfs->max_size; i++) {
-        bfs->queue[i] = 0;
-    }
-
     // add entrance vertex into queue
     bfs->rear++;
     bfs->queue[bfs->rear] = start;
-    bfs->visited[start] = true;
-    maze->nodes[start]->path = true;
+    bfs->visited[start] = bfs->epoch;
+    touch_vertex(maze, start);
+    maze->path[start] = true;
+}
+
+bfs_info *create_bfs_info(maze_t *maze, int start, int end) {
+    bfs_info *bfs = (bfs_info *)malloc(sizeof(bfs_info));
+
+    bfs->max_size = maze->num_nodes;
+    bfs->epoch = 0;
+    bfs->visited =
+        (unsigned int *)calloc(bfs->max_size, sizeof(unsigned int));
+    bfs->queue = (int *)malloc(sizeof(int) * bfs->max_size);
 
+    restart_bfs_info(maze, bfs, start, end);
     return bfs;
 }
 
@@ -67,52 +139,349 @@ void free_bfs_info(bfs_info *bfs) {
     free(bfs);
 }
 
-search_info *create_search_info(maze_t *maze, int start, int end) {
-    search_info *info = (search_info *)malloc(sizeof(search_info));
+bool heap_init(min_heap *heap, int capacity) {
+    heap->size = 0;
+    heap->capacity = capacity;
+    heap->entries = (heap_entry *)malloc(sizeof(heap_entry) * capacity);
+    return heap->entries != NULL;
+}
+
+bool heap_less(heap_entry *a, heap_entry *b) {
+    if (a->priority != b->priority) {
+        return a->priority < b->priority;
+    }
+    return a->tie < b->tie;
+}
+
+void heap_push(min_heap *heap, int priority, int tie, int vertex) {
+    if (heap->size == heap->capacity) {
+        return;
+    }
+
+    // sift the new entry up from the bottom
+    int i = heap->size++;
+    heap_entry entry = {priority, tie, vertex};
+    while (i > 0) {
+        int parent = (i - 1) / 2;
+        if (!heap_less(&entry, &heap->entries[parent])) {
+            break;
+        }
+        heap->entries[i] = heap->entries[parent];
+        i = parent;
+    }
+    heap->entries[i] = entry;
+}
+
+heap_entry heap_pop(min_heap *heap) {
+    heap_entry top = heap->entries[0];
+    heap_entry last = heap->entries[--heap->size];
+
+    // sift the last entry down from the root
+    int i = 0;
+    while (true) {
+        int child = i * 2 + 1;
+        if (child >= heap->size) {
+            break;
+        }
+        if (child + 1 < heap->size &&
+            heap_less(&heap->entries[child + 1], &heap->entries[child])) {
+            child++;
+        }
+        if (!heap_less(&heap->entries[child], &last)) {
+            break;
+        }
+        heap->entries[i] = heap->entries[child];
+        i = child;
+    }
+    heap->entries[i] = last;
+    return top;
+}
+
+int manhattan(int cols, int a, int b) {
+    return abs(a / cols - b / cols) + abs(a % cols - b % cols);
+}
+
+// distance of a vertex reached this epoch, INT_MAX otherwise
+int stamped_dist(const int *dist, const unsigned int *seen, unsigned int epoch,
+                 int vertex) {
+    return seen[vertex] == epoch ? dist[vertex] : INT_MAX;
+}
+
+void restart_dijkstra_info(maze_t *maze, dijkstra_info *dijkstra, int start,
+                           int end) {
+    reset_search(maze);
+    if (advance_epoch(&dijkstra->epoch)) {
+        memset(dijkstra->closed, 0, sizeof(unsigned int) * dijkstra->max_size);
+        memset(dijkstra->seen, 0, sizeof(unsigned int) * dijkstra->max_size);
+    }
+    dijkstra->start = start;
+    dijkstra->end = end;
+    dijkstra->solved = false;
+    radix_clear(&dijkstra->heap);
+
+    // add entrance vertex into heap
+    dijkstra->dist[start] = 0;
+    dijkstra->seen[start] = dijkstra->epoch;
+    radix_push(&dijkstra->heap, 0, start);
+    touch_vertex(maze, start);
+    maze->path[start] = true;
+}
+
+dijkstra_info *create_dijkstra_info(maze_t *maze, int start, int end) {
+    dijkstra_info *dijkstra = (dijkstra_info *)malloc(sizeof(dijkstra_info));
+
+    dijkstra->max_size = maze->num_nodes;
+    dijkstra->epoch = 0;
+    dijkstra->closed =
+        (unsigned int *)calloc(dijkstra->max_size, sizeof(unsigned int));
+    dijkstra->seen =
+        (unsigned int *)calloc(dijkstra->max_size, sizeof(unsigned int));
+    dijkstra->dist = (int *)malloc(sizeof(int) * dijkstra->max_size);
+    radix_init(&dijkstra->heap);
+
+    restart_dijkstra_info(maze, dijkstra, start, end);
+    return dijkstra;
+}
+
+void free_dijkstra_info(dijkstra_info *dijkstra) {
+    free(dijkstra->closed);
+    free(dijkstra->seen);
+    free(dijkstra->dist);
+    radix_free(&dijkstra->heap);
+    free(dijkstra);
+}
+
+void restart_astar_info(maze_t *maze, astar_info *astar, int start, int end) {
+    reset_search(maze);
+    if (advance_epoch(&astar->epoch)) {
+        memset(astar->closed, 0, sizeof(unsigned int) * astar->max_size);
+        memset(astar->seen, 0, sizeof(unsigned int) * astar->max_size);
+    }
+    astar->start = start;
+    astar->end = end;
+    astar->solved = false;
+    astar->heap.size = 0;
+
+    // add entrance vertex into heap
+    int h = manhattan(astar->cols, start, end);
+    astar->dist[start] = 0;
+    astar->seen[start] = astar->epoch;
+    heap_push(&astar->heap, h, h, start);
+    touch_vertex(maze, start);
+    maze->path[start] = true;
+}
+
+astar_info *create_astar_info(maze_t *maze, int start, int end) {
+    astar_info *astar = (astar_info *)malloc(sizeof(astar_info));
+
+    astar->max_size = maze->num_nodes;
+    astar->cols = maze->cols;
+    astar->epoch = 0;
+    astar->closed =
+        (unsigned int *)calloc(astar->max_size, sizeof(unsigned int));
+    astar->seen = (unsigned int *)calloc(astar->max_size, sizeof(unsigned int));
+    astar->dist = (int *)malloc(sizeof(int) * astar->max_size);
+    heap_init(&astar->heap, maze->adj_offsets[maze->num_nodes] + 1);
+
+    restart_astar_info(maze, astar, start, end);
+    return astar;
+}
+
+void free_astar_info(astar_info *astar) {
+    free(astar->closed);
+    free(astar->seen);
+    free(astar->dist);
+    free(astar->heap.entries);
+    free(astar);
+}
+
+void restart_bibfs_info(maze_t *maze, bibfs_info *bibfs, int start, int end) {
+    reset_search(maze);
+    if (advance_epoch(&bibfs->epoch)) {
+        for (int side = 0; side < 2; side++) {
+            memset(bibfs->seen[side], 0, sizeof(unsigned int) * bibfs->max_size);
+        }
+    }
+    bibfs->start = start;
+    bibfs->end = end;
+    bibfs->solved = false;
+    bibfs->forward = true;
+    bibfs->best = INT_MAX;
+    bibfs->meet = -1;
+
+    // side 0 searches from the start, side 1 from the end
+    for (int side = 0; side < 2; side++) {
+        int root = side == 0 ? start : end;
+        bibfs->front[side] = 0;
+        bibfs->rear[side] = 0;
+        bibfs->queue[side][0] = root;
+        bibfs->dist[side][root] = 0;
+        bibfs->seen[side][root] = bibfs->epoch;
+    }
+    bibfs->back_parent[end] = -1;
+
+    if (start == end) {
+        bibfs->best = 0;
+        bibfs->meet = start;
+    }
+    touch_vertex(maze, start);
+    maze->path[start] = true;
+}
+
+bibfs_info *create_bibfs_info(maze_t *maze, int start, int end) {
+    bibfs_info *bibfs = (bibfs_info *)malloc(sizeof(bibfs_info));
+
+    bibfs->max_size = maze->num_nodes;
+    bibfs->epoch = 0;
+    bibfs->back_parent = (int *)malloc(sizeof(int) * bibfs->max_size);
+    for (int side = 0; side < 2; side++) {
+        bibfs->queue[side] = (int *)malloc(sizeof(int) * bibfs->max_size);
+        bibfs->dist[side] = (int *)malloc(sizeof(int) * bibfs->max_size);
+        bibfs->seen[side] =
+            (unsigned int *)calloc(bibfs->max_size, sizeof(unsigned int));
+    }
+
+    restart_bibfs_info(maze, bibfs, start, end);
+    return bibfs;
+}
+
+void free_bibfs_info(bibfs_info *bibfs) {
+    for (int side = 0; side < 2; side++) {
+        free(bibfs->queue[side]);
+        free(bibfs->dist[side]);
+        free(bibfs->seen[side]);
+    }
+    free(bibfs->back_parent);
+    free(bibfs);
+}
+
+search_info *create_search_info(maze_t *maze, int start, int end,
+                                int algorithm) {
+    search_info *info = (search_info *)calloc(1, sizeof(search_info));
 
     info->start = start;
     info->end = end;
-    info->bfs = create_bfs_info(maze, start, end);
+    info->algorithm = algorithm;
+    switch (algorithm) {
+    case DIJKSTRA:
+        info->dijkstra = create_dijkstra_info(maze, start, end);
+        break;
+    case ASTAR:
+        info->astar = create_astar_info(maze, start, end);
+        break;
+    case BIDIRECTIONAL:
+        info->bidirectional = create_bibfs_info(maze, start, end);
+        break;
+    default:
+        info->algorithm = BFS;
+        info->bfs = create_bfs_info(maze, start, end);
+        break;
+    }
     return info;
 }
 
+// reuses the buffers of an existing search for new endpoints
+void restart_search_info(maze_t *maze, search_info *info, int start, int end) {
+    info->start = start;
+    info->end = end;
+    switch (info->algorithm) {
+    case DIJKSTRA:
+        restart_dijkstra_info(maze, info->dijkstra, start, end);
+        break;
+    case ASTAR:
+        restart_astar_info(maze, info->astar, start, end);
+        break;
+    case BIDIRECTIONAL:
+        restart_bibfs_info(maze, info->bidirectional, start, end);
+        break;
+    default:
+        restart_bfs_info(maze, info->bfs, start, end);
+        break;
+    }
+}
+
 void free_search_info(search_info *info) {
     if (info->bfs != NULL) {
         free_bfs_info(info->bfs);
     }
+    if (info->dijkstra != NULL) {
+        free_dijkstra_info(info->dijkstra);
+    }
+    if (info->astar != NULL) {
+        free_astar_info(info->astar);
+    }
+    if (info->bidirectional != NULL) {
+        free_bibfs_info(info->bidirectional);
+    }
     free(info);
 }
 
+// bytes held by a search's buffers, the maze's own are in maze->size
+size_t search_info_size(search_info *info) {
+    size_t size = sizeof(search_info);
+    if (info->bfs != NULL) {
+        size += sizeof(bfs_info) +
+                (sizeof(unsigned int) + sizeof(int)) * info->bfs->max_size;
+    }
+    if (info->dijkstra != NULL) {
+        size += sizeof(dijkstra_info) +
+                (sizeof(unsigned int) * 2 + sizeof(int)) *
+                    info->dijkstra->max_size +
+                radix_size(&info->dijkstra->heap);
+    }
+    if (info->astar != NULL) {
+        size += sizeof(astar_info) +
+                (sizeof(unsigned int) * 2 + sizeof(int)) *
+                    info->astar->max_size +
+                sizeof(heap_entry) * info->astar->heap.capacity;
+    }
+    if (info->bidirectional != NULL) {
+        size += sizeof(bibfs_info) +
+                (sizeof(int) + (sizeof(int) * 2 + sizeof(unsigned int)) * 2) *
+                    info->bidirectional->max_size;
+    }
+    return size;
+}
+
 void shortest_path(maze_t *maze, search_info *info) {
-    node_t *entrance = maze->nodes[info->start];
-    node_t *exit = maze->nodes[info->end];
-    node_t *curr = exit;
+    int curr = info->end;
 
-    while (true) {
-        if (curr->parent == -1) {
+    while (curr != -1) {
+        if (search_parent(maze, curr) == -1) {
             break;
         }
 
-        if (curr->vertex == entrance->vertex) {
+        if (curr == info->start) {
             break;
         }
 
-        if (curr == NULL) {
-            break;
-        }
+        maze->path[curr] = true;
+        curr = maze->parent[curr];
+    }
+}
 
-        curr->path = true;
-        curr = maze->nodes[curr->parent];
+// writes the path of the last search from the exit back towards the
+// entrance, without the entrance, and returns its length
+int search_path(maze_t *maze, int end, int *out) {
+    int count = 0;
+    for (int curr = end; search_parent(maze, curr) != -1;
+         curr = maze->parent[curr]) {
+        out[count++] = curr;
     }
+    return count;
 }
 
 int bfs_step(maze_t *maze, bfs_info *bfs) {
     if (bfs->solved) {
         return -1;
     }
+    // the exit is unreachable once the queue runs dry
+    if (bfs->front > bfs->rear) {
+        bfs->solved = true;
+        return -1;
+    }
     // get vertex from queue
     int vertex = bfs->queue[bfs->front];
-    node_t *curr = maze->nodes[vertex];
     bfs->front++;
 
     // check if the vertex is the exit
@@ -122,65 +491,393 @@ int bfs_step(maze_t *maze, bfs_info *bfs) {
     }
 
     // add all adjacent vertices to queue
-    curr = maze->nodes[vertex];
-    while (curr != NULL) {
-        if (bfs->visited[curr->vertex] == false) {
+    for (int i = maze->adj_offsets[vertex]; i < maze->adj_offsets[vertex + 1];
+         i++) {
+        int neighbour = maze->adj[i];
+        if (bfs->visited[neighbour] != bfs->epoch) {
             // add adjacent vertex to queue
             bfs->rear++;
-            bfs->queue[bfs->rear] = curr->vertex;
-            bfs->visited[curr->vertex] = true;
-            maze->nodes[curr->vertex]->parent = vertex;
-            maze->nodes[curr->vertex]->searched = true;
+            bfs->queue[bfs->rear] = neighbour;
+            bfs->visited[neighbour] = bfs->epoch;
+            touch_vertex(maze, neighbour);
+            maze->parent[neighbour] = vertex;
+            maze->searched[neighbour] = true;
         }
-        curr = curr->next;
     }
     return vertex;
 }
 
-void instant_bfs(maze_t *maze, int entrance, int exit) {
-    int max_size = maze->num_nodes;
-    bool visited[max_size];
+int dijkstra_step(maze_t *maze, dijkstra_info *dijkstra) {
+    if (dijkstra->solved) {
+        return -1;
+    }
 
-    // intialise queue
-    int queue[max_size * 2];
-    int rear = -1;
-    int front = 0;
+    // skip stale entries left behind by later improvements
+    int vertex = -1;
+    while (dijkstra->heap.size > 0) {
+        radix_entry entry = radix_pop(&dijkstra->heap);
+        if (entry.vertex != -1 &&
+            dijkstra->closed[entry.vertex] != dijkstra->epoch) {
+            vertex = entry.vertex;
+            break;
+        }
+    }
+    if (vertex == -1) {
+        dijkstra->solved = true;
+        return -1;
+    }
+    dijkstra->closed[vertex] = dijkstra->epoch;
+
+    // check if the vertex is the exit
+    if (vertex == dijkstra->end) {
+        dijkstra->solved = true;
+        return vertex;
+    }
+
+    // relax all adjacent vertices, moving into a cell costs its weight
+    const unsigned char *weights = maze->weighted ? maze->weights : NULL;
+    for (int i = maze->adj_offsets[vertex]; i < maze->adj_offsets[vertex + 1];
+         i++) {
+        int neighbour = maze->adj[i];
+        int dist = dijkstra->dist[vertex] + (weights ? weights[neighbour] : 1);
+        if (dist < stamped_dist(dijkstra->dist, dijkstra->seen, dijkstra->epoch,
+                                neighbour)) {
+            dijkstra->dist[neighbour] = dist;
+            dijkstra->seen[neighbour] = dijkstra->epoch;
+            touch_vertex(maze, neighbour);
+            maze->parent[neighbour] = vertex;
+            maze->searched[neighbour] = true;
+            radix_push(&dijkstra->heap, dist, neighbour);
+        }
+    }
+    return vertex;
+}
+
+int astar_step(maze_t *maze, astar_info *astar) {
+    if (astar->solved) {
+        return -1;
+    }
+
+    // skip stale entries left behind by later improvements
+    int vertex = -1;
+    while (astar->heap.size > 0) {
+        heap_entry entry = heap_pop(&astar->heap);
+        if (astar->closed[entry.vertex] != astar->epoch) {
+            vertex = entry.vertex;
+            break;
+        }
+    }
+    if (vertex == -1) {
+        astar->solved = true;
+        return -1;
+    }
+    astar->closed[vertex] = astar->epoch;
+
+    // check if the vertex is the exit
+    if (vertex == astar->end) {
+        astar->solved = true;
+        return vertex;
+    }
+
+    // relax all adjacent vertices, ties go to the one closest to the exit.
+    // weights are at least 1 so the manhattan distance never overestimates
+    const unsigned char *weights = maze->weighted ? maze->weights : NULL;
+    for (int i = maze->adj_offsets[vertex]; i < maze->adj_offsets[vertex + 1];
+         i++) {
+        int neighbour = maze->adj[i];
+        int dist = astar->dist[vertex] + (weights ? weights[neighbour] : 1);
+        if (dist <
+            stamped_dist(astar->dist, astar->seen, astar->epoch, neighbour)) {
+            int h = manhattan(astar->cols, neighbour, astar->end);
+            astar->dist[neighbour] = dist;
+            astar->seen[neighbour] = astar->epoch;
+            touch_vertex(maze, neighbour);
+            maze->parent[neighbour] = vertex;
+            maze->searched[neighbour] = true;
+            heap_push(&astar->heap, dist + h, h, neighbour);
+        }
+    }
+    return vertex;
+}
+
+// points the parents along the backward half of the path towards the start
+void join_bibfs_path(maze_t *maze, bibfs_info *bibfs) {
+    int curr = bibfs->meet;
+    while (curr != bibfs->end && bibfs->back_parent[curr] != -1) {
+        int next = bibfs->back_parent[curr];
+        touch_vertex(maze, next);
+        maze->parent[next] = curr;
+        curr = next;
+    }
+}
+
+int bibfs_step(maze_t *maze, bibfs_info *bibfs) {
+    if (bibfs->solved) {
+        return -1;
+    }
+
+    int side = bibfs->forward ? 0 : 1;
+    int other = 1 - side;
+
+    // finished once either side runs dry or no shorter path can be found
+    bool empty = bibfs->front[0] > bibfs->rear[0] ||
+                 bibfs->front[1] > bibfs->rear[1];
+    if (empty ||
+        (bibfs->best != INT_MAX &&
+         bibfs->dist[0][bibfs->queue[0][bibfs->front[0]]] +
+                 bibfs->dist[1][bibfs->queue[1][bibfs->front[1]]] >=
+             bibfs->best)) {
+        if (bibfs->meet != -1) {
+            join_bibfs_path(maze, bibfs);
+        }
+        bibfs->solved = true;
+        return -1;
+    }
+
+    // expand the side with the smaller frontier next time
+    int vertex = bibfs->queue[side][bibfs->front[side]++];
+    bibfs->forward = bibfs->rear[0] - bibfs->front[0] <=
+                     bibfs->rear[1] - bibfs->front[1];
+
+    for (int i = maze->adj_offsets[vertex]; i < maze->adj_offsets[vertex + 1];
+         i++) {
+        int neighbour = maze->adj[i];
+        if (bibfs->seen[side][neighbour] == bibfs->epoch) {
+            continue;
+        }
+
+        bibfs->dist[side][neighbour] = bibfs->dist[side][vertex] + 1;
+        bibfs->seen[side][neighbour] = bibfs->epoch;
+        bibfs->queue[side][++bibfs->rear[side]] = neighbour;
+        touch_vertex(maze, neighbour);
+        maze->searched[neighbour] = true;
+        if (side == 0) {
+            maze->parent[neighbour] = vertex;
+        } else {
+            bibfs->back_parent[neighbour] = vertex;
+        }
+
+        // both searches have reached this vertex
+        if (bibfs->seen[other][neighbour] == bibfs->epoch) {
+            int length =
+                bibfs->dist[side][neighbour] + bibfs->dist[other][neighbour];
+            if (length < bibfs->best) {
+                bibfs->best = length;
+                bibfs->meet = neighbour;
+            }
+        }
+    }
+    return vertex;
+}
+
+// advances up to n expansions, writing each expanded vertex to out
+int bfs_step_n(maze_t *maze, bfs_info *bfs, int n, int *out) {
+    int count = 0;
+    while (count < n) {
+        int vertex = bfs_step(maze, bfs);
+        if (vertex == -1) {
+            break;
+        }
+        out[count++] = vertex;
+    }
+    return count;
+}
+
+int search_step(maze_t *maze, search_info *info) {
+    switch (info->algorithm) {
+    case DIJKSTRA:
+        return dijkstra_step(maze, info->dijkstra);
+    case ASTAR:
+        return astar_step(maze, info->astar);
+    case BIDIRECTIONAL:
+        return bibfs_step(maze, info->bidirectional);
+    default:
+        return bfs_step(maze, info->bfs);
+    }
+}
+
+// same as bfs_step_n for whichever algorithm the search was created with,
+// a count below n means the search has finished
+int search_step_n(maze_t *maze, search_info *info, int n, int *out) {
+    if (info->algorithm == BFS) {
+        return bfs_step_n(maze, info->bfs, n, out);
+    }
 
-    // initialise boolean array
-    for (int i = 0; i < max_size; i++) {
-        visited[i] = false;
+    int count = 0;
+    while (count < n) {
+        int vertex = search_step(maze, info);
+        if (vertex == -1) {
+            break;
+        }
+        out[count++] = vertex;
     }
+    return count;
+}
+
+// search_step_n that also appends the expansions to rec when it is not NULL,
+// and keeps the path once the search finishes
+int search_record_n(maze_t *maze, search_info *info, recording_t *rec, int n,
+                    int *out) {
+    int count = search_step_n(maze, info, n, out);
+    if (rec != NULL) {
+        record_steps(rec, maze, out, count);
+        if (count < n) {
+            shortest_path(maze, info);
+            finish_recording(rec, maze);
+        }
+    }
+    return count;
+}
+
+int instant_bfs(maze_t *maze, int entrance, int exit) {
+    // every vertex is queued at most once, and one is visited once it has
+    // been stamped with this search's epoch
+    int *queue = maze_queue(maze);
+    if (queue == NULL) {
+        return 0;
+    }
+    reset_search(maze);
+    int rear = -1;
+    int front = 0;
+    int expanded = 0;
 
     // add entrance vertex into queue
     rear++;
     queue[rear] = entrance;
-    visited[entrance] = true;
-    maze->nodes[entrance]->path = true;
+    touch_vertex(maze, entrance);
+    maze->path[entrance] = true;
 
     while (front <= rear) {
         // get vertex from queue
         int vertex = queue[front];
-        node_t *curr = maze->nodes[vertex];
         front++;
+        expanded++;
 
         // check if the vertex is the exit
         if (vertex == exit)
             break;
 
         // add all adjacent vertices to queue
-        curr = maze->nodes[vertex];
-        while (curr != NULL) {
-            if (visited[curr->vertex] == false) {
+        for (int i = maze->adj_offsets[vertex];
+             i < maze->adj_offsets[vertex + 1]; i++) {
+            int neighbour = maze->adj[i];
+            if (maze->stamp[neighbour] != maze->epoch) {
                 // add adjacent vertex to queue
                 rear++;
-                queue[rear] = curr->vertex;
-                visited[curr->vertex] = true;
-                maze->nodes[curr->vertex]->parent = vertex;
-                maze->nodes[curr->vertex]->searched = true;
+                queue[rear] = neighbour;
+                touch_vertex(maze, neighbour);
+                maze->parent[neighbour] = vertex;
+                maze->searched[neighbour] = true;
             }
-            curr = curr->next;
         }
     }
+
+    return expanded;
+}
+
+int instant_dijkstra(maze_t *maze, int entrance, int exit) {
+    dijkstra_info *dijkstra = create_dijkstra_info(maze, entrance, exit);
+    int expanded = 0;
+    while (dijkstra_step(maze, dijkstra) != -1) {
+        expanded++;
+    }
+    free_dijkstra_info(dijkstra);
+    return expanded;
+}
+
+int instant_astar(maze_t *maze, int entrance, int exit) {
+    astar_info *astar = create_astar_info(maze, entrance, exit);
+    int expanded = 0;
+    while (astar_step(maze, astar) != -1) {
+        expanded++;
+    }
+    free_astar_info(astar);
+    return expanded;
+}
+
+int instant_bibfs(maze_t *maze, int entrance, int exit) {
+    bibfs_info *bibfs = create_bibfs_info(maze, entrance, exit);
+    int expanded = 0;
+    while (bibfs_step(maze, bibfs) != -1) {
+        expanded++;
+    }
+    free_bibfs_info(bibfs);
+    return expanded;
 }
 
 void solve_maze(maze_t *maze) { instant_bfs(maze, 0, maze->num_nodes - 1); }
+
+// breadth first distances from all the sources at once into dist, cells
+// that cannot be reached are left at -1. returns how many cells were reached
+int distance_field(maze_t *maze, const int *sources, int num_sources,
+                   int *dist) {
+    int *queue = (int *)malloc(sizeof(int) * maze->num_nodes);
+    if (queue == NULL) {
+        fprintf(stderr, "Memory allocation failed for distance field\n");
+        return -1;
+    }
+    for (int i = 0; i < maze->num_nodes; i++) {
+        dist[i] = -1;
+    }
+
+    int front = 0;
+    int rear = -1;
+    for (int i = 0; i < num_sources; i++) {
+        int source = sources[i];
+        if (source >= 0 && source < maze->num_nodes && dist[source] == -1) {
+            dist[source] = 0;
+            queue[++rear] = source;
+        }
+    }
+
+    while (front <= rear) {
+        int vertex = queue[front++];
+        for (int i = maze->adj_offsets[vertex];
+             i < maze->adj_offsets[vertex + 1]; i++) {
+            int neighbour = maze->adj[i];
+            if (dist[neighbour] == -1) {
+                dist[neighbour] = dist[vertex] + 1;
+                queue[++rear] = neighbour;
+            }
+        }
+    }
+
+    free(queue);
+    return rear + 1;
+}
+
+// cell furthest from source, with dist left holding the distance field
+int furthest_cell(maze_t *maze, int source, int *dist) {
+    if (distance_field(maze, &source, 1, dist) < 0) {
+        return -1;
+    }
+    int furthest = source;
+    for (int i = 0; i < maze->num_nodes; i++) {
+        if (dist[i] > dist[furthest]) {
+            furthest = i;
+        }
+    }
+    return furthest;
+}
+
+// the two cells furthest apart, found by searching from any cell and then
+// again from the furthest cell it reached. exact on perfect mazes, a lower
+// bound once the maze has loops. returns the distance between a and b
+int maze_diameter(maze_t *maze, int *a, int *b) {
+    int *dist = (int *)malloc(sizeof(int) * maze->num_nodes);
+    if (dist == NULL) {
+        fprintf(stderr, "Memory allocation failed for diameter\n");
+        return -1;
+    }
+
+    int length = -1;
+    *a = furthest_cell(maze, 0, dist);
+    if (*a != -1) {
+        *b = furthest_cell(maze, *a, dist);
+        if (*b != -1) {
+            length = dist[*b];
+        }
+    }
+    free(dist);
+    return length;
+}
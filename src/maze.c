@@ -1,3 +1,4 @@
+#include <limits.h>
 #include <stdbool.h>
 #include <stdio.h>
 #include <stdlib.h>
@@ -7,100 +8,185 @@
 
 #include "../include/maze.h"
 
-node_t *create_node(int vertex, int row, int col)
+// every allocation is rounded to this so the next one stays aligned
+#define ARENA_ALIGN 16
+#define ARENA_MIN_BLOCK (64 * 1024)
+
+size_t arena_round(size_t size)
 {
-    node_t *new_node = (node_t *)malloc(sizeof(node_t));
+    return (size + ARENA_ALIGN - 1) & ~(size_t)(ARENA_ALIGN - 1);
+}
 
-    if (new_node == NULL)
+arena_block_t *arena_block(size_t capacity)
+{
+    // calloc hands big blocks straight from mmap, so zeroing them is free
+    arena_block_t *block = (arena_block_t *)calloc(
+        1, arena_round(sizeof(arena_block_t)) + capacity);
+    if (block != NULL)
     {
-        fprintf(stderr, "Memory allocation failed for node vertex %d\n",
-                vertex);
-        return NULL;
+        block->capacity = capacity;
     }
+    return block;
+}
 
-    // assign values
-    new_node->vertex = vertex;
-    new_node->row = row;
-    new_node->col = col;
+bool arena_init(arena_t *arena, size_t capacity)
+{
+    arena->head = arena_block(capacity);
+    arena->reserved = arena->head != NULL
+                          ? arena_round(sizeof(arena_block_t)) + capacity
+                          : 0;
+    return arena->head != NULL;
+}
+
+// returns zeroed memory, a new block is chained on when the current one is
+// full
+void *arena_alloc(arena_t *arena, size_t size)
+{
+    size = arena_round(size);
+    arena_block_t *block = arena->head;
+    if (block == NULL || block->capacity - block->used < size)
+    {
+        size_t capacity = size > ARENA_MIN_BLOCK ? size : ARENA_MIN_BLOCK;
+        block = arena_block(capacity);
+        if (block == NULL)
+        {
+            return NULL;
+        }
+        block->next = arena->head;
+        arena->head = block;
+        arena->reserved += arena_round(sizeof(arena_block_t)) + capacity;
+    }
+
+    void *out = (unsigned char *)block + arena_round(sizeof(arena_block_t)) +
+                block->used;
+    block->used += size;
+    return out;
+}
+
+void arena_free(arena_t *arena)
+{
+    arena_block_t *block = arena->head;
+    while (block != NULL)
+    {
+        arena_block_t *next = block->next;
+        free(block);
+        block = next;
+    }
+    arena->head = NULL;
+    arena->reserved = 0;
+}
+
+// allocates from the maze's arena and keeps maze->size up to date
+void *maze_alloc(maze_t *maze, size_t size)
+{
+    void *out = arena_alloc(&maze->arena, size);
+    maze->size = maze->arena.reserved;
+    return out;
+}
 
-    new_node->walls = (bool *)malloc(sizeof(bool *) * 4);
+void init_node(node_t *node, bool *walls, int vertex, int row, int col)
+{
+    // assign values
+    node->vertex = vertex;
+    node->row = row;
+    node->col = col;
+    node->walls = walls;
 
     // set default values for walls
     for (int i = 0; i < 4; i++)
     {
-        new_node->walls[i] = true;
+        node->walls[i] = true;
+    }
+    node->visited = false;
+    node->searched = false;
+    node->path = false;
+    node->next = NULL;
+    node->parent = -1;
+}
+
+// a node owned by the maze, freed along with it
+node_t *maze_node(maze_t *maze, int vertex, int row, int col)
+{
+    node_t *new_node = (node_t *)maze_alloc(maze, sizeof(node_t));
+    bool *walls = (bool *)maze_alloc(maze, sizeof(bool) * 4);
+
+    if (new_node == NULL || walls == NULL)
+    {
+        fprintf(stderr, "Memory allocation failed for node vertex %d\n",
+                vertex);
+        return NULL;
     }
-    new_node->visited = false;
-    new_node->searched = false;
-    new_node->path = false;
-    new_node->next = NULL;
-    new_node->parent = -1;
 
+    init_node(new_node, walls, vertex, row, col);
     return new_node;
 }
 
 maze_t *create_maze(int rows, int cols)
 {
-    maze_t *maze = (maze_t *)malloc(sizeof(maze_t));
+    // vertices and adjacency offsets are ints, and every cell can have up
+    // to 4 neighbours
+    if (rows < 1 || cols < 1 || (size_t)rows * cols > INT_MAX / 4)
+    {
+        fprintf(stderr, "Invalid maze size %dx%d\n", rows, cols);
+        return NULL;
+    }
+    size_t num_nodes = (size_t)rows * cols;
+
+    // one block holds the maze and every array it needs, including the
+    // neighbours of a perfect maze, so creating one is a single allocation
+    size_t capacity =
+        arena_round(sizeof(maze_t)) + arena_round(num_nodes) +
+        arena_round(sizeof(int) * (num_nodes + 1)) +
+        arena_round(sizeof(int) * num_nodes) +
+        arena_round(sizeof(bool) * num_nodes) * 2 +
+        arena_round(sizeof(unsigned int) * num_nodes) +
+        arena_round(sizeof(int) * (2 * num_nodes + 1));
 
-    if (maze == NULL)
+    arena_t arena;
+    if (!arena_init(&arena, capacity))
     {
         fprintf(stderr, "Memory allocation failed for maze\n");
+        return NULL;
     }
+    maze_t *maze = (maze_t *)arena_alloc(&arena, sizeof(maze_t));
+    maze->arena = arena;
 
     // assign the properties
     maze->rows = rows;
     maze->cols = cols;
-    maze->num_nodes = rows * cols;
+    maze->num_nodes = (int)num_nodes;
 
-    // allocate the adjacency lists (array of linked lists)
-    maze->nodes = (node_t **)malloc(sizeof(node_t *) * maze->num_nodes);
-    if (maze->nodes == NULL)
-    {
-        fprintf(stderr, "Memory allocation failed for adjacency lists\n");
-        free(maze);
-        return NULL;
-    }
+    // the linked list view is only built on request, see build_nodes
+    maze->nodes = NULL;
 
-    for (int i = 0; i < maze->num_nodes; i++)
-    {
-        maze->nodes[i] = NULL;
-    }
+    // allocate the flat representation
+    maze->walls = (unsigned char *)maze_alloc(maze, num_nodes);
+    maze->adj_offsets = (int *)maze_alloc(maze, sizeof(int) * (num_nodes + 1));
+    maze->parent = (int *)maze_alloc(maze, sizeof(int) * num_nodes);
+    maze->searched = (bool *)maze_alloc(maze, sizeof(bool) * num_nodes);
+    maze->path = (bool *)maze_alloc(maze, sizeof(bool) * num_nodes);
+    maze->stamp = (unsigned int *)maze_alloc(maze, sizeof(unsigned int) * num_nodes);
 
-    // assign the total size
-    maze->size = sizeof(*maze);
+    memset(maze->walls, ALL_WALLS, sizeof(unsigned char) * maze->num_nodes);
+    reset_search(maze);
 
     return maze;
 }
 
-void free_node(node_t *node)
+void free_maze(maze_t *maze)
 {
-    // free all nodes in linked list
-    while (node != NULL)
-    {
-        node_t *tmp = node;
-        node = node->next;
-        free(tmp->walls);
-        free(tmp);
-        tmp = NULL;
-    }
+    // the maze lives in its own arena, so copy that out before freeing it
+    arena_t arena = maze->arena;
+    arena_free(&arena);
 }
 
-void free_maze(maze_t *maze)
+node_t *copy_node(maze_t *maze, node_t *src)
 {
-    // free all the nodes
-    for (int i = 0; i < maze->num_nodes; i++)
+    node_t *new_node = maze_node(maze, src->vertex, src->row, src->col);
+    if (new_node == NULL)
     {
-        node_t *curr = maze->nodes[i];
-        free_node(curr);
+        return NULL;
     }
-    free(maze->nodes);
-    free(maze);
-}
-
-node_t *copy_node(node_t *src)
-{
-    node_t *new_node = create_node(src->vertex, src->row, src->col);
     new_node->visited = src->visited;
     new_node->searched = src->searched;
     // Deep copy the walls array
@@ -108,6 +194,15 @@ node_t *copy_node(node_t *src)
     return new_node;
 }
 
+// overwrites an edge node from an earlier build, keeping its walls array
+void refill_node(node_t *node, node_t *src)
+{
+    init_node(node, node->walls, src->vertex, src->row, src->col);
+    node->visited = src->visited;
+    node->searched = src->searched;
+    memcpy(node->walls, src->walls, sizeof(bool) * 4);
+}
+
 void add_edge(maze_t *maze, node_t *src, node_t *dest)
 {
     node_t *curr = src;
@@ -122,7 +217,7 @@ void add_edge(maze_t *maze, node_t *src, node_t *dest)
         curr = curr->next;
     }
 
-    node_t *dest_copy = copy_node(dest);
+    node_t *dest_copy = copy_node(maze, dest);
     tmp->next = dest_copy;
 }
 
@@ -130,16 +225,13 @@ void print_graph(maze_t *maze)
 {
     for (int i = 0; i < maze->num_nodes; i++)
     {
-        node_t *curr = maze->nodes[i];
-        if (curr == NULL)
-            continue;
-        printf("\nAdjacency list of vertex %d (r %d, c %d): ", curr->vertex,
-               curr->row, curr->col);
-        while (curr != NULL)
+        printf("\nAdjacency list of vertex %d (r %d, c %d): ", i,
+               i / maze->cols, i % maze->cols);
+        for (int j = maze->adj_offsets[i]; j < maze->adj_offsets[i + 1]; j++)
         {
-            printf("(Vertex %d (%d, %d)) -> ", curr->vertex, curr->row,
-                   curr->col);
-            curr = curr->next;
+            int vertex = maze->adj[j];
+            printf("(Vertex %d (%d, %d)) -> ", vertex, vertex / maze->cols,
+                   vertex % maze->cols);
         }
         printf("NULL");
     }
@@ -147,7 +239,8 @@ void print_graph(maze_t *maze)
 
 node_t *check_cell(maze_t *maze, int row, int col)
 {
-    if (row < 0 || row >= maze->rows || col < 0 || col >= maze->cols)
+    if (maze->nodes == NULL || row < 0 || row >= maze->rows || col < 0 ||
+        col >= maze->cols)
     {
         return NULL;
     }
@@ -162,3 +255,354 @@ void reset_node(node_t *node)
     node->searched = false;
     node->parent = -1;
 }
+
+// returns the vertex next to the given one, or -1 if it is off the grid
+int neighbour_vertex(maze_t *maze, int vertex, Directions direction)
+{
+    int row = vertex / maze->cols;
+    int col = vertex % maze->cols;
+
+    switch (direction)
+    {
+    case TOP:
+        return row > 0 ? vertex - maze->cols : -1;
+    case RIGHT:
+        return col < maze->cols - 1 ? vertex + 1 : -1;
+    case BOTTOM:
+        return row < maze->rows - 1 ? vertex + maze->cols : -1;
+    case LEFT:
+        return col > 0 ? vertex - 1 : -1;
+    }
+    return -1;
+}
+
+void remove_wall(maze_t *maze, int src, int dest)
+{
+    int diff = dest - src;
+
+    if (diff == maze->cols)
+    {
+        maze->walls[src] &= ~WALL_BIT(BOTTOM);
+        maze->walls[dest] &= ~WALL_BIT(TOP);
+    }
+    else if (diff == -maze->cols)
+    {
+        maze->walls[src] &= ~WALL_BIT(TOP);
+        maze->walls[dest] &= ~WALL_BIT(BOTTOM);
+    }
+    else if (diff == 1)
+    {
+        maze->walls[src] &= ~WALL_BIT(RIGHT);
+        maze->walls[dest] &= ~WALL_BIT(LEFT);
+    }
+    else if (diff == -1)
+    {
+        maze->walls[src] &= ~WALL_BIT(LEFT);
+        maze->walls[dest] &= ~WALL_BIT(RIGHT);
+    }
+}
+
+// open sides of a cell that lead to another cell, as wall bits
+unsigned char open_sides(maze_t *maze, int vertex, int row, int col)
+{
+    unsigned char inside = ALL_WALLS;
+    inside &= ~(row == 0 ? WALL_BIT(TOP) : 0);
+    inside &= ~(col == maze->cols - 1 ? WALL_BIT(RIGHT) : 0);
+    inside &= ~(row == maze->rows - 1 ? WALL_BIT(BOTTOM) : 0);
+    inside &= ~(col == 0 ? WALL_BIT(LEFT) : 0);
+    return ~maze->walls[vertex] & inside;
+}
+
+// builds the CSR neighbour arrays from the wall bits. walls are random so
+// the loops count and store without branching on them
+bool build_adjacency(maze_t *maze)
+{
+    int count = 0;
+
+    maze->adj_offsets[0] = 0;
+    for (int r = 0, i = 0; r < maze->rows; r++)
+    {
+        for (int c = 0; c < maze->cols; c++, i++)
+        {
+            unsigned char open = open_sides(maze, i, r, c);
+            count += (open & 1) + ((open >> 1) & 1) + ((open >> 2) & 1) +
+                     ((open >> 3) & 1);
+            maze->adj_offsets[i + 1] = count;
+        }
+    }
+
+    // one spare slot as the last store below may write past the count.
+    // the old array is reused when the new one fits
+    if (count + 1 > maze->adj_capacity)
+    {
+        maze->adj = (int *)maze_alloc(maze, sizeof(int) * (count + 1));
+        if (maze->adj == NULL)
+        {
+            fprintf(stderr, "Memory allocation failed for neighbour array\n");
+            return false;
+        }
+        maze->adj_capacity = count + 1;
+    }
+
+    count = 0;
+    for (int r = 0, i = 0; r < maze->rows; r++)
+    {
+        for (int c = 0; c < maze->cols; c++, i++)
+        {
+            unsigned char open = open_sides(maze, i, r, c);
+            // each neighbour is always written but only kept when open
+            maze->adj[count] = i - maze->cols;
+            count += open & WALL_BIT(TOP) ? 1 : 0;
+            maze->adj[count] = i + 1;
+            count += open & WALL_BIT(RIGHT) ? 1 : 0;
+            maze->adj[count] = i + maze->cols;
+            count += open & WALL_BIT(BOTTOM) ? 1 : 0;
+            maze->adj[count] = i - 1;
+            count += open & WALL_BIT(LEFT) ? 1 : 0;
+        }
+    }
+    return true;
+}
+
+// builds the linked list view of the maze from the flat representation.
+// nodes come from the maze's arena. building it again reuses the nodes of
+// the last build and only allocates where a list has grown, so braiding a
+// maze adds at most 4 edge nodes per cell however often it is done
+bool build_nodes(maze_t *maze)
+{
+    if (maze->nodes == NULL)
+    {
+        maze->nodes =
+            (node_t **)maze_alloc(maze, sizeof(node_t *) * maze->num_nodes);
+        if (maze->nodes == NULL)
+        {
+            fprintf(stderr, "Memory allocation failed for adjacency lists\n");
+            return false;
+        }
+    }
+
+    for (int i = 0; i < maze->num_nodes; i++)
+    {
+        if (maze->nodes[i] == NULL)
+        {
+            maze->nodes[i] = maze_node(maze, i, i / maze->cols, i % maze->cols);
+            if (maze->nodes[i] == NULL)
+            {
+                return false;
+            }
+        }
+        else
+        {
+            // the edges are kept to be refilled below
+            node_t *edges = maze->nodes[i]->next;
+            init_node(maze->nodes[i], maze->nodes[i]->walls, i, i / maze->cols,
+                      i % maze->cols);
+            maze->nodes[i]->next = edges;
+        }
+        for (int d = TOP; d <= LEFT; d++)
+        {
+            maze->nodes[i]->walls[d] = maze->walls[i] & WALL_BIT(d);
+        }
+        maze->nodes[i]->parent = search_parent(maze, i);
+        maze->nodes[i]->searched = search_marked(maze, i);
+        maze->nodes[i]->path = path_marked(maze, i);
+    }
+
+    for (int i = 0; i < maze->num_nodes; i++)
+    {
+        node_t *tail = maze->nodes[i];
+        node_t *spare = tail->next;
+        for (int j = maze->adj_offsets[i]; j < maze->adj_offsets[i + 1]; j++)
+        {
+            node_t *dest = maze->nodes[maze->adj[j]];
+            node_t *edge = spare;
+            if (edge != NULL)
+            {
+                spare = edge->next;
+                refill_node(edge, dest);
+            }
+            else
+            {
+                edge = copy_node(maze, dest);
+                if (edge == NULL)
+                {
+                    return false;
+                }
+            }
+            tail->next = edge;
+            tail = edge;
+        }
+        tail->next = NULL;
+    }
+    return true;
+}
+
+// moves a stamp counter on, returns true when it wrapped around and the
+// stamps need clearing
+bool advance_epoch(unsigned int *epoch)
+{
+    (*epoch)++;
+    if (*epoch == 0)
+    {
+        *epoch = 1;
+        return true;
+    }
+    return false;
+}
+
+// forgets the last search in O(1) by starting a new epoch
+void reset_search(maze_t *maze)
+{
+    if (advance_epoch(&maze->epoch))
+    {
+        memset(maze->stamp, 0, sizeof(unsigned int) * maze->num_nodes);
+    }
+}
+
+// clears a vertex left over from an earlier search before it is written
+void touch_vertex(maze_t *maze, int vertex)
+{
+    if (maze->stamp[vertex] != maze->epoch)
+    {
+        maze->stamp[vertex] = maze->epoch;
+        maze->parent[vertex] = -1;
+        maze->searched[vertex] = false;
+        maze->path[vertex] = false;
+    }
+}
+
+int search_parent(maze_t *maze, int vertex)
+{
+    return maze->stamp[vertex] == maze->epoch ? maze->parent[vertex] : -1;
+}
+
+bool search_marked(maze_t *maze, int vertex)
+{
+    return maze->stamp[vertex] == maze->epoch && maze->searched[vertex];
+}
+
+bool path_marked(maze_t *maze, int vertex)
+{
+    return maze->stamp[vertex] == maze->epoch && maze->path[vertex];
+}
+
+// the weights array to fill in, every cell costing 1 when it is new. the
+// maze counts as weighted from here on
+unsigned char *maze_weights(maze_t *maze)
+{
+    if (maze->weights == NULL)
+    {
+        maze->weights = (unsigned char *)maze_alloc(maze, maze->num_nodes);
+        if (maze->weights == NULL)
+        {
+            fprintf(stderr, "Memory allocation failed for weights\n");
+            return NULL;
+        }
+        memset(maze->weights, 1, maze->num_nodes);
+    }
+    maze->weighted = true;
+    return maze->weights;
+}
+
+// room for every vertex, kept with the maze so searches can share it
+int *maze_queue(maze_t *maze)
+{
+    if (maze->queue == NULL)
+    {
+        maze->queue = (int *)maze_alloc(maze, sizeof(int) * maze->num_nodes);
+        if (maze->queue == NULL)
+        {
+            fprintf(stderr, "Memory allocation failed for queue\n");
+        }
+    }
+    return maze->queue;
+}
+
+// copies one weight per vertex, a weight of 0 is taken as 1
+bool set_weights(maze_t *maze, const unsigned char *weights)
+{
+    unsigned char *out = maze_weights(maze);
+    if (out == NULL)
+    {
+        return false;
+    }
+    for (int i = 0; i < maze->num_nodes; i++)
+    {
+        out[i] = weights[i] ? weights[i] : 1;
+    }
+    return true;
+}
+
+// back to every move costing 1, the array is kept for the next weights
+void clear_weights(maze_t *maze)
+{
+    maze->weighted = false;
+}
+
+static uint64_t splitmix64(uint64_t x)
+{
+    x += 0x9E3779B97F4A7C15ULL;
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EBULL;
+    return x ^ (x >> 31);
+}
+
+// seed taken from the wall clock, distinct between calls in the same second
+uint64_t random_seed(void)
+{
+    struct timespec ts;
+    timespec_get(&ts, TIME_UTC);
+    return splitmix64((uint64_t)ts.tv_sec * 1000000000ULL + ts.tv_nsec +
+                      (uint64_t)clock());
+}
+
+void rng_seed(rng_t *rng, uint64_t seed)
+{
+    rng->state = splitmix64(seed);
+    // xorshift must never be in the all zero state
+    if (rng->state == 0)
+    {
+        rng->state = 0x9E3779B97F4A7C15ULL;
+    }
+}
+
+// xorshift64*
+uint32_t rng_next(rng_t *rng)
+{
+    uint64_t x = rng->state;
+    x ^= x >> 12;
+    x ^= x << 25;
+    x ^= x >> 27;
+    rng->state = x;
+    return (uint32_t)((x * 0x2545F4914F6CDD1DULL) >> 32);
+}
+
+// uniform value in [0, bound)
+uint32_t rng_range(rng_t *rng, uint32_t bound)
+{
+    return (uint32_t)(((uint64_t)rng_next(rng) * bound) >> 32);
+}
+
+// union-find over an int parent array, with path halving
+int uf_find(int *sets, int x)
+{
+    while (sets[x] != x)
+    {
+        sets[x] = sets[sets[x]];
+        x = sets[x];
+    }
+    return x;
+}
+
+// returns false if a and b were already in the same set
+bool uf_union(int *sets, int a, int b)
+{
+    a = uf_find(sets, a);
+    b = uf_find(sets, b);
+    if (a == b)
+    {
+        return false;
+    }
+    sets[b] = a;
+    return true;
+}